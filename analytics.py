@@ -0,0 +1,182 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from resumenes import COLUMNAS_MONTOS, obtener_resumen
+from cache_usuarios import DATASET_ACTIVOS, generacion, registrar_cache
+
+# ---------------------------------------------------------
+#  KPIs DE LOS DASHBOARDS EN UNA SOLA PASADA
+# ---------------------------------------------------------
+# Todas las páginas de análisis (resumen, balance por cuenta, objetivos,
+# dashboard mensual y anual, alertas, comparación, forecast) salen de los
+# mismos totales. construir_analitica recorre una vez el resumen (mes x
+# categoría x cuenta) y arma un cubo mes x categoría con ingresos, gastos,
+# balance y cantidad, más el saldo por cuenta; todo lo demás (totales, por
+# mes, por año, rankings, variaciones) son sumas o cortes de ese cubo.
+#
+# obtener_analitica lo memoiza por usuario: se arma una vez por versión de
+# los datos (la generación de cache del usuario) y las páginas solo lo leen.
+# Sale solo del rollup mensual; la serie diaria no entra acá porque crece
+# con el historial y solo la usa el dashboard mensual, que la pide para el
+# mes elegido (resumenes.obtener_diario con las fechas del mes).
+
+# Índices de la última dimensión del cubo
+INGRESOS, GASTOS, BALANCE, CANTIDAD = range(4)
+MEDIDAS = ["ingresos", "gastos", "balance", "cantidad"]
+
+
+def _solo_lectura(*arrays: np.ndarray) -> None:
+    for array in arrays:
+        array.setflags(write=False)
+
+
+@dataclass(frozen=True)
+class Analitica:
+    """
+    KPIs de un usuario, compartidos entre páginas y reruns: es de solo
+    lectura. `version` es la generación de datos con la que se armó.
+    """
+    meses: List[str]
+    categorias: List[str]
+    cuentas: List[str]
+    cubo: np.ndarray
+    saldos: np.ndarray
+    version: int = 0
+    años: List[int] = field(init=False)
+    por_mes: pd.DataFrame = field(init=False)
+    por_año: pd.DataFrame = field(init=False)
+
+    def __post_init__(self):
+        años_mes = np.array([int(m[:4]) for m in self.meses], dtype=int)
+        años, codigo_año = np.unique(años_mes, return_inverse=True)
+        mensual = self.cubo.sum(axis=1)
+        anual = np.zeros((len(años), len(MEDIDAS)))
+        np.add.at(anual, codigo_año, mensual)
+
+        object.__setattr__(self, "años", años.tolist())
+        object.__setattr__(self, "por_mes", pd.DataFrame({"mes": self.meses, **{
+            c: mensual[:, i] for i, c in enumerate(COLUMNAS_MONTOS)
+        }}))
+        object.__setattr__(self, "por_año", pd.DataFrame({"anio": años, **{
+            c: anual[:, i] for i, c in enumerate(COLUMNAS_MONTOS)
+        }}))
+
+    @property
+    def vacio(self) -> bool:
+        return not self.meses
+
+    # --- cortes del cubo ---
+    def _corte(self, mes: Optional[str] = None, año: Optional[int] = None) -> np.ndarray:
+        """Totales por categoría (categoría x medida) de todo, un mes o un año."""
+        if mes is not None:
+            if mes not in self.meses:
+                return np.zeros((len(self.categorias), len(MEDIDAS)))
+            return self.cubo[self.meses.index(mes)]
+        if año is not None:
+            return self.cubo[[m.startswith(f"{int(año):04d}-") for m in self.meses]].sum(axis=0)
+        return self.cubo.sum(axis=0)
+
+    def totales(self, mes: Optional[str] = None) -> Dict[str, float]:
+        """Ingresos, gastos y balance de todo el historial o de `mes`."""
+        suma = self._corte(mes).sum(axis=0)
+        return {c: float(suma[i]) for i, c in enumerate(COLUMNAS_MONTOS)}
+
+    def saldo_por_cuenta(self) -> pd.Series:
+        """Saldo (ingresos - gastos) por cuenta, indexado por cuenta."""
+        return pd.Series(self.saldos, index=pd.Index(self.cuentas, name="cuenta"), name="balance")
+
+    def gastos_por_categoria(self, mes: Optional[str] = None) -> pd.Series:
+        """Gastos por categoría, de todo o de `mes` (solo categorías con gastos)."""
+        gastos = self._corte(mes)[:, GASTOS]
+        con_gastos = gastos > 0
+        return pd.Series(
+            gastos[con_gastos],
+            index=pd.Index(np.array(self.categorias, dtype=object)[con_gastos], name="categoria"),
+            name="gastos",
+        )
+
+    def ranking_categorias(
+        self,
+        mes: Optional[str] = None,
+        año: Optional[int] = None,
+        solo_gastos: bool = False,
+    ) -> pd.DataFrame:
+        """
+        Categorías ordenadas por monto movido (ingresos + gastos), o solo por
+        gastos si `solo_gastos`, de todo, un mes o un año.
+        Columnas: Categoría, Monto.
+        """
+        corte = self._corte(mes, año)
+        monto = corte[:, GASTOS] if solo_gastos else corte[:, INGRESOS] + corte[:, GASTOS]
+        incluidas = monto > 0 if solo_gastos else corte[:, CANTIDAD] > 0
+        ranking = pd.DataFrame({
+            "Categoría": np.array(self.categorias, dtype=object)[incluidas],
+            "Monto": monto[incluidas],
+        })
+        return ranking.sort_values("Monto", ascending=False, kind="stable", ignore_index=True)
+
+    @property
+    def meses_con_gastos(self) -> List[str]:
+        con_gastos = self.cubo[:, :, GASTOS].sum(axis=1) > 0
+        return [m for m, g in zip(self.meses, con_gastos) if g]
+
+    def comparar_gastos(self, mes_actual: str, mes_anterior: str) -> pd.DataFrame:
+        """
+        Gastos por categoría de dos meses, indexado por Categoría. Columnas:
+        Gasto_actual, Gasto_anterior, Variación y Variación_pct (sobre el
+        anterior; 0 se toma como 1 para no dividir por cero).
+        """
+        comparacion = pd.DataFrame({
+            "Gasto_actual": self.gastos_por_categoria(mes_actual),
+            "Gasto_anterior": self.gastos_por_categoria(mes_anterior),
+        }).fillna(0).rename_axis("Categoría")
+        comparacion["Variación"] = comparacion["Gasto_actual"] - comparacion["Gasto_anterior"]
+        comparacion["Variación_pct"] = (
+            comparacion["Variación"] / comparacion["Gasto_anterior"].replace(0, 1)
+        ) * 100
+        return comparacion
+
+
+def construir_analitica(resumen: pd.DataFrame, version: int = 0) -> Analitica:
+    """Arma la Analitica recorriendo una sola vez las filas del resumen."""
+    if resumen.empty:
+        return Analitica([], [], [], np.zeros((0, 0, len(MEDIDAS))), np.zeros(0), version)
+
+    mes_cod, meses = pd.factorize(resumen["mes"], sort=True)
+    cat_cod, categorias = pd.factorize(resumen["categoria"], sort=True)
+    cta_cod, cuentas = pd.factorize(resumen["cuenta"], sort=True)
+    valores = resumen[MEDIDAS].to_numpy(dtype=float)
+
+    # Una celda por (mes, categoría); cada medida es un bincount sobre la celda
+    celdas = mes_cod * len(categorias) + cat_cod
+    tamaño = len(meses) * len(categorias)
+    cubo = np.stack(
+        [np.bincount(celdas, weights=valores[:, i], minlength=tamaño) for i in range(len(MEDIDAS))],
+        axis=-1,
+    ).reshape(len(meses), len(categorias), len(MEDIDAS))
+    saldos = np.bincount(cta_cod, weights=valores[:, BALANCE], minlength=len(cuentas))
+    _solo_lectura(cubo, saldos)
+
+    return Analitica(
+        meses=meses.tolist(),
+        categorias=categorias.tolist(),
+        cuentas=cuentas.tolist(),
+        cubo=cubo,
+        saldos=saldos,
+        version=version,
+    )
+
+
+@registrar_cache(DATASET_ACTIVOS)
+@st.cache_resource(ttl=300, show_spinner=False)
+def obtener_analitica(usuario_id: str) -> Analitica:
+    """
+    KPIs del usuario, armados una vez por versión de sus datos y compartidos
+    (sin copias) entre páginas. Se invalida con las escrituras del usuario.
+    """
+    version = generacion(usuario_id, DATASET_ACTIVOS)
+    return construir_analitica(obtener_resumen(usuario_id), version)
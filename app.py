@@ -1,4 +1,5 @@
 import streamlit as st
+from metricas import medir_pagina
 from auth import check_auth
 from ui import topbar
 
@@ -16,6 +17,7 @@ except:
     pass
 
 
+@medir_pagina("app")
 def main():
     # Autenticación
     check_auth()
@@ -1,12 +1,63 @@
+import time
+from typing import Any, Dict, Optional
+
 import streamlit as st
 from supabase_client import get_supabase_client
+from catalogos import catalogos_provisionados, provisionar_catalogos
+
+# El access token de Supabase vence (por defecto, a la hora): se renueva con
+# el refresh token cuando le quedan menos de estos segundos
+MARGEN_RENOVACION_TOKEN = 60
+
 
-def save_session(user):
+class SesionInvalida(Exception):
+    """El token de la sesión venció o fue rechazado: hay que volver a iniciar sesión."""
+
+
+def _tokens(session) -> Dict[str, Any]:
+    # Para las consultas async (db_async.token_de_la_sesion)
+    return {
+        "access_token": getattr(session, "access_token", None),
+        "refresh_token": getattr(session, "refresh_token", None),
+        "expires_at": getattr(session, "expires_at", None),
+    }
+
+def save_session(user, session=None):
     st.session_state["user"] = {
         "id": user.id,
         "email": user.email,
+        **_tokens(session),
     }
 
+    # Primer login: cargar los catálogos sugeridos una sola vez
+    if not catalogos_provisionados(user.id):
+        provisionar_catalogos(user.id)
+
+def token_vigente() -> Optional[str]:
+    """
+    Access token del usuario logueado, renovado con su refresh token si
+    venció o está por vencer. None si la sesión no tiene token (backend
+    SQLite); lanza SesionInvalida si no se pudo renovar.
+    """
+    usuario = st.session_state.get("user") or {}
+    token = usuario.get("access_token")
+    expira = usuario.get("expires_at")
+    if not token or expira is None or time.time() < expira - MARGEN_RENOVACION_TOKEN:
+        return token
+
+    refresh_token = usuario.get("refresh_token")
+    if not refresh_token:
+        raise SesionInvalida("La sesión venció: volvé a iniciar sesión.")
+    try:
+        result = get_supabase_client().auth.refresh_session(refresh_token)
+    except Exception as e:
+        raise SesionInvalida(f"No se pudo renovar la sesión: {e}") from e
+    if getattr(result, "session", None) is None:
+        raise SesionInvalida("No se pudo renovar la sesión: volvé a iniciar sesión.")
+
+    usuario.update(_tokens(result.session))
+    return usuario["access_token"]
+
 def clear_session():
     if "user" in st.session_state:
         del st.session_state["user"]
@@ -35,7 +86,7 @@ def check_auth():
                         {"email": email, "password": password}
                     )
                     if result.user:
-                        save_session(result.user)
+                        save_session(result.user, getattr(result, "session", None))
                         st.rerun()
                     else:
                         st.error("Credenciales incorrectas.")
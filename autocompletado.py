@@ -0,0 +1,115 @@
+import bisect
+import heapq
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import streamlit as st
+
+from catalogos import obtener_catalog_store
+from db import obtener_uso_catalogos
+from cache_usuarios import DATASET_ACTIVOS, registrar_cache
+
+# ---------------------------------------------------------
+#  ÍNDICE DE PREFIJOS PARA AUTOCOMPLETAR
+# ---------------------------------------------------------
+# Los nombres se guardan en una lista ordenada por clave normalizada
+# (minúsculas, sin acentos). Las completions de un prefijo son un rango
+# contiguo de esa lista que se ubica con dos bisect; dentro del rango se
+# rankea por frecuencia de uso. Agregar un nombre es un insort.
+
+LIMITE_COMPLETAR = 10
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas y sin acentos, para comparar prefijos ("educ" ~ "Educación")."""
+    descompuesto = unicodedata.normalize("NFKD", str(texto).strip().lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+class IndicePrefijos:
+    """Nombres ordenados por clave normalizada, con frecuencia de uso."""
+
+    def __init__(self, nombres: Iterable[str] = (), frecuencias: Optional[Dict[str, int]] = None):
+        frecuencias = frecuencias or {}
+        self._frecuencias: Dict[str, int] = {}
+        for nombre in list(nombres) + list(frecuencias):
+            self._frecuencias.setdefault(nombre, int(frecuencias.get(nombre, 0)))
+        self._entradas: List[Tuple[str, str]] = sorted((normalizar(n), n) for n in self._frecuencias)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def __contains__(self, nombre: str) -> bool:
+        return nombre in self._frecuencias
+
+    def agregar(self, nombre: str, usos: int = 0) -> None:
+        """Agrega `nombre` (si no estaba) y le suma `usos`."""
+        with self._lock:
+            if nombre not in self._frecuencias:
+                self._frecuencias[nombre] = 0
+                bisect.insort(self._entradas, (normalizar(nombre), nombre))
+            self._frecuencias[nombre] += usos
+
+    def completar(self, prefijo: str = "", limite: Optional[int] = LIMITE_COMPLETAR) -> List[str]:
+        """
+        Nombres que empiezan con `prefijo` (sin distinguir mayúsculas ni
+        acentos), de más a menos usados y, a igual uso, alfabéticamente.
+        Sin límite devuelve todo el rango.
+        """
+        clave = normalizar(prefijo)
+        with self._lock:
+            inicio = bisect.bisect_left(self._entradas, (clave,))
+            fin = bisect.bisect_left(self._entradas, (clave + "\U0010ffff",), lo=inicio)
+            rango = self._entradas[inicio:fin]
+            frecuencias = self._frecuencias
+
+        orden = lambda e: (-frecuencias[e[1]], e)
+        if limite is None or len(rango) <= limite:
+            elegidas = sorted(rango, key=orden)
+        else:
+            elegidas = heapq.nsmallest(limite, rango, key=orden)
+        return [nombre for _, nombre in elegidas]
+
+
+# ---------------------------------------------------------
+#  ÍNDICES POR USUARIO
+# ---------------------------------------------------------
+# Viven en el CatalogStore del usuario, así catalogos.agregar_* los
+# actualiza en el lugar. Las frecuencias (cantidad de movimientos activos con
+# cada etiqueta / categoría) salen de la RPC uso_catalogos, un solo request
+# que no trae movimientos; si cambiaron desde que se armó el índice (una
+# escritura del usuario), se vuelve a armar.
+@registrar_cache(DATASET_ACTIVOS)
+@st.cache_resource(ttl=300, show_spinner=False)
+def uso_catalogos(usuario_id: str) -> Dict[str, Dict[str, int]]:
+    """
+    Usos por categoría y por etiqueta, compartidos (sin copias) entre reruns.
+    Si la consulta falla, lanza: el error no queda en la cache.
+    """
+    uso = obtener_uso_catalogos(usuario_id)
+    if uso is None:
+        raise RuntimeError("No se pudo obtener el uso de los catálogos.")
+    return uso
+
+
+def _indice(usuario_id: str, catalogo: str, conteos: Dict[str, int]) -> IndicePrefijos:
+    store = obtener_catalog_store(usuario_id)
+    with store.lock:
+        indice = store.indices.get(catalogo)
+        if indice is None or getattr(indice, "origen", None) is not conteos:
+            indice = IndicePrefijos(store.listas.get(catalogo, []), conteos)
+            indice.origen = conteos
+            store.indices[catalogo] = indice
+        return indice
+
+
+def indice_etiquetas(usuario_id: str) -> IndicePrefijos:
+    """Etiquetas del catálogo y de los movimientos, rankeadas por uso."""
+    return _indice(usuario_id, "etiquetas", uso_catalogos(usuario_id)["etiquetas"])
+
+
+def indice_categorias(usuario_id: str) -> IndicePrefijos:
+    """Categorías del catálogo y de los movimientos, rankeadas por uso."""
+    return _indice(usuario_id, "categorias", uso_catalogos(usuario_id)["categorias"])
@@ -0,0 +1,60 @@
+"""
+Compara dos resultados de benchmarks/medir.py (p. ej. main contra una rama).
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/comparar.py base.json nuevo.json [--tolerancia 0.2]
+
+Compara el tiempo mínimo de cada (caso, filas) presente en los dos archivos
+y termina con código 1 si alguno empeoró más que la tolerancia (20% por
+defecto), así se puede usar como chequeo de regresiones.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, Tuple
+
+TOLERANCIA_DEFECTO = 0.2
+
+
+def _por_caso(ruta: str) -> Tuple[Dict[str, Any], Dict[Tuple[str, int], float]]:
+    with open(ruta, encoding="utf-8") as f:
+        datos = json.load(f)
+    tiempos = {
+        (r["caso"], int(r["filas"])): float(r["min"])
+        for r in datos.get("resultados", [])
+        if "min" in r
+    }
+    return datos, tiempos
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compara dos corridas de benchmarks.")
+    parser.add_argument("base")
+    parser.add_argument("nuevo")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_DEFECTO)
+    args = parser.parse_args()
+
+    base, tiempos_base = _por_caso(args.base)
+    nuevo, tiempos_nuevo = _por_caso(args.nuevo)
+    print(f"base: {base.get('commit')}  nuevo: {nuevo.get('commit')}  tolerancia: {args.tolerancia:.0%}")
+
+    regresiones = 0
+    for clave in sorted(tiempos_base.keys() & tiempos_nuevo.keys(), key=lambda c: (c[1], c[0])):
+        antes, despues = tiempos_base[clave], tiempos_nuevo[clave]
+        cambio = (despues - antes) / antes if antes > 0 else 0.0
+        marca = ""
+        if cambio > args.tolerancia:
+            marca = "  <-- REGRESIÓN"
+            regresiones += 1
+        caso, filas = clave
+        print(f"{filas:>10}  {caso:<32} {antes:>10.4f}s -> {despues:>10.4f}s  {cambio:+7.1%}{marca}")
+
+    solo_uno = tiempos_base.keys() ^ tiempos_nuevo.keys()
+    if solo_uno:
+        print(f"{len(solo_uno)} casos medidos en una sola de las corridas (no se comparan).")
+
+    return 1 if regresiones else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
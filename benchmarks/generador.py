@@ -0,0 +1,153 @@
+"""
+Generador determinístico de movimientos sintéticos para los benchmarks.
+
+Con la misma semilla y cantidad de filas devuelve siempre el mismo ledger:
+cuentas y categorías de los catálogos sugeridos, montos con estacionalidad
+por categoría (aguinaldo, vacaciones, servicios en invierno), etiquetas
+coherentes con la categoría y algunas filas sin etiquetas o borradas.
+Todo se arma con numpy por columna, así 10M de filas no recorren Python
+fila por fila.
+"""
+import datetime
+import io
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from catalogos import CATEGORIAS_SUGERIDAS, CUENTAS_SUGERIDAS
+
+SEMILLA = 42
+
+USUARIO_BENCHMARK = "00000000-0000-0000-0000-000000000001"
+
+FECHA_INICIO = datetime.date(2021, 1, 1)
+FECHA_FIN = datetime.date(2025, 12, 31)
+
+# Proporción de filas sin etiquetas y de filas borradas (lógico)
+SIN_ETIQUETAS = 0.10
+BORRADAS = 0.02
+
+# categoría -> (tipo, peso, monto medio, descripciones, etiquetas)
+PERFILES: Dict[str, Tuple[str, float, float, List[str], List[str]]] = {
+    "Ingresos": ("ingreso", 0.06, 850_000, ["Sueldo", "Honorarios", "Transferencia recibida", "Venta Mercado Libre"], ["inversión"]),
+    "General": ("gasto", 0.08, 12_000, ["Varios", "Kiosco", "Regalo", "Propina"], ["compras"]),
+    "Comida": ("gasto", 0.22, 18_000, ["Super Coto", "Carrefour", "Día", "Verdulería", "Pedidos Ya", "Rappi"], ["comida", "supermercado"]),
+    "Transporte": ("gasto", 0.12, 9_000, ["SUBE", "YPF", "Shell", "Uber", "Cabify", "Peaje"], ["transporte", "combustible"]),
+    "Servicios": ("gasto", 0.10, 35_000, ["Edenor", "Metrogas", "AySA", "Personal", "Movistar", "Netflix", "Spotify"], ["servicios"]),
+    "Salud": ("gasto", 0.05, 25_000, ["Farmacity", "OSDE", "Consulta médica", "Farmacia del pueblo"], ["salud", "farmacia"]),
+    "Educación": ("gasto", 0.03, 60_000, ["Cuota colegio", "Curso online", "Librería"], ["educación"]),
+    "Inversión": ("gasto", 0.04, 200_000, ["Compra CEDEAR", "Plazo fijo", "FCI", "Compra USDT"], ["inversión"]),
+    "Hogar": ("gasto", 0.08, 120_000, ["Alquiler", "Expensas", "Easy", "Sodimac", "Ferretería"], ["hogar", "alquiler"]),
+    "Ocio": ("gasto", 0.09, 22_000, ["Cine", "Bar", "Restaurante", "Recital", "Steam"], ["ocio"]),
+    "Viajes": ("gasto", 0.03, 300_000, ["Aerolíneas Argentinas", "Despegar", "Hotel", "Airbnb"], ["viajes"]),
+    "Impuestos": ("gasto", 0.04, 45_000, ["AFIP Monotributo", "ARBA", "ABL", "Ganancias"], ["impuestos"]),
+    "Compras": ("gasto", 0.06, 55_000, ["Mercado Libre", "Frávega", "Garbarino", "Zara", "Adidas"], ["compras"]),
+}
+
+# Factor por mes (enero..diciembre) para las categorías estacionales
+ESTACIONALIDAD: Dict[str, List[float]] = {
+    "Ingresos": [1.0, 1.0, 1.0, 1.0, 1.0, 1.5, 1.0, 1.0, 1.0, 1.0, 1.0, 1.5],
+    "Viajes": [2.2, 1.8, 0.7, 0.6, 0.6, 0.7, 1.9, 0.8, 0.6, 0.7, 0.8, 1.6],
+    "Servicios": [0.9, 0.9, 0.9, 1.0, 1.2, 1.4, 1.5, 1.4, 1.1, 0.9, 0.9, 0.9],
+    "Compras": [0.9, 0.8, 0.9, 0.9, 0.9, 0.9, 1.0, 0.9, 0.9, 1.0, 1.3, 1.7],
+    "Comida": [1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.3],
+}
+
+# Inflación mensual aproximada (los montos crecen con el tiempo)
+INFLACION_MENSUAL = 0.04
+
+
+def _listas(*listas: List[str]) -> np.ndarray:
+    """Array de objetos cuyos elementos son listas (numpy no las expande)."""
+    arr = np.empty(len(listas), dtype=object)
+    for i, lista in enumerate(listas):
+        arr[i] = lista
+    return arr
+
+
+def generar_movimientos(filas: int, semilla: int = SEMILLA, usuario_id: str = USUARIO_BENCHMARK) -> pd.DataFrame:
+    """
+    DataFrame con `filas` movimientos con las columnas de la tabla
+    'movimientos' (id, usuario_id, fecha, categoria, tipo, descripcion,
+    monto, cuenta, etiquetas, deleted, created_at, updated_at), ordenado
+    por fecha e id.
+    """
+    rng = np.random.default_rng(semilla)
+    categorias = [c for c in CATEGORIAS_SUGERIDAS if c in PERFILES]
+    pesos = np.array([PERFILES[c][1] for c in categorias])
+
+    cat_idx = rng.choice(len(categorias), size=filas, p=pesos / pesos.sum())
+
+    dias = (FECHA_FIN - FECHA_INICIO).days + 1
+    fechas = np.sort(np.datetime64(FECHA_INICIO) + rng.integers(0, dias, size=filas).astype("timedelta64[D]"))
+    meses = fechas.astype("datetime64[M]")
+    mes_del_año = (meses.astype(int) % 12).astype(np.int64)
+    meses_desde_inicio = (meses - np.datetime64(FECHA_INICIO, "M")).astype(int)
+
+    medias = np.array([PERFILES[c][2] for c in categorias])
+    factores = np.ones((len(categorias), 12))
+    for i, c in enumerate(categorias):
+        if c in ESTACIONALIDAD:
+            factores[i] = ESTACIONALIDAD[c]
+    montos = (
+        medias[cat_idx]
+        * factores[cat_idx, mes_del_año]
+        * (1 + INFLACION_MENSUAL) ** meses_desde_inicio
+        * rng.lognormal(0.0, 0.5, size=filas)
+    )
+    montos = np.round(montos, 2)
+
+    tipos = np.array([PERFILES[c][0] for c in categorias], dtype=object)[cat_idx]
+
+    # Descripción: una de las del perfil, elegida por fila
+    descripciones = np.empty(filas, dtype=object)
+    etiquetas = np.empty(filas, dtype=object)
+    sin_etiquetas = rng.random(filas) < SIN_ETIQUETAS
+    elegida = rng.random(filas)
+    for i, c in enumerate(categorias):
+        pos = np.flatnonzero(cat_idx == i)
+        if not len(pos):
+            continue
+        opciones = np.array(PERFILES[c][3], dtype=object)
+        descripciones[pos] = opciones[(elegida[pos] * len(opciones)).astype(int)]
+
+        # Etiquetas: la principal siempre, la segunda a veces (listas compartidas)
+        tags = PERFILES[c][4]
+        combinaciones = _listas([tags[0]], tags[:2])
+        etiquetas[pos] = combinaciones[(rng.random(len(pos)) < 0.4).astype(int)]
+    etiquetas[sin_etiquetas] = _listas([])[np.zeros(int(sin_etiquetas.sum()), dtype=int)]
+
+    cuentas = np.array(CUENTAS_SUGERIDAS, dtype=object)[rng.integers(0, len(CUENTAS_SUGERIDAS), size=filas)]
+
+    creado = fechas.astype("datetime64[s]") + rng.integers(8 * 3600, 22 * 3600, size=filas).astype("timedelta64[s]")
+    timestamps = np.char.add(np.datetime_as_string(creado, unit="s"), "+00:00").astype(object)
+
+    return pd.DataFrame({
+        "id": np.arange(1, filas + 1),
+        "usuario_id": usuario_id,
+        "fecha": np.datetime_as_string(fechas, unit="D").astype(object),
+        "categoria": np.array(categorias, dtype=object)[cat_idx],
+        "tipo": tipos,
+        "descripcion": descripciones,
+        "monto": montos,
+        "cuenta": cuentas,
+        "etiquetas": etiquetas,
+        "deleted": rng.random(filas) < BORRADAS,
+        "created_at": timestamps,
+        "updated_at": timestamps,
+    })
+
+
+def a_filas(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Filas como las devuelve la API (lista de dicts)."""
+    return df.to_dict("records")
+
+
+def a_csv(df: pd.DataFrame) -> bytes:
+    """CSV en el formato que acepta la importación (etiquetas separadas por comas)."""
+    salida = df[["fecha", "categoria", "tipo", "descripcion", "monto", "cuenta"]].copy()
+    salida["etiquetas"] = [",".join(e) for e in df["etiquetas"].tolist()]
+    buffer = io.StringIO()
+    salida.to_csv(buffer, index=False)
+    return buffer.getvalue().encode("utf-8")
@@ -0,0 +1,422 @@
+"""
+Benchmarks de la app sobre ledgers sintéticos (ver generador.py).
+
+Mide la preparación de datos de cada página, la importación de CSV, el
+listado paginado y el modelo de etiquetas, para cada tamaño pedido, y
+escribe los resultados en JSON para comparar entre commits (comparar.py).
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/medir.py                                  # 1k y 100k
+    python benchmarks/medir.py --tamaños 1k,100k,1M,10M --salida base.json
+    python benchmarks/medir.py --casos pagina,modelo --repeticiones 5
+
+Corre siempre contra una base SQLite temporal (FINANZAS_BACKEND=sqlite):
+no necesita Supabase y nunca escribe en él. Los casos que recorren filas
+en Python (armar el ledger desde dicts, entrenar el modelo, insertar en la
+base) se omiten por encima de --limite-filas; quedan en el JSON como
+omitidos con el motivo.
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import cached_property
+from typing import Any, Callable, Dict, List, Optional
+
+import streamlit.logger as streamlit_logger
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+TAMAÑOS_DEFECTO = "1k,100k"
+REPETICIONES_DEFECTO = 3
+LIMITE_FILAS_DEFECTO = 1_000_000
+
+# Descripciones sobre las que se mide la predicción fila por fila
+MUESTRA_PREDICCION = 10_000
+
+# Páginas que se recorren con el cursor en el caso de listado profundo
+PAGINAS_PROFUNDAS = 10
+
+SUFIJOS = {"k": 1_000, "m": 1_000_000}
+
+
+def parsear_tamaño(texto: str) -> int:
+    """"1k" -> 1000, "10M" -> 10000000, "2500" -> 2500."""
+    texto = texto.strip().lower().replace("_", "")
+    if texto and texto[-1] in SUFIJOS:
+        return int(float(texto[:-1]) * SUFIJOS[texto[-1]])
+    return int(texto)
+
+
+def commit_actual() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+# ---------------------------------------------------------
+#  DATOS DE CADA TAMAÑO (se arman una vez, a demanda)
+# ---------------------------------------------------------
+class Datos:
+    """Ledger sintético de `filas` movimientos y sus derivados."""
+
+    def __init__(self, filas: int, semilla: int):
+        self.filas = filas
+        self.semilla = semilla
+        self.usuario_id = f"benchmark-{filas}"
+        self.importaciones = 0
+
+    @cached_property
+    def df(self):
+        from generador import generar_movimientos
+        return generar_movimientos(self.filas, self.semilla, self.usuario_id)
+
+    @cached_property
+    def activas(self) -> List[Dict[str, Any]]:
+        from generador import a_filas
+        return a_filas(self.df[~self.df["deleted"]])
+
+    @cached_property
+    def ledger(self):
+        from models import construir_ledger
+        return construir_ledger(self.activas)
+
+    @cached_property
+    def resumen(self):
+        from resumenes import resumir_ledger
+        return resumir_ledger(self.ledger.df)
+
+    @cached_property
+    def diario(self):
+        from resumenes import resumir_ledger_diario
+        diario = resumir_ledger_diario(self.ledger.df)
+        diario["mes"] = diario["fecha"].dt.strftime("%Y-%m")
+        return diario
+
+    @cached_property
+    def analitica(self):
+        from analytics import construir_analitica
+        return construir_analitica(self.resumen)
+
+    @cached_property
+    def csv(self) -> bytes:
+        from generador import a_csv
+        return a_csv(self.df)
+
+    @cached_property
+    def modelo(self):
+        from etiquetas_inteligentes import entrenar_modelo
+        return entrenar_modelo(self.activas)
+
+    @cached_property
+    def compilado(self):
+        from etiquetas_inteligentes import compilar_modelo
+        return compilar_modelo(self.modelo)
+
+    @cached_property
+    def importado(self) -> str:
+        """Usuario con el ledger ya cargado en la base (para el listado)."""
+        return self.importar()
+
+    def importar(self) -> str:
+        from importador import importar_csv_streaming
+        usuario_id = f"{self.usuario_id}-{self.importaciones}"
+        self.importaciones += 1
+        importar_csv_streaming(usuario_id, io.BytesIO(self.csv))
+        return usuario_id
+
+
+# ---------------------------------------------------------
+#  CASOS
+# ---------------------------------------------------------
+@dataclass
+class Caso:
+    nombre: str
+    preparar: Callable[[Datos], Callable[[], Any]]
+    por_fila: bool = False
+
+
+CASOS: List[Caso] = []
+
+
+def caso(nombre: str, por_fila: bool = False):
+    """Registra un caso. `preparar(datos)` arma lo que no se mide y devuelve la función a medir."""
+    def decorador(preparar):
+        CASOS.append(Caso(nombre, preparar, por_fila))
+        return preparar
+    return decorador
+
+
+@caso("generador")
+def _generador(d: Datos):
+    from generador import generar_movimientos
+    return lambda: generar_movimientos(d.filas, d.semilla, d.usuario_id)
+
+
+@caso("ledger.construir", por_fila=True)
+def _ledger(d: Datos):
+    from models import _ordenar_ledger, construir_ledger
+    activas = d.activas
+    return lambda: _ordenar_ledger(construir_ledger(activas).df)
+
+
+@caso("resumen.mensual")
+def _resumen(d: Datos):
+    from resumenes import resumir_ledger
+    df = d.ledger.df
+    return lambda: resumir_ledger(df)
+
+
+@caso("resumen.diario")
+def _diario(d: Datos):
+    from resumenes import resumir_ledger_diario
+    df = d.ledger.df
+    return lambda: resumir_ledger_diario(df)
+
+
+@caso("analytics.construir")
+def _analytics(d: Datos):
+    from analytics import construir_analitica
+    r = d.resumen
+    return lambda: construir_analitica(r)
+
+
+@caso("pagina.01_resumen")
+def _pagina_resumen(d: Datos):
+    a = d.analitica
+    return lambda: (a.totales(), a.por_mes, a.ranking_categorias())
+
+
+@caso("pagina.07_balance_por_cuenta")
+def _pagina_balance(d: Datos):
+    a = d.analitica
+    return lambda: a.saldo_por_cuenta().rename_axis("Cuenta").reset_index(name="Monto_signed")
+
+
+@caso("pagina.08_objetivos")
+def _pagina_objetivos(d: Datos):
+    a = d.analitica
+    return lambda: (a.saldo_por_cuenta(), a.gastos_por_categoria())
+
+
+@caso("pagina.09_dashboard_mensual")
+def _pagina_mensual(d: Datos):
+    a, diario = d.analitica, d.diario
+
+    def correr():
+        # La serie diaria del mes la trae la página aparte (obtener_diario)
+        mes = a.meses[-1]
+        return a.totales(mes), diario[diario["mes"] == mes], a.ranking_categorias(mes)
+    return correr
+
+
+@caso("pagina.10_alertas")
+def _pagina_alertas(d: Datos):
+    a = d.analitica
+
+    def correr():
+        mensual = a.por_mes.set_index("mes")["balance"]
+        meses = a.meses_con_gastos
+        return a.saldo_por_cuenta(), a.gastos_por_categoria(), mensual, a.comparar_gastos(meses[-1], meses[-2])
+    return correr
+
+
+@caso("pagina.12_comparacion_mensual")
+def _pagina_comparacion(d: Datos):
+    a = d.analitica
+
+    def correr():
+        actual, anterior = a.meses[-1], a.meses[-2]
+        return a.totales(actual), a.totales(anterior), a.por_mes, a.comparar_gastos(actual, anterior)
+    return correr
+
+
+@caso("pagina.13_dashboard_anual")
+def _pagina_anual(d: Datos):
+    a = d.analitica
+    return lambda: (a.por_año, a.ranking_categorias(año=a.años[-1], solo_gastos=True))
+
+
+@caso("pagina.14_forecast")
+def _pagina_forecast(d: Datos):
+    import numpy as np
+    a = d.analitica
+
+    def correr():
+        mensual = a.por_mes
+        x = np.arange(len(mensual))
+        return np.poly1d(np.polyfit(x, mensual["balance"], 1))(np.arange(len(x), len(x) + 12))
+    return correr
+
+
+@caso("importador.previsualizar")
+def _previsualizar(d: Datos):
+    from importador import resumir_csv
+    csv = d.csv
+    return lambda: resumir_csv(io.BytesIO(csv))
+
+
+@caso("importador.importar", por_fila=True)
+def _importar(d: Datos):
+    d.csv  # el CSV se arma antes de medir
+    return d.importar
+
+
+@caso("listado.primera_pagina", por_fila=True)
+def _listado_primera(d: Datos):
+    from db import obtener_movimientos_keyset
+    usuario_id = d.importado
+    return lambda: obtener_movimientos_keyset(usuario_id, limit=25)
+
+
+@caso("listado.paginas_profundas", por_fila=True)
+def _listado_profundo(d: Datos):
+    from db import obtener_movimientos_keyset
+    usuario_id = d.importado
+
+    def correr():
+        cursor = None
+        for _ in range(PAGINAS_PROFUNDAS):
+            cursor = obtener_movimientos_keyset(usuario_id, limit=100, cursor=cursor)["siguiente"]
+            if cursor is None:
+                break
+    return correr
+
+
+@caso("listado.contar", por_fila=True)
+def _listado_contar(d: Datos):
+    from db import contar_movimientos
+    usuario_id = d.importado
+    return lambda: contar_movimientos(usuario_id, categoria="Comida", estimado=True)
+
+
+@caso("listado.buscar", por_fila=True)
+def _listado_buscar(d: Datos):
+    from db import contar_movimientos, obtener_movimientos_keyset
+    usuario_id = d.importado
+    return lambda: (
+        obtener_movimientos_keyset(usuario_id, limit=25, texto="verduleria"),
+        contar_movimientos(usuario_id, texto="verduleria"),
+    )
+
+
+@caso("modelo.entrenar", por_fila=True)
+def _entrenar(d: Datos):
+    from etiquetas_inteligentes import entrenar_modelo
+    activas = d.activas
+    return lambda: entrenar_modelo(activas)
+
+
+@caso("modelo.predecir", por_fila=True)
+def _predecir(d: Datos):
+    from etiquetas_inteligentes import predecir_etiquetas
+    modelo = d.modelo
+    descripciones = d.df["descripcion"].head(MUESTRA_PREDICCION).tolist()
+    return lambda: [predecir_etiquetas(modelo, t) for t in descripciones]
+
+
+@caso("modelo.predecir_batch", por_fila=True)
+def _predecir_batch(d: Datos):
+    from etiquetas_inteligentes import predecir_etiquetas_batch
+    compilado = d.compilado
+    descripciones = d.df["descripcion"].tolist()
+    return lambda: predecir_etiquetas_batch(compilado, descripciones)
+
+
+# ---------------------------------------------------------
+#  EJECUCIÓN
+# ---------------------------------------------------------
+def medir(funcion: Callable[[], Any], repeticiones: int) -> List[float]:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def correr_caso(c: Caso, datos: Datos, repeticiones: int, limite_filas: int) -> Dict[str, Any]:
+    resultado: Dict[str, Any] = {"caso": c.nombre, "filas": datos.filas}
+    if c.por_fila and datos.filas > limite_filas:
+        resultado["omitido"] = f"recorre filas en Python; más de --limite-filas={limite_filas}"
+        return resultado
+    try:
+        funcion = c.preparar(datos)
+        tiempos = medir(funcion, repeticiones)
+    except Exception as e:
+        resultado["error"] = f"{type(e).__name__}: {e}"
+        return resultado
+    resultado.update(
+        repeticiones=repeticiones,
+        segundos=[round(t, 6) for t in tiempos],
+        min=round(min(tiempos), 6),
+        mediana=round(statistics.median(tiempos), 6),
+    )
+    return resultado
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks sobre ledgers sintéticos.")
+    parser.add_argument("--tamaños", default=TAMAÑOS_DEFECTO, help="Filas por ledger, p. ej. 1k,100k,1M,10M")
+    parser.add_argument("--casos", default="", help="Prefijos de casos a correr (default: todos)")
+    parser.add_argument("--repeticiones", type=int, default=REPETICIONES_DEFECTO)
+    parser.add_argument("--limite-filas", type=parsear_tamaño, default=LIMITE_FILAS_DEFECTO)
+    parser.add_argument("--semilla", type=int, default=None)
+    parser.add_argument("--salida", default=None, help="Archivo JSON de resultados (default: stdout)")
+    args = parser.parse_args()
+
+    # Antes de importar la app: base local descartable, nunca Supabase
+    directorio = tempfile.mkdtemp(prefix="finanzas_benchmark_")
+    os.environ["FINANZAS_BACKEND"] = "sqlite"
+    os.environ["FINANZAS_SQLITE_PATH"] = os.path.join(directorio, "benchmark.sqlite3")
+    os.environ["FINANZAS_MODELOS_DIR"] = os.path.join(directorio, "modelos_etiquetas")
+    # Sin servidor, las caches de streamlit avisan en cada import; no aportan acá
+    streamlit_logger.set_log_level(logging.ERROR)
+
+    from generador import SEMILLA
+
+    semilla = SEMILLA if args.semilla is None else args.semilla
+    prefijos = [p.strip() for p in args.casos.split(",") if p.strip()]
+    casos = [c for c in CASOS if not prefijos or any(c.nombre.startswith(p) for p in prefijos)]
+
+    resultados = []
+    for filas in [parsear_tamaño(t) for t in args.tamaños.split(",") if t.strip()]:
+        datos = Datos(filas, semilla)
+        for c in casos:
+            r = correr_caso(c, datos, args.repeticiones, args.limite_filas)
+            resultados.append(r)
+            estado = r.get("omitido") or r.get("error") or f"min {r['min']:.4f}s  mediana {r['mediana']:.4f}s"
+            print(f"{filas:>10}  {c.nombre:<32} {estado}", file=sys.stderr)
+
+    salida = {
+        "commit": commit_actual(),
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "semilla": semilla,
+        "resultados": resultados,
+    }
+    texto = json.dumps(salida, ensure_ascii=False, indent=2)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
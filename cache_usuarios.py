@@ -0,0 +1,58 @@
+import threading
+from typing import Callable, Dict, List, Tuple
+
+# ---------------------------------------------------------
+#  INVALIDACIÓN DE CACHE POR USUARIO
+# ---------------------------------------------------------
+# Las funciones cacheadas (st.cache_data / st.cache_resource) que reciben
+# usuario_id como único argumento se registran bajo un dataset. Las
+# escrituras de db.py invalidan solo las entradas de ese usuario y de los
+# datasets afectados, sin tocar la cache de los demás usuarios.
+#
+# Las funciones cacheadas con más argumentos (p. ej. conteos por filtro)
+# no se pueden borrar por usuario; en su lugar reciben generacion(usuario,
+# dataset) como argumento. Cada invalidación incrementa la generación, así
+# las entradas viejas dejan de usarse y expiran solas por ttl.
+
+DATASET_ACTIVOS = "activos"
+DATASET_BORRADOS = "borrados"
+
+_CACHES: Dict[str, List[Callable]] = {}
+
+_GENERACIONES: Dict[Tuple[str, str], int] = {}
+_lock_generaciones = threading.Lock()
+
+
+def registrar_cache(dataset: str):
+    """
+    Decorador que registra una función cacheada bajo `dataset`.
+    Debe aplicarse por fuera de @st.cache_data / @st.cache_resource.
+    """
+    def decorador(func):
+        _CACHES.setdefault(dataset, []).append(func)
+        return func
+    return decorador
+
+
+def generacion(usuario_id: str, dataset: str) -> int:
+    """Generación actual de `dataset` para `usuario_id` (sube con cada invalidación)."""
+    return _GENERACIONES.get((usuario_id, dataset), 0)
+
+
+def invalidar_usuario(usuario_id: str, *datasets: str) -> None:
+    """
+    Borra las entradas cacheadas de `usuario_id` en los datasets indicados
+    (todos si no se indica ninguno) e incrementa sus generaciones.
+    """
+    datasets = datasets or tuple(set(_CACHES) | {d for _, d in _GENERACIONES})
+    with _lock_generaciones:
+        for dataset in datasets:
+            clave = (usuario_id, dataset)
+            _GENERACIONES[clave] = _GENERACIONES.get(clave, 0) + 1
+
+    for dataset in datasets:
+        for func in _CACHES.get(dataset, []):
+            try:
+                func.clear(usuario_id)
+            except Exception as e:
+                print(f"[CACHE] Error al invalidar {dataset} de {usuario_id}: {e}")
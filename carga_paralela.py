@@ -0,0 +1,92 @@
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from streamlit.runtime.scriptrunner_utils.script_run_context import SCRIPT_RUN_CONTEXT_ATTR_NAME
+
+# ---------------------------------------------------------
+#  CARGA CONCURRENTE DE DATOS DE UNA PÁGINA
+# ---------------------------------------------------------
+# Las páginas que necesitan varios datasets independientes (catálogos,
+# índices de uso, movimientos, conteos) los piden a la vez en un pool de
+# hilos acotado y compartido: la espera es la de la lectura más lenta y no la
+# suma de todas. Cada carga corre con una copia del contexto del rerun, así
+# sus round trips se siguen contando en consultas.py, y con el
+# ScriptRunContext de la sesión (ver con_contexto), así las funciones
+# cacheadas de Streamlit funcionan igual que en el hilo de la página.
+#
+# Las cargas no deben dibujar ni tocar st.session_state (corren fuera del
+# hilo del script); lo que lo necesite se hace en el hilo de la página.
+
+CARGA_WORKERS = 8
+
+_SIN_DEFECTO = object()
+
+T = TypeVar("T")
+
+
+@st.cache_resource(show_spinner=False)
+def _executor() -> ThreadPoolExecutor:
+    """Pool de hilos compartido por todas las sesiones."""
+    return ThreadPoolExecutor(max_workers=CARGA_WORKERS, thread_name_prefix="carga")
+
+
+def con_contexto(funcion: Callable[..., T]) -> Callable[..., T]:
+    """
+    Envuelve `funcion` para correrla en un hilo de un pool con el contexto
+    de quien la lanza: sus contextvars (el rerun en curso de consultas.py) y
+    su ScriptRunContext. El ScriptRunContext se quita al terminar, porque el
+    hilo después atiende a otras sesiones.
+    """
+    contexto = contextvars.copy_context()
+    ctx = get_script_run_ctx(suppress_warning=True)
+
+    def correr(*args, **kwargs) -> T:
+        hilo = threading.current_thread()
+        if ctx is not None:
+            add_script_run_ctx(hilo, ctx)
+        try:
+            return contexto.run(funcion, *args, **kwargs)
+        finally:
+            setattr(hilo, SCRIPT_RUN_CONTEXT_ATTR_NAME, None)
+    return correr
+
+
+def lanzar(carga: Callable[[], Any]) -> Future:
+    """Empieza `carga` en el pool y devuelve su Future."""
+    return _executor().submit(con_contexto(carga))
+
+
+def cargar_en_paralelo(
+    cargas: Dict[str, Callable[[], Any]],
+    por_defecto: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Corre todas las `cargas` a la vez y devuelve {nombre: resultado}.
+
+    Si una carga falla y tiene valor en `por_defecto`, se usa ese valor (como
+    el try/except de cada dataset en las páginas); si no tiene, el error se
+    propaga después de esperar a las demás.
+    """
+    por_defecto = por_defecto or {}
+    futuros = {nombre: lanzar(carga) for nombre, carga in cargas.items()}
+
+    resultados: Dict[str, Any] = {}
+    error: Optional[BaseException] = None
+    for nombre, futuro in futuros.items():
+        try:
+            resultados[nombre] = futuro.result()
+        except Exception as e:
+            defecto = por_defecto.get(nombre, _SIN_DEFECTO)
+            if defecto is _SIN_DEFECTO:
+                error = error or e
+            else:
+                print(f"[CARGA] Error al cargar {nombre}: {e}")
+                resultados[nombre] = defecto
+
+    if error is not None:
+        raise error
+    return resultados
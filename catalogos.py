@@ -1,5 +1,14 @@
-from typing import List
+import bisect
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+import streamlit as st
+from postgrest import ReturnMethod
+
 from supabase_client import get_supabase_client
+from metricas import medir_db
+from db import Pasos, _ejecutar_pasos
 
 CATEGORIAS_SUGERIDAS = [
     "Ingresos",        # nueva categoría para entradas de dinero
@@ -46,139 +55,222 @@ CUENTAS_SUGERIDAS = [
 
 
 # -------------------------------------------------------------------
-#   CARGA INICIAL — SOLO SI LA TABLA ESTÁ VACÍA
+#   PROVISIÓN INICIAL — UNA VEZ POR USUARIO (al primer login)
 # -------------------------------------------------------------------
-def _ensure_defaults(usuario_id: str):
-    supabase = get_supabase_client()
+# La hace auth.save_session si el usuario no tiene su fila en la tabla
+# catalogos_provisionados (sql/007), que se busca y se escribe por
+# usuario_id. Cada tabla vacía recibe sus sugeridos en un único upsert; las
+# lecturas de catálogos ya no verifican nada.
+TABLA_PROVISION = "catalogos_provisionados"
 
-    # CATEGORÍAS
-    try:
-        existing = (
-            supabase.table("categorias")
-            .select("id")
-            .eq("usuario_id", usuario_id)
-            .limit(1)
-            .execute()
-        )
-        if not existing.data:
-            for nombre in CATEGORIAS_SUGERIDAS:
-                supabase.table("categorias").insert({
-                    "usuario_id": usuario_id,
-                    "nombre": nombre
-                }).execute()
-    except Exception as e:
-        print("Error cargando categorías:", e)
+SUGERIDOS = {
+    "categorias": CATEGORIAS_SUGERIDAS,
+    "etiquetas": ETIQUETAS_SUGERIDAS,
+    "cuentas": CUENTAS_SUGERIDAS,
+}
 
-    # ETIQUETAS
-    try:
-        existing = (
-            supabase.table("etiquetas")
-            .select("id")
-            .eq("usuario_id", usuario_id)
-            .limit(1)
-            .execute()
-        )
-        if not existing.data:
-            for nombre in ETIQUETAS_SUGERIDAS:
-                supabase.table("etiquetas").insert({
-                    "usuario_id": usuario_id,
-                    "nombre": nombre
-                }).execute()
-    except Exception as e:
-        print("Error cargando etiquetas:", e)
 
-    # CUENTAS
+@medir_db
+def catalogos_provisionados(usuario_id: str) -> bool:
+    """True si el usuario ya tiene su fila de provisión (False si falla la consulta)."""
     try:
-        existing = (
-            supabase.table("cuentas")
-            .select("id")
+        result = (
+            get_supabase_client().table(TABLA_PROVISION)
+            .select("usuario_id")
             .eq("usuario_id", usuario_id)
             .limit(1)
             .execute()
         )
-        if not existing.data:
-            for nombre in CUENTAS_SUGERIDAS:
-                supabase.table("cuentas").insert({
-                    "usuario_id": usuario_id,
-                    "nombre": nombre
-                }).execute()
+        return bool(result.data)
     except Exception as e:
-        print("Error cargando cuentas:", e)
+        print("Error verificando catálogos provisionados:", e)
+        return False
 
 
-# -------------------------------------------------------------------
-#   OBTENER LISTAS
-# -------------------------------------------------------------------
-def obtener_categorias(usuario_id: str) -> List[str]:
-    supabase = get_supabase_client()
-    _ensure_defaults(usuario_id)
+# Queries compartidas con db_async.py (ver "CONSULTAS COMPARTIDAS" en db.py)
+def _consulta_marcar_provisionados(supabase, usuario_id: str):
+    """Upsert de la fila de provisión del usuario."""
+    return supabase.table(TABLA_PROVISION).upsert(
+        {"usuario_id": usuario_id},
+        on_conflict="usuario_id",
+        ignore_duplicates=True,
+        returning=ReturnMethod.minimal,
+    )
 
-    result = (
-        supabase.table("categorias")
-        .select("nombre")
+
+def _pasos_provisionar(supabase, tabla: str, usuario_id: str, sugeridos: List[str]) -> Pasos:
+    """Si la tabla del usuario está vacía, le carga los sugeridos en un upsert."""
+    existing = yield (
+        supabase.table(tabla)
+        .select("id")
         .eq("usuario_id", usuario_id)
-        .order("nombre", desc=False)
-        .execute()
+        .limit(1)
+    )
+    if existing.data:
+        return
+    yield supabase.table(tabla).upsert(
+        [{"usuario_id": usuario_id, "nombre": nombre} for nombre in sugeridos],
+        on_conflict="usuario_id,nombre",
+        ignore_duplicates=True,
+        returning=ReturnMethod.minimal,
     )
-    return [r["nombre"] for r in (result.data or [])]
 
 
-def obtener_etiquetas(usuario_id: str) -> List[str]:
+@medir_db
+def provisionar_catalogos(usuario_id: str) -> bool:
+    """
+    Carga los catálogos sugeridos en las tablas del usuario que estén vacías
+    (un upsert en lote por tabla) y marca al usuario como provisionado.
+    Es idempotente: si se corta a mitad de camino, el próximo login completa
+    lo que falte. Devuelve True si todo salió bien.
+    """
     supabase = get_supabase_client()
-    _ensure_defaults(usuario_id)
+    ok = True
+
+    for tabla, sugeridos in SUGERIDOS.items():
+        try:
+            _ejecutar_pasos(_pasos_provisionar(supabase, tabla, usuario_id, sugeridos))
+        except Exception as e:
+            print(f"Error cargando {tabla}:", e)
+            ok = False
+
+    obtener_catalog_store.clear(usuario_id)
+
+    if ok:
+        try:
+            _consulta_marcar_provisionados(supabase, usuario_id).execute()
+        except Exception as e:
+            print("Error marcando catálogos provisionados:", e)
+    return ok
+
+
+# -------------------------------------------------------------------
+#   CATALOG STORE (cache por usuario, un solo request)
+# -------------------------------------------------------------------
+CATALOGOS = ("categorias", "etiquetas", "cuentas")
+
+
+@dataclass
+class CatalogStore:
+    """
+    Categorías, etiquetas y cuentas de un usuario, ordenadas por nombre.
+    Se carga una vez por usuario (ver obtener_catalog_store) y los
+    agregar_* la actualizan en el lugar, incluidos los índices de
+    autocompletado que se le hayan colgado (ver autocompletado.py).
+    """
+    usuario_id: str
+    listas: Dict[str, List[str]]
+    indices: Dict[str, Any] = field(default_factory=dict, repr=False)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def obtener(self, catalogo: str) -> List[str]:
+        with self.lock:
+            return list(self.listas.get(catalogo, []))
 
-    result = (
-        supabase.table("etiquetas")
+    def agregar(self, catalogo: str, nombre: str) -> None:
+        with self.lock:
+            lista = self.listas.setdefault(catalogo, [])
+            if nombre not in lista:
+                bisect.insort(lista, nombre)
+            indice = self.indices.get(catalogo)
+            if indice is not None:
+                indice.agregar(nombre)
+
+
+def _consulta_catalogos(supabase, usuario_id: str):
+    return supabase.rpc("obtener_catalogos", {"p_usuario_id": usuario_id})
+
+
+def _armar_catalogos(data: Any) -> Dict[str, List[str]]:
+    data = data or {}
+    return {catalogo: [str(n) for n in (data.get(catalogo) or [])] for catalogo in CATALOGOS}
+
+
+def _consulta_catalogo(supabase, catalogo: str, usuario_id: str):
+    """Query por tabla, para cuando no está la RPC obtener_catalogos."""
+    return (
+        supabase.table(catalogo)
         .select("nombre")
         .eq("usuario_id", usuario_id)
         .order("nombre", desc=False)
-        .execute()
     )
+
+
+def _armar_catalogo(result) -> List[str]:
     return [r["nombre"] for r in (result.data or [])]
 
 
-def obtener_cuentas(usuario_id: str) -> List[str]:
+@medir_db
+def _cargar_catalogos(usuario_id: str) -> Dict[str, List[str]]:
+    """
+    Trae los tres catálogos con la RPC obtener_catalogos (un request). Si la
+    función no está instalada, cae a una query por tabla.
+    """
     supabase = get_supabase_client()
-    _ensure_defaults(usuario_id)
 
-    result = (
-        supabase.table("cuentas")
-        .select("nombre")
-        .eq("usuario_id", usuario_id)
-        .order("nombre", desc=False)
-        .execute()
-    )
-    return [r["nombre"] for r in (result.data or [])]
+    try:
+        return _armar_catalogos(_consulta_catalogos(supabase, usuario_id).execute().data)
+    except Exception as e:
+        print("Error cargando catálogos (rpc), se usan queries por tabla:", e)
+
+    return {
+        catalogo: _armar_catalogo(_consulta_catalogo(supabase, catalogo, usuario_id).execute())
+        for catalogo in CATALOGOS
+    }
+
+
+@st.cache_resource(ttl=3600, max_entries=200, show_spinner=False)
+def obtener_catalog_store(usuario_id: str) -> CatalogStore:
+    return CatalogStore(usuario_id, _cargar_catalogos(usuario_id))
+
+
+# -------------------------------------------------------------------
+#   OBTENER LISTAS
+# -------------------------------------------------------------------
+def obtener_categorias(usuario_id: str) -> List[str]:
+    return obtener_catalog_store(usuario_id).obtener("categorias")
+
+
+def obtener_etiquetas(usuario_id: str) -> List[str]:
+    return obtener_catalog_store(usuario_id).obtener("etiquetas")
+
+
+def obtener_cuentas(usuario_id: str) -> List[str]:
+    return obtener_catalog_store(usuario_id).obtener("cuentas")
 
 
 # -------------------------------------------------------------------
 #   AGREGAR NUEVOS
 # -------------------------------------------------------------------
+def _consulta_agregar(supabase, tabla: str, usuario_id: str, nombre: str):
+    return supabase.table(tabla).upsert(
+        {"usuario_id": usuario_id, "nombre": nombre},
+        on_conflict="usuario_id,nombre"
+    )
+
+
+@medir_db
 def agregar_categoria(usuario_id: str, nombre: str):
     if not nombre.strip():
         return
     supabase = get_supabase_client()
-    supabase.table("categorias").upsert(
-        {"usuario_id": usuario_id, "nombre": nombre.strip()},
-        on_conflict="usuario_id,nombre"
-    ).execute()
+    _consulta_agregar(supabase, "categorias", usuario_id, nombre.strip()).execute()
+    obtener_catalog_store(usuario_id).agregar("categorias", nombre.strip())
 
 
+@medir_db
 def agregar_etiqueta(usuario_id: str, nombre: str):
     if not nombre.strip():
         return
     supabase = get_supabase_client()
-    supabase.table("etiquetas").upsert(
-        {"usuario_id": usuario_id, "nombre": nombre.strip()},
-        on_conflict="usuario_id,nombre"
-    ).execute()
+    _consulta_agregar(supabase, "etiquetas", usuario_id, nombre.strip()).execute()
+    obtener_catalog_store(usuario_id).agregar("etiquetas", nombre.strip())
 
 
+@medir_db
 def agregar_cuenta(usuario_id: str, nombre: str):
     if not nombre.strip():
         return
     supabase = get_supabase_client()
-    supabase.table("cuentas").upsert(
-        {"usuario_id": usuario_id, "nombre": nombre.strip()},
-        on_conflict="usuario_id,nombre"
-    ).execute()
\ No newline at end of file
+    _consulta_agregar(supabase, "cuentas", usuario_id, nombre.strip()).execute()
+    obtener_catalog_store(usuario_id).agregar("cuentas", nombre.strip())
\ No newline at end of file
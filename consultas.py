@@ -0,0 +1,265 @@
+import contextvars
+import inspect
+import os
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator, List, Optional
+
+import streamlit as st
+
+# ---------------------------------------------------------
+#  PRESUPUESTO DE ROUND TRIPS POR RERUN
+# ---------------------------------------------------------
+# El cliente de supabase_client.get_supabase_client() se envuelve con
+# ClienteContado: cada execute() de una query o RPC y cada llamada de auth
+# cuenta como un round trip (también con el cliente async de
+# supabase_client.get_supabase_client_async(), al terminar el await) y queda anotada en el rerun en curso, con la
+# página y la función (módulo.función) que la hizo.
+#
+# El rerun en curso lo abre metricas.medir_pagina alrededor del main() de
+# cada página; al terminar se guarda en st.session_state[CLAVE_SESION]. Las
+# cargas en hilos (carga_paralela.py, prefetch.py) se anotan en el rerun que
+# las lanzó; las queries hechas fuera de un rerun (scripts) no se cuentan.
+#
+# FINANZAS_DEBUG_CONSULTAS=1 muestra en el sidebar un panel con las
+# consultas del último rerun.
+DEBUG = (os.getenv("FINANZAS_DEBUG_CONSULTAS") or "").strip().lower() in ("1", "true", "si", "sí")
+
+CLAVE_SESION = "consultas_rerun"
+
+# Máximo de round trips por rerun de cada página, medidos con
+# scripts/verificar_consultas.py (2000 movimientos: las RPC de resumen y la
+# sincronización traen dos páginas). PRESUPUESTOS es un rerun típico, con las
+# caches tibias (p. ej. al tipear en un formulario); PRESUPUESTOS_CACHE_FRIA
+# es la primera carga de la página.
+PRESUPUESTOS = {
+    "app": 0,
+    "1_Resumen": 0,
+    "2_Movimientos": 0,
+    "3_Cargar": 0,
+    "4_Editar_Movimiento": 2,
+    "5_Movimientos_Borrados": 0,
+    "6_Restaurar_Movimiento": 0,
+    "7_Balanace_por_Cuenta": 0,
+    "8_Objetivos": 0,
+    "9_Dashboard_Mensual": 0,
+    "10_Alertas": 0,
+    "11_Importar_CSV": 0,
+    "12_Comparacion_Mensual": 0,
+    "13_Dashboard_Anual": 0,
+    "14_Forecast": 0,
+}
+
+PRESUPUESTOS_CACHE_FRIA = {
+    "app": 0,
+    "1_Resumen": 2,
+    "2_Movimientos": 4,
+    "3_Cargar": 2,
+    "4_Editar_Movimiento": 7,
+    "5_Movimientos_Borrados": 3,
+    "6_Restaurar_Movimiento": 3,
+    "7_Balanace_por_Cuenta": 2,
+    "8_Objetivos": 2,
+    "9_Dashboard_Mensual": 3,
+    "10_Alertas": 2,
+    "11_Importar_CSV": 0,
+    "12_Comparacion_Mensual": 2,
+    "13_Dashboard_Anual": 2,
+    "14_Forecast": 2,
+}
+
+# Módulos que no se consideran "quien llamó" a una consulta
+_INTERNOS = ("consultas", "metricas", "postgrest", "supabase", "gotrue", "supabase_auth", "httpx", "sqlite_client")
+
+# Funciones que solo ejecutan las queries de otra (db._ejecutar_pasos y su
+# par de db_async.py): la consulta se anota a nombre de quien las llamó
+_EJECUTORES = ("_ejecutar_pasos",)
+
+
+@dataclass
+class Consulta:
+    pagina: Optional[str]
+    funcion: str
+    operacion: str
+    segundos: float
+
+
+@dataclass
+class Rerun:
+    pagina: str
+    consultas: List[Consulta] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.consultas)
+
+
+_rerun_actual: contextvars.ContextVar = contextvars.ContextVar("rerun_actual", default=None)
+
+
+def _llamador() -> str:
+    """Primer módulo.función de la pila que no es del cliente ni de este módulo."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        modulo = frame.f_globals.get("__name__", "")
+        if modulo.split(".")[0] not in _INTERNOS and frame.f_code.co_name not in _EJECUTORES:
+            return f"{modulo}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "?"
+
+
+def _anotar(operacion: str, inicio: float) -> None:
+    rerun = _rerun_actual.get()
+    if rerun is None:
+        return
+    rerun.consultas.append(Consulta(rerun.pagina, _llamador(), operacion, time.perf_counter() - inicio))
+
+
+# ---------------------------------------------------------
+#  CLIENTE CONTADO
+# ---------------------------------------------------------
+class _Builder:
+    """Envuelve un builder de PostgREST: cada execute() es un round trip."""
+
+    def __init__(self, builder: Any, operacion: str):
+        self._builder = builder
+        self._operacion = operacion
+
+    def __getattr__(self, nombre: str) -> Any:
+        atributo = getattr(self._builder, nombre)
+        if not callable(atributo):
+            return _Builder(atributo, self._operacion) if hasattr(atributo, "execute") else atributo
+
+        def llamar(*args, **kwargs):
+            resultado = atributo(*args, **kwargs)
+            return _Builder(resultado, self._operacion) if hasattr(resultado, "execute") else resultado
+        return llamar
+
+    def execute(self, *args, **kwargs):
+        if inspect.iscoroutinefunction(self._builder.execute):
+            return self._execute_async(*args, **kwargs)
+        inicio = time.perf_counter()
+        try:
+            return self._builder.execute(*args, **kwargs)
+        finally:
+            _anotar(self._operacion, inicio)
+
+    async def _execute_async(self, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return await self._builder.execute(*args, **kwargs)
+        finally:
+            _anotar(self._operacion, inicio)
+
+
+class _Auth:
+    """
+    Envuelve el cliente de auth: cada método llamado es un round trip.
+    """
+
+    def __init__(self, auth: Any):
+        self._auth = auth
+
+    def __getattr__(self, nombre: str) -> Any:
+        atributo = getattr(self._auth, nombre)
+        if not callable(atributo):
+            return atributo
+
+        if inspect.iscoroutinefunction(atributo):
+            async def llamar_async(*args, **kwargs):
+                inicio = time.perf_counter()
+                try:
+                    return await atributo(*args, **kwargs)
+                finally:
+                    _anotar(f"auth.{nombre}", inicio)
+            return llamar_async
+
+        def llamar(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return atributo(*args, **kwargs)
+            finally:
+                _anotar(f"auth.{nombre}", inicio)
+        return llamar
+
+
+class ClienteContado:
+    """Cliente de Supabase (o SQLite) que anota sus round trips en el rerun en curso."""
+
+    def __init__(self, cliente: Any):
+        self._cliente = cliente
+        # El cliente PostgREST async no tiene auth (su auth() fija el token)
+        if not callable(getattr(cliente, "auth", None)):
+            self.auth = _Auth(cliente.auth)
+
+    def table(self, nombre: str) -> _Builder:
+        return _Builder(self._cliente.table(nombre), f"table.{nombre}")
+
+    from_ = table
+
+    def rpc(self, funcion: str, *args, **kwargs) -> _Builder:
+        return _Builder(self._cliente.rpc(funcion, *args, **kwargs), f"rpc.{funcion}")
+
+    def __getattr__(self, nombre: str) -> Any:
+        return getattr(self._cliente, nombre)
+
+
+# ---------------------------------------------------------
+#  RERUN EN CURSO
+# ---------------------------------------------------------
+@contextmanager
+def rerun(pagina: str) -> Iterator[Rerun]:
+    """Cuenta los round trips del bloque como un rerun de `pagina`."""
+    actual = Rerun(pagina)
+    token = _rerun_actual.set(actual)
+    completo = False
+    try:
+        yield actual
+        completo = True
+    finally:
+        _rerun_actual.reset(token)
+        try:
+            st.session_state[CLAVE_SESION] = actual
+        except Exception:
+            pass
+        if completo and DEBUG:
+            mostrar_panel(actual)
+
+
+def rerun_actual() -> Optional[Rerun]:
+    return _rerun_actual.get()
+
+
+def mostrar_panel(actual: Rerun) -> None:
+    """Panel de depuración en el sidebar con las consultas del rerun."""
+    maximo = PRESUPUESTOS.get(actual.pagina)
+    titulo = f"🔍 Consultas: {len(actual)}" + (f" / {maximo}" if maximo is not None else "")
+    excedido = len(actual) > PRESUPUESTOS_CACHE_FRIA.get(actual.pagina, len(actual))
+    with st.sidebar.expander(titulo, expanded=excedido):
+        if not actual.consultas:
+            st.caption("Este rerun no hizo consultas.")
+            return
+        st.dataframe(
+            [
+                {"función": c.funcion, "operación": c.operacion, "ms": round(c.segundos * 1000, 1)}
+                for c in actual.consultas
+            ],
+            use_container_width=True,
+            hide_index=True,
+        )
+
+
+def verificar_presupuesto(actual: Rerun, maximo: Optional[int] = None, cache_fria: bool = False) -> None:
+    """
+    Falla (AssertionError) si el rerun hizo más round trips que `maximo`
+    (por defecto, el presupuesto de su página en PRESUPUESTOS o, con
+    `cache_fria`, en PRESUPUESTOS_CACHE_FRIA), listando las consultas.
+    """
+    if maximo is None:
+        maximo = (PRESUPUESTOS_CACHE_FRIA if cache_fria else PRESUPUESTOS)[actual.pagina]
+    if len(actual) > maximo:
+        detalle = "\n".join(f"  - {c.funcion}: {c.operacion}" for c in actual.consultas)
+        raise AssertionError(
+            f"{actual.pagina} hizo {len(actual)} round trips (máximo {maximo}):\n{detalle}"
+        )
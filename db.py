@@ -1,12 +1,228 @@
+import base64
 import json
-from typing import Any, Dict, List, Optional
-import streamlit as st
+import os
+import re
+import unicodedata
+import uuid
+from typing import Any, Callable, Dict, Generator, List, Optional, Tuple
+from postgrest import CountMethod, ReturnMethod
 
 from supabase_client import get_supabase_client
+from metricas import medir_db
+from cache_usuarios import DATASET_ACTIVOS, DATASET_BORRADOS, invalidar_usuario
+
+# Tamaño de bloque por defecto para inserciones masivas (importación CSV)
+BULK_CHUNK_SIZE = 500
+
+# Filas por request al sincronizar (PostgREST limita las filas por respuesta)
+SYNC_PAGE_SIZE = 1000
+
+# Hasta este total el conteo "estimado" de PostgREST es exacto: es el
+# db-max-rows del servidor (FINANZAS_DB_MAX_ROWS; 1000 por defecto en Supabase)
+CONTEO_EXACTO_HASTA = int(os.getenv("FINANZAS_DB_MAX_ROWS") or SYNC_PAGE_SIZE)
+
+# Los totales del listado de movimientos son exactos. Con
+# FINANZAS_CONTEO_ESTIMADO_DESDE=N, los de más de N filas se toman de la
+# estimación del planificador de Postgres (0, por defecto: nunca)
+CONTEO_ESTIMADO_DESDE = int(os.getenv("FINANZAS_CONTEO_ESTIMADO_DESDE") or 0)
+
+
+def invalidar_cache_movimientos(usuario_id: str, *datasets: str) -> None:
+    """
+    Invalida la cache de movimientos del usuario tras una escritura.
+    Por defecto solo los activos; las cachés de otros usuarios no se tocan.
+    """
+    invalidar_usuario(usuario_id, *(datasets or (DATASET_ACTIVOS,)))
+
+
+def _parse_etiquetas_json(etiquetas_json: Any) -> List[str]:
+    """Acepta una lista o un string JSON y devuelve siempre una lista."""
+    if isinstance(etiquetas_json, list):
+        return etiquetas_json
+    try:
+        etiquetas = json.loads(etiquetas_json) if etiquetas_json else []
+        if not isinstance(etiquetas, list):
+            etiquetas = []
+    except Exception:
+        etiquetas = []
+    return etiquetas
+
+
+def _armar_movimiento(usuario_id: str, row: Dict[str, Any]) -> Dict[str, Any]:
+    """Arma el registro a insertar en 'movimientos' a partir de un dict de campos."""
+    monto = row.get("monto")
+    return {
+        "usuario_id": usuario_id,
+        "fecha": row.get("fecha"),
+        "categoria": row.get("categoria") or "Sin categoría",
+        "tipo": row.get("tipo"),
+        "descripcion": row.get("descripcion") or "",
+        "monto": float(monto) if monto is not None else 0.0,
+        "cuenta": row.get("cuenta") or "Sin cuenta",
+        "etiquetas": _parse_etiquetas_json(row.get("etiquetas")),
+        "deleted": False,
+    }
+
+
+def _campos(fecha, categoria, tipo, descripcion, monto, cuenta, etiquetas_json) -> Dict[str, Any]:
+    return {
+        "fecha": fecha,
+        "categoria": categoria,
+        "tipo": tipo,
+        "descripcion": descripcion,
+        "monto": monto,
+        "cuenta": cuenta,
+        "etiquetas": etiquetas_json,
+    }
+
+
+# ---------------------------------------------------------
+#  CONSULTAS COMPARTIDAS CON db_async.py
+# ---------------------------------------------------------
+# Cada operación se arma una sola vez, sin ejecutar nada: las _consulta_*
+# devuelven la query lista para execute(), las _armar_* dan forma a la
+# respuesta y, las que hacen varios round trips (paginación, reintentos),
+# son generadores _pasos_* que van dando cada query y reciben su respuesta
+# (o su excepción). Acá se ejecutan con execute() y en db_async.py con
+# await execute(); los mensajes de error y las invalidaciones de cache
+# quedan en cada función pública.
+Pasos = Generator[Any, Any, Any]
+
+
+def _ejecutar_pasos(pasos: Pasos) -> Any:
+    """Ejecuta las queries que da `pasos` y devuelve lo que devuelve el generador."""
+    try:
+        consulta = next(pasos)
+        while True:
+            try:
+                result = consulta.execute()
+            except Exception as e:
+                consulta = pasos.throw(e)
+            else:
+                consulta = pasos.send(result)
+    except StopIteration as fin:
+        return fin.value
+
+
+def _consulta_insertar(supabase, usuario_id: str, campos: Dict[str, Any]):
+    return supabase.table("movimientos").insert(_armar_movimiento(usuario_id, campos))
+
+
+def _reporte_sin_cliente(rows: List[Dict[str, Any]], e: Exception) -> Dict[str, Any]:
+    """Reporte de insertar_movimientos_bulk cuando no se pudo obtener el cliente."""
+    filas = [row.get("fila", i) for i, row in enumerate(rows)]
+    return {
+        "insertados": 0,
+        "errores": len(filas),
+        "bloques": [{
+            "bloque": 0,
+            "inicio": 0,
+            "fin": len(rows),
+            "insertados": [],
+            "fallidos": [{"fila": f, "error": str(e)} for f in filas],
+        }],
+    }
+
+
+def _consulta_insertar_idempotente(supabase, datos):
+    return supabase.table("movimientos").upsert(
+        datos,
+        on_conflict="id_importacion",
+        ignore_duplicates=True,
+        returning=ReturnMethod.minimal,
+    )
+
+
+def _pasos_insertar_bloque(
+    supabase,
+    usuario_id: str,
+    n_bloque: int,
+    inicio: int,
+    bloque: List[Dict[str, Any]],
+) -> Pasos:
+    """
+    Inserta un bloque con un único insert; si falla, reintenta fila por fila.
+    Devuelve el reporte del bloque.
+
+    Cada fila lleva un id_importacion generado acá y se inserta con upsert
+    sin pisar (sql/009): si el bloque falló después de grabarse (un timeout
+    tras el commit), el reintento saltea las filas que ya están en vez de
+    duplicarlas.
+    """
+    filas = [row.get("fila", inicio + i) for i, row in enumerate(bloque)]
+    info: Dict[str, Any] = {
+        "bloque": n_bloque,
+        "inicio": inicio,
+        "fin": inicio + len(bloque),
+        "insertados": [],
+        "fallidos": [],
+    }
+
+    datos = []
+    filas_validas = []
+    for fila, row in zip(filas, bloque):
+        try:
+            datos.append({**_armar_movimiento(usuario_id, row), "id_importacion": str(uuid.uuid4())})
+            filas_validas.append(fila)
+        except Exception as e:
+            info["fallidos"].append({"fila": fila, "error": str(e)})
+
+    if datos:
+        try:
+            yield _consulta_insertar_idempotente(supabase, datos)
+            info["insertados"] = filas_validas
+        except Exception as e:
+            print(f"[DB] Error al insertar bloque {n_bloque}, reintentando fila por fila: {e}")
+            for fila, data in zip(filas_validas, datos):
+                try:
+                    yield _consulta_insertar_idempotente(supabase, data)
+                    info["insertados"].append(fila)
+                except Exception as e_fila:
+                    info["fallidos"].append({"fila": fila, "error": str(e_fila)})
+    return info
+
+
+def _sumar_bloque(reporte: Dict[str, Any], info: Dict[str, Any]) -> None:
+    reporte["insertados"] += len(info["insertados"])
+    reporte["errores"] += len(info["fallidos"])
+    reporte["bloques"].append(info)
+
+
+def _consulta_movimientos(supabase, usuario_id: str, deleted: bool):
+    return (
+        supabase.table("movimientos")
+        .select("*")
+        .eq("usuario_id", usuario_id)
+        .eq("deleted", deleted)
+        .order("fecha", desc=True)
+        .order("id", desc=True)
+    )
+
+
+def _pasos_modificados(supabase, usuario_id: str, desde: Optional[str]) -> Pasos:
+    """Filas con updated_at >= `desde`, de a SYNC_PAGE_SIZE con paginación por id."""
+    filas: List[Dict[str, Any]] = []
+    ultimo_id = None
+    while True:
+        query = supabase.table("movimientos").select("*").eq("usuario_id", usuario_id)
+        if desde:
+            query = query.gte("updated_at", desde)
+        if ultimo_id is not None:
+            query = query.gt("id", ultimo_id)
+
+        result = yield query.order("id", desc=False).limit(SYNC_PAGE_SIZE)
+        pagina = result.data or []
+        filas.extend(pagina)
+
+        if len(pagina) < SYNC_PAGE_SIZE:
+            return filas
+        ultimo_id = pagina[-1]["id"]
+
 
 # ---------------------------------------------------------
 #  INSERTAR MOVIMIENTO
 # ---------------------------------------------------------
+@medir_db
 def insertar_movimiento(
     usuario_id: str,
     fecha: str,
@@ -24,29 +240,11 @@ def insertar_movimiento(
     try:
         supabase = get_supabase_client()
 
-        try:
-            etiquetas = json.loads(etiquetas_json) if etiquetas_json else []
-            if not isinstance(etiquetas, list):
-                etiquetas = []
-        except Exception:
-            etiquetas = []
+        campos = _campos(fecha, categoria, tipo, descripcion, monto, cuenta, etiquetas_json)
+        result = _consulta_insertar(supabase, usuario_id, campos).execute()
 
-        data = {
-            "usuario_id": usuario_id,
-            "fecha": fecha,
-            "categoria": categoria or "Sin categoría",
-            "tipo": tipo,
-            "descripcion": descripcion or "",
-            "monto": float(monto) if monto is not None else 0.0,
-            "cuenta": cuenta or "Sin cuenta",
-            "etiquetas": etiquetas,
-            "deleted": False,
-        }
-
-        result = supabase.table("movimientos").insert(data).execute()
-
-        # Invalidar cache tras inserción
-        st.cache_data.clear()
+        # Invalidar cache del usuario tras inserción
+        invalidar_cache_movimientos(usuario_id)
         return result.data is not None
 
     except Exception as e:
@@ -54,22 +252,68 @@ def insertar_movimiento(
         return False
 
 
+# ---------------------------------------------------------
+#  INSERTAR MOVIMIENTOS EN LOTE (importación CSV)
+# ---------------------------------------------------------
+@medir_db
+def insertar_movimientos_bulk(
+    usuario_id: str,
+    rows: List[Dict[str, Any]],
+    chunk_size: int = BULK_CHUNK_SIZE,
+    on_chunk: Optional[Callable[[Dict[str, Any]], None]] = None,
+    invalidar_cache: bool = True,
+) -> Dict[str, Any]:
+    """
+    Inserta muchos movimientos enviando un único insert por bloque de
+    `chunk_size` filas. Cada fila es un dict con las mismas claves que
+    recibe insertar_movimiento (etiquetas puede ser lista o JSON).
+
+    Si el insert de un bloque falla, se reintenta fila por fila para
+    identificar exactamente qué filas fallaron y por qué.
+
+    Devuelve un dict con:
+      - insertados: total de filas insertadas (int)
+      - errores: total de filas con error (int)
+      - bloques: lista con el reporte de cada bloque:
+          {"bloque", "inicio", "fin", "insertados": [filas], "fallidos": [{"fila", "error"}]}
+
+    Las filas se identifican por su clave "fila" si la traen, o por su
+    posición en `rows`. `on_chunk` se llama con el reporte de cada bloque
+    (útil para mostrar progreso). La cache se invalida una sola vez al final,
+    salvo que `invalidar_cache` sea False (el llamador lo hará por su cuenta).
+    """
+    chunk_size = max(1, int(chunk_size))
+    reporte: Dict[str, Any] = {"insertados": 0, "errores": 0, "bloques": []}
+
+    try:
+        supabase = get_supabase_client()
+    except Exception as e:
+        print(f"[DB] Error al insertar movimientos en lote: {e}")
+        return _reporte_sin_cliente(rows, e)
+
+    for n_bloque, inicio in enumerate(range(0, len(rows), chunk_size)):
+        bloque = rows[inicio:inicio + chunk_size]
+        info = _ejecutar_pasos(_pasos_insertar_bloque(supabase, usuario_id, n_bloque, inicio, bloque))
+        _sumar_bloque(reporte, info)
+
+        if on_chunk is not None:
+            on_chunk(info)
+
+    # Invalidar cache una sola vez tras la importación
+    if invalidar_cache and reporte["insertados"]:
+        invalidar_cache_movimientos(usuario_id)
+    return reporte
+
+
 # ---------------------------------------------------------
 #  OBTENER MOVIMIENTOS (ACTIVOS) - legacy (trae todo)
 # ---------------------------------------------------------
+@medir_db
 def obtener_movimientos(usuario_id: str) -> List[Dict[str, Any]]:
     try:
         supabase = get_supabase_client()
 
-        result = (
-            supabase.table("movimientos")
-            .select("*")
-            .eq("usuario_id", usuario_id)
-            .eq("deleted", False)
-            .order("fecha", desc=True)
-            .order("id", desc=True)
-            .execute()
-        )
+        result = _consulta_movimientos(supabase, usuario_id, deleted=False).execute()
 
         return result.data or []
 
@@ -78,9 +322,104 @@ def obtener_movimientos(usuario_id: str) -> List[Dict[str, Any]]:
         return []
 
 
+# ---------------------------------------------------------
+#  OBTENER MOVIMIENTOS MODIFICADOS (sincronización incremental)
+# ---------------------------------------------------------
+@medir_db
+def obtener_movimientos_modificados(
+    usuario_id: str,
+    desde: Optional[str] = None,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Devuelve las filas del usuario (activas y borradas) con
+    updated_at >= `desde`. Sin `desde` devuelve todas las filas del usuario.
+
+    Recorre el resultado de a SYNC_PAGE_SIZE filas con paginación por id,
+    así una sincronización cuesta lo mismo que la cantidad de cambios.
+    Devuelve None si hubo error (para distinguirlo de "sin cambios").
+    """
+    try:
+        supabase = get_supabase_client()
+        return _ejecutar_pasos(_pasos_modificados(supabase, usuario_id, desde))
+
+    except Exception as e:
+        print(f"[DB] Error al obtener movimientos modificados: {e}")
+        return None
+
+
 # ---------------------------------------------------------
 #  OBTENER MOVIMIENTOS PAGINADOS (server-side)
 # ---------------------------------------------------------
+def normalizar_busqueda(texto: Optional[str]) -> str:
+    """
+    Texto en minúsculas, sin acentos y solo con letras, números y espacios.
+    Es la misma normalización que la columna descripcion_busqueda (sql/006).
+    """
+    descompuesto = unicodedata.normalize("NFKD", str(texto or "").lower())
+    sin_acentos = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return re.sub(r"[^a-z0-9 ]", " ", sin_acentos).strip()
+
+
+def _aplicar_filtros(
+    query,
+    fecha_desde: Optional[str] = None,
+    fecha_hasta: Optional[str] = None,
+    cuenta: Optional[str] = None,
+    categoria: Optional[str] = None,
+    texto: Optional[str] = None,
+):
+    """
+    Filtros del listado de movimientos ("Todas" equivale a no filtrar).
+    `texto` busca en la descripción: cada palabra tiene que aparecer, sin
+    importar mayúsculas ni acentos (índice de trigramas de sql/006).
+    """
+    if fecha_desde:
+        query = query.gte("fecha", fecha_desde)
+    if fecha_hasta:
+        query = query.lte("fecha", fecha_hasta)
+    if cuenta and cuenta != "Todas":
+        query = query.eq("cuenta", cuenta)
+    if categoria and categoria != "Todas":
+        query = query.eq("categoria", categoria)
+    for palabra in normalizar_busqueda(texto).split():
+        query = query.ilike("descripcion_busqueda", f"%{palabra}%")
+    return query
+
+
+def _consulta_paginados(
+    supabase,
+    usuario_id: str,
+    limit: int,
+    offset: int,
+    fecha_desde: Optional[str] = None,
+    fecha_hasta: Optional[str] = None,
+    cuenta: Optional[str] = None,
+    categoria: Optional[str] = None,
+):
+    query = supabase.table("movimientos").select("*", count="exact").eq("usuario_id", usuario_id).eq("deleted", False)
+    query = _aplicar_filtros(query, fecha_desde, fecha_hasta, cuenta, categoria)
+
+    # Order consistent: fecha desc, id desc
+    query = query.order("fecha", desc=True).order("id", desc=True)
+
+    start = int(offset)
+    end = int(offset + limit - 1)
+    return query.range(start, end)
+
+
+def _armar_paginados(result, offset: int) -> Dict[str, Any]:
+    rows = result.data or []
+    total = getattr(result, "count", None)
+    # Si count no está disponible, intentar inferir (menos preciso)
+    if total is None:
+        # Si estamos en la primera página y rows < limit, asumimos total = len(rows)
+        # No es perfecto pero evita None
+        total = len(rows) if offset == 0 else None
+
+    return {"data": rows, "count": total or 0}
+
+
+@medir_db
 def obtener_movimientos_paginados(
     usuario_id: str,
     limit: int = 50,
@@ -101,56 +440,306 @@ def obtener_movimientos_paginados(
     try:
         supabase = get_supabase_client()
 
-        query = supabase.table("movimientos").select("*", count="exact").eq("usuario_id", usuario_id).eq("deleted", False)
+        query = _consulta_paginados(supabase, usuario_id, limit, offset, fecha_desde, fecha_hasta, cuenta, categoria)
+        return _armar_paginados(query.execute(), offset)
 
-        if fecha_desde:
-            # Supabase/Postgres:>= fecha_desde
-            query = query.gte("fecha", fecha_desde)
-        if fecha_hasta:
-            query = query.lte("fecha", fecha_hasta)
-        if cuenta and cuenta != "Todas":
-            query = query.eq("cuenta", cuenta)
-        if categoria and categoria != "Todas":
-            query = query.eq("categoria", categoria)
+    except Exception as e:
+        print(f"[DB] Error al obtener movimientos paginados: {e}")
+        return {"data": [], "count": 0}
 
-        # Order consistent: fecha desc, id desc
-        query = query.order("fecha", desc=True).order("id", desc=True)
 
-        start = int(offset)
-        end = int(offset + limit - 1)
-        result = query.range(start, end).execute()
+# ---------------------------------------------------------
+#  OBTENER MOVIMIENTOS POR CURSOR (keyset)
+# ---------------------------------------------------------
+# El cursor guarda la última (o primera) fila vista como (fecha, id) y la
+# dirección. Cada página es "las `limit` filas anteriores/posteriores a esa
+# clave" según el orden fecha desc, id desc; con el índice de sql/004 el
+# costo no depende de qué tan profunda sea la página.
+CURSOR_SIGUIENTE = "sig"
+CURSOR_ANTERIOR = "ant"
+
+
+def _codificar_cursor(fila: Dict[str, Any], direccion: str) -> str:
+    datos = json.dumps({"f": fila.get("fecha"), "i": fila.get("id"), "d": direccion})
+    return base64.urlsafe_b64encode(datos.encode("utf-8")).decode("ascii")
 
-        rows = result.data or []
-        total = getattr(result, "count", None)
-        # Si count no está disponible, intentar inferir (menos preciso)
-        if total is None:
-            # Si estamos en la primera página y rows < limit, asumimos total = len(rows)
-            # No es perfecto pero evita None
-            total = len(rows) if offset == 0 else None
 
-        return {"data": rows, "count": total or 0}
+def _decodificar_cursor(cursor: str) -> Dict[str, Any]:
+    datos = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+    if datos.get("d") not in (CURSOR_SIGUIENTE, CURSOR_ANTERIOR) or datos.get("f") is None:
+        raise ValueError(f"Cursor inválido: {cursor}")
+    return datos
+
+
+def _consulta_keyset(
+    supabase,
+    usuario_id: str,
+    limit: int,
+    cursor: Optional[str] = None,
+    fecha_desde: Optional[str] = None,
+    fecha_hasta: Optional[str] = None,
+    cuenta: Optional[str] = None,
+    categoria: Optional[str] = None,
+    texto: Optional[str] = None,
+) -> Tuple[Any, bool]:
+    """Query de la página de `cursor` y si recorre hacia atrás."""
+    query = (
+        supabase.table("movimientos")
+        .select("*")
+        .eq("usuario_id", usuario_id)
+        .eq("deleted", False)
+    )
+    query = _aplicar_filtros(query, fecha_desde, fecha_hasta, cuenta, categoria, texto)
+
+    hacia_atras = False
+    if cursor:
+        clave = _decodificar_cursor(cursor)
+        hacia_atras = clave["d"] == CURSOR_ANTERIOR
+        op = "gt" if hacia_atras else "lt"
+        fecha, mov_id = clave["f"], int(clave["i"])
+        query = query.or_(f"fecha.{op}.{fecha},and(fecha.eq.{fecha},id.{op}.{mov_id})")
+
+    # Una fila extra para saber si hay más en esa dirección
+    query = (
+        query.order("fecha", desc=not hacia_atras)
+        .order("id", desc=not hacia_atras)
+        .limit(int(limit) + 1)
+    )
+    return query, hacia_atras
+
+
+def _armar_pagina(
+    rows: List[Dict[str, Any]],
+    limit: int,
+    cursor: Optional[str],
+    hacia_atras: bool,
+) -> Dict[str, Any]:
+    """Página con sus cursores vecinos a partir de las filas de _consulta_keyset."""
+    limit = int(limit)
+    hay_mas = len(rows) > limit
+    rows = rows[:limit]
+    if hacia_atras:
+        rows.reverse()
+
+    if not rows:
+        return {"data": [], "siguiente": None, "anterior": None}
+
+    hay_siguiente = hay_mas if not hacia_atras else True
+    hay_anterior = hay_mas if hacia_atras else cursor is not None
+
+    return {
+        "data": rows,
+        "siguiente": _codificar_cursor(rows[-1], CURSOR_SIGUIENTE) if hay_siguiente else None,
+        "anterior": _codificar_cursor(rows[0], CURSOR_ANTERIOR) if hay_anterior else None,
+    }
+
+
+@medir_db
+def obtener_movimientos_keyset(
+    usuario_id: str,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    fecha_desde: Optional[str] = None,
+    fecha_hasta: Optional[str] = None,
+    cuenta: Optional[str] = None,
+    categoria: Optional[str] = None,
+    texto: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Página de movimientos activos ordenados por fecha desc, id desc.
+    Sin cursor devuelve la primera página; `texto` filtra por descripción.
+
+    Devuelve un dict con:
+      - data: lista de filas (dicts)
+      - siguiente / anterior: cursores opacos para las páginas vecinas,
+        o None si no hay más filas en esa dirección
+
+    No cuenta el total de filas; para eso está contar_movimientos.
+    Devuelve None si hubo error (para distinguirlo de una página vacía).
+    """
+    try:
+        supabase = get_supabase_client()
+
+        query, hacia_atras = _consulta_keyset(
+            supabase, usuario_id, limit, cursor, fecha_desde, fecha_hasta, cuenta, categoria, texto
+        )
+        return _armar_pagina(query.execute().data or [], limit, cursor, hacia_atras)
 
     except Exception as e:
-        print(f"[DB] Error al obtener movimientos paginados: {e}")
-        return {"data": [], "count": 0}
+        print(f"[DB] Error al obtener movimientos por cursor: {e}")
+        return None
+
+
+def _consulta_conteo(
+    supabase,
+    usuario_id: str,
+    fecha_desde: Optional[str] = None,
+    fecha_hasta: Optional[str] = None,
+    cuenta: Optional[str] = None,
+    categoria: Optional[str] = None,
+    texto: Optional[str] = None,
+    estimado: bool = False,
+):
+    metodo = CountMethod.estimated if estimado else CountMethod.exact
+    query = (
+        supabase.table("movimientos")
+        .select("id", count=metodo, head=True)
+        .eq("usuario_id", usuario_id)
+        .eq("deleted", False)
+    )
+    return _aplicar_filtros(query, fecha_desde, fecha_hasta, cuenta, categoria, texto)
+
+
+@medir_db
+def contar_movimientos(
+    usuario_id: str,
+    fecha_desde: Optional[str] = None,
+    fecha_hasta: Optional[str] = None,
+    cuenta: Optional[str] = None,
+    categoria: Optional[str] = None,
+    texto: Optional[str] = None,
+    estimado: bool = False,
+) -> Optional[int]:
+    """
+    Cantidad de movimientos activos que coinciden con los filtros (sin traer
+    filas). Con `estimado`, PostgREST cuenta exacto hasta su límite de filas
+    por respuesta (CONTEO_EXACTO_HASTA) y por encima usa la estimación del
+    planificador de Postgres, que no recorre las filas.
+    Devuelve None si hubo error (para distinguirlo de "sin movimientos").
+    """
+    try:
+        supabase = get_supabase_client()
+
+        query = _consulta_conteo(supabase, usuario_id, fecha_desde, fecha_hasta, cuenta, categoria, texto, estimado)
+        return int(query.execute().count or 0)
+
+    except Exception as e:
+        print(f"[DB] Error al contar movimientos: {e}")
+        return None
+
+
+# ---------------------------------------------------------
+#  RESÚMENES AGREGADOS (RPC, ver sql/002 y sql/003)
+# ---------------------------------------------------------
+def _pasos_rpc_paginado(supabase, funcion: str, params: Dict[str, Any]) -> Pasos:
+    """Una RPC que devuelve filas, de a SYNC_PAGE_SIZE por request."""
+    filas: List[Dict[str, Any]] = []
+    inicio = 0
+    while True:
+        result = yield supabase.rpc(funcion, params).range(inicio, inicio + SYNC_PAGE_SIZE - 1)
+        pagina = result.data or []
+        filas.extend(pagina)
+        if len(pagina) < SYNC_PAGE_SIZE:
+            return filas
+        inicio += SYNC_PAGE_SIZE
+
+
+def _params_resumen(usuario_id: str, fecha_desde: Optional[str], fecha_hasta: Optional[str]) -> Dict[str, Any]:
+    return {"p_usuario_id": usuario_id, "p_desde": fecha_desde, "p_hasta": fecha_hasta}
+
+
+def _consulta_reconstruir_resumen(supabase, usuario_id: Optional[str]):
+    return supabase.rpc("reconstruir_resumen_mensual", {"p_usuario_id": usuario_id})
+
+
+def _consulta_uso_catalogos(supabase, usuario_id: str):
+    return supabase.rpc("uso_catalogos", {"p_usuario_id": usuario_id})
+
+
+def _armar_uso_catalogos(data: Any) -> Dict[str, Dict[str, int]]:
+    data = data or {}
+    return {
+        catalogo: {str(nombre): int(cantidad) for nombre, cantidad in (data.get(catalogo) or {}).items()}
+        for catalogo in ("categorias", "etiquetas")
+    }
+
+
+@medir_db
+def obtener_resumen_movimientos(
+    usuario_id: str,
+    fecha_desde: Optional[str] = None,
+    fecha_hasta: Optional[str] = None,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Totales de movimientos activos agrupados por mes, categoría y cuenta,
+    calculados en Postgres. Cada fila trae:
+      mes ("YYYY-MM"), anio, categoria, cuenta, ingresos, gastos, balance, cantidad
+
+    Devuelve None si la RPC no está disponible o falla.
+    """
+    try:
+        supabase = get_supabase_client()
+        return _ejecutar_pasos(_pasos_rpc_paginado(
+            supabase, "resumen_movimientos", _params_resumen(usuario_id, fecha_desde, fecha_hasta)
+        ))
+    except Exception as e:
+        print(f"[DB] Error al obtener resumen de movimientos: {e}")
+        return None
+
+
+@medir_db
+def obtener_resumen_diario(
+    usuario_id: str,
+    fecha_desde: Optional[str] = None,
+    fecha_hasta: Optional[str] = None,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Totales de movimientos activos por día (fecha, ingresos, gastos,
+    balance, cantidad), calculados en Postgres. None si falla.
+    """
+    try:
+        supabase = get_supabase_client()
+        return _ejecutar_pasos(_pasos_rpc_paginado(
+            supabase, "resumen_diario", _params_resumen(usuario_id, fecha_desde, fecha_hasta)
+        ))
+    except Exception as e:
+        print(f"[DB] Error al obtener resumen diario: {e}")
+        return None
+
+
+@medir_db
+def reconstruir_resumen_mensual(usuario_id: Optional[str] = None) -> Optional[int]:
+    """
+    Recalcula desde cero el rollup movimientos_resumen_mensual (ver
+    sql/003_resumen_mensual.sql). Sin usuario_id reconstruye el de todos los
+    usuarios, lo que requiere la service role key. Devuelve la cantidad de
+    filas del rollup generadas, o None si falla.
+    """
+    try:
+        supabase = get_supabase_client()
+        result = _consulta_reconstruir_resumen(supabase, usuario_id).execute()
+        if usuario_id:
+            invalidar_cache_movimientos(usuario_id)
+        return int(result.data or 0)
+    except Exception as e:
+        print(f"[DB] Error al reconstruir resumen mensual: {e}")
+        return None
+
+
+@medir_db
+def obtener_uso_catalogos(usuario_id: str) -> Optional[Dict[str, Dict[str, int]]]:
+    """
+    Cantidad de movimientos activos por categoría y por etiqueta
+    ({"categorias": {...}, "etiquetas": {...}}), calculada en Postgres con
+    la RPC uso_catalogos (sql/008). None si la RPC no está disponible o falla.
+    """
+    try:
+        supabase = get_supabase_client()
+        return _armar_uso_catalogos(_consulta_uso_catalogos(supabase, usuario_id).execute().data)
+    except Exception as e:
+        print(f"[DB] Error al obtener uso de catálogos: {e}")
+        return None
 
 
 # ---------------------------------------------------------
 #  OBTENER MOVIMIENTOS BORRADOS
 # ---------------------------------------------------------
+@medir_db
 def obtener_movimientos_borrados(usuario_id: str) -> List[Dict[str, Any]]:
     try:
         supabase = get_supabase_client()
 
-        result = (
-            supabase.table("movimientos")
-            .select("*")
-            .eq("usuario_id", usuario_id)
-            .eq("deleted", True)
-            .order("fecha", desc=True)
-            .order("id", desc=True)
-            .execute()
-        )
+        result = _consulta_movimientos(supabase, usuario_id, deleted=True).execute()
 
         return result.data or []
 
@@ -162,18 +751,22 @@ def obtener_movimientos_borrados(usuario_id: str) -> List[Dict[str, Any]]:
 # ---------------------------------------------------------
 #  OBTENER UN MOVIMIENTO POR ID
 # ---------------------------------------------------------
+def _consulta_por_id(supabase, usuario_id: str, movimiento_id: int):
+    return (
+        supabase.table("movimientos")
+        .select("*")
+        .eq("usuario_id", usuario_id)
+        .eq("id", movimiento_id)
+        .single()
+    )
+
+
+@medir_db
 def obtener_movimiento_por_id(usuario_id: str, movimiento_id: int) -> Optional[Dict[str, Any]]:
     try:
         supabase = get_supabase_client()
 
-        result = (
-            supabase.table("movimientos")
-            .select("*")
-            .eq("usuario_id", usuario_id)
-            .eq("id", movimiento_id)
-            .single()
-            .execute()
-        )
+        result = _consulta_por_id(supabase, usuario_id, movimiento_id).execute()
 
         return result.data
 
@@ -185,6 +778,23 @@ def obtener_movimiento_por_id(usuario_id: str, movimiento_id: int) -> Optional[D
 # ---------------------------------------------------------
 #  ACTUALIZAR MOVIMIENTO
 # ---------------------------------------------------------
+def _consulta_actualizar(supabase, usuario_id: str, movimiento_id: int, data: Dict[str, Any]):
+    return (
+        supabase.table("movimientos")
+        .update(data)
+        .eq("id", movimiento_id)
+        .eq("usuario_id", usuario_id)
+    )
+
+
+def _datos_actualizacion(campos: Dict[str, Any]) -> Dict[str, Any]:
+    """Los mismos valores por defecto que al insertar, sin usuario_id ni deleted."""
+    data = _armar_movimiento("", campos)
+    del data["usuario_id"], data["deleted"]
+    return data
+
+
+@medir_db
 def actualizar_movimiento(
     usuario_id: str,
     movimiento_id: int,
@@ -199,33 +809,11 @@ def actualizar_movimiento(
     try:
         supabase = get_supabase_client()
 
-        try:
-            etiquetas = json.loads(etiquetas_json) if etiquetas_json else []
-            if not isinstance(etiquetas, list):
-                etiquetas = []
-        except Exception:
-            etiquetas = []
-
-        data = {
-            "fecha": fecha,
-            "categoria": categoria or "Sin categoría",
-            "tipo": tipo,
-            "descripcion": descripcion or "",
-            "monto": float(monto) if monto is not None else 0.0,
-            "cuenta": cuenta or "Sin cuenta",
-            "etiquetas": etiquetas,
-        }
-
-        result = (
-            supabase.table("movimientos")
-            .update(data)
-            .eq("id", movimiento_id)
-            .eq("usuario_id", usuario_id)
-            .execute()
-        )
+        data = _datos_actualizacion(_campos(fecha, categoria, tipo, descripcion, monto, cuenta, etiquetas_json))
+        result = _consulta_actualizar(supabase, usuario_id, movimiento_id, data).execute()
 
-        # Invalidar cache tras actualización
-        st.cache_data.clear()
+        # Invalidar cache del usuario tras actualización
+        invalidar_cache_movimientos(usuario_id)
         return result.data is not None
 
     except Exception as e:
@@ -236,20 +824,15 @@ def actualizar_movimiento(
 # ---------------------------------------------------------
 #  ELIMINAR (LÓGICO) MOVIMIENTO
 # ---------------------------------------------------------
+@medir_db
 def eliminar_movimiento_logico(usuario_id: str, movimiento_id: int) -> bool:
     try:
         supabase = get_supabase_client()
 
-        result = (
-            supabase.table("movimientos")
-            .update({"deleted": True})
-            .eq("id", movimiento_id)
-            .eq("usuario_id", usuario_id)
-            .execute()
-        )
+        result = _consulta_actualizar(supabase, usuario_id, movimiento_id, {"deleted": True}).execute()
 
-        # Invalidar cache tras eliminación lógica
-        st.cache_data.clear()
+        # Invalidar cache del usuario tras eliminación lógica (pasa de activos a borrados)
+        invalidar_cache_movimientos(usuario_id, DATASET_ACTIVOS, DATASET_BORRADOS)
         return result.data is not None
 
     except Exception as e:
@@ -260,20 +843,15 @@ def eliminar_movimiento_logico(usuario_id: str, movimiento_id: int) -> bool:
 # ---------------------------------------------------------
 #  RESTAURAR MOVIMIENTO
 # ---------------------------------------------------------
+@medir_db
 def restaurar_movimiento(usuario_id: str, movimiento_id: int) -> bool:
     try:
         supabase = get_supabase_client()
 
-        result = (
-            supabase.table("movimientos")
-            .update({"deleted": False})
-            .eq("id", movimiento_id)
-            .eq("usuario_id", usuario_id)
-            .execute()
-        )
+        result = _consulta_actualizar(supabase, usuario_id, movimiento_id, {"deleted": False}).execute()
 
-        # Invalidar cache tras restaurar
-        st.cache_data.clear()
+        # Invalidar cache del usuario tras restaurar (pasa de borrados a activos)
+        invalidar_cache_movimientos(usuario_id, DATASET_ACTIVOS, DATASET_BORRADOS)
         return result.data is not None
 
     except Exception as e:
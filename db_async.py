@@ -0,0 +1,640 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+import streamlit as st
+
+import catalogos
+from catalogos import (
+    CATALOGOS,
+    SUGERIDOS,
+    _armar_catalogo,
+    _armar_catalogos,
+    _consulta_agregar,
+    _consulta_catalogo,
+    _consulta_catalogos,
+    _consulta_marcar_provisionados,
+    _pasos_provisionar,
+)
+from auth import SesionInvalida, token_vigente
+from supabase_client import get_supabase_client_async
+from metricas import medir_db
+from cache_usuarios import DATASET_ACTIVOS, DATASET_BORRADOS
+from db import (
+    BULK_CHUNK_SIZE,
+    Pasos,
+    _armar_pagina,
+    _armar_paginados,
+    _armar_uso_catalogos,
+    _campos,
+    _consulta_actualizar,
+    _consulta_conteo,
+    _consulta_insertar,
+    _consulta_keyset,
+    _consulta_movimientos,
+    _consulta_paginados,
+    _consulta_por_id,
+    _consulta_reconstruir_resumen,
+    _consulta_uso_catalogos,
+    _datos_actualizacion,
+    _params_resumen,
+    _pasos_insertar_bloque,
+    _pasos_modificados,
+    _pasos_rpc_paginado,
+    _reporte_sin_cliente,
+    _sumar_bloque,
+    invalidar_cache_movimientos,
+)
+
+# ---------------------------------------------------------
+#  ACCESO A DATOS ASYNC (asyncio)
+# ---------------------------------------------------------
+# Las mismas lecturas y escrituras de db.py y catalogos.py como corrutinas,
+# sobre el cliente async de supabase_client.get_supabase_client_async().
+# Cada función tiene el mismo nombre, parámetros y valor de retorno que su
+# par síncrono, y los mismos errores ([DB] Error ...) e invalidaciones de
+# cache. Las queries y el armado de las respuestas son los de db.py y
+# catalogos.py; acá solo se esperan sus execute(). Sirven para procesos en
+# lote, importaciones y endpoints que hacen muchas consultas a la vez sin
+# un hilo por consulta.
+#
+# Todas reciben `token`, el access token del usuario con el que consultar
+# (para que apliquen sus políticas RLS); sin token consultan como anónimo.
+# En una página, el de la sesión está en token_de_la_sesion(), que lo
+# renueva si venció. Si la base rechaza el token (vencido o inválido), las
+# funciones no devuelven un resultado vacío: lanzan auth.SesionInvalida.
+# Desde una corrutina:
+#
+#   movimientos, borrados = await asyncio.gather(
+#       obtener_movimientos(uid, token=token), obtener_movimientos_borrados(uid, token=token)
+#   )
+#
+# Desde una página de Streamlit (código síncrono) se usan con el runner:
+#
+#   token = token_de_la_sesion()
+#   movimientos, borrados = ejecutar_varias(
+#       obtener_movimientos(uid, token=token), obtener_movimientos_borrados(uid, token=token)
+#   )
+
+# Bloques de insertar_movimientos_bulk que viajan a la vez
+BULK_CONCURRENCIA = 4
+
+# Códigos de PostgREST para un token vencido, inválido o ausente
+CODIGOS_ERROR_TOKEN = ("PGRST301", "PGRST302", "PGRST303")
+
+T = TypeVar("T")
+
+
+# ---------------------------------------------------------
+#  RUNNER PARA CÓDIGO SÍNCRONO
+# ---------------------------------------------------------
+# Un event loop propio en un hilo de fondo, compartido por todas las
+# sesiones: ahí vive el cliente async con su pool de conexiones. Las
+# corrutinas corren con una copia del contexto de quien las lanza, así sus
+# round trips se siguen contando en el rerun en curso (consultas.py).
+@st.cache_resource(show_spinner=False)
+def _loop() -> asyncio.AbstractEventLoop:
+    """Event loop del runner, corriendo en un hilo daemon."""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="db-async", daemon=True).start()
+    return loop
+
+
+def ejecutar(corrutina: Awaitable[T], timeout: Optional[float] = None) -> T:
+    """
+    Corre `corrutina` en el loop del runner y espera su resultado. Es para
+    código síncrono: desde una corrutina hay que usar await directamente.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run_coroutine_threadsafe(corrutina, _loop()).result(timeout)
+    corrutina.close()
+    raise RuntimeError("ejecutar() no se puede llamar desde un event loop; usar await.")
+
+
+async def _juntar(corrutinas) -> List[Any]:
+    return list(await asyncio.gather(*corrutinas))
+
+
+def ejecutar_varias(*corrutinas: Awaitable[Any], timeout: Optional[float] = None) -> List[Any]:
+    """Corre todas las `corrutinas` a la vez y devuelve sus resultados en orden."""
+    return ejecutar(_juntar(corrutinas), timeout)
+
+
+def token_de_la_sesion() -> Optional[str]:
+    """
+    Access token del usuario logueado en la sesión de Streamlit, renovado si
+    venció (ver auth.token_vigente). Lanza SesionInvalida si no se pudo
+    renovar.
+    """
+    return token_vigente()
+
+
+def _relanzar_si_es_de_sesion(e: Exception) -> None:
+    """Si `e` es un rechazo del token, lo lanza como SesionInvalida."""
+    if isinstance(e, SesionInvalida):
+        raise e
+    estado = getattr(getattr(e, "response", None), "status_code", None)
+    if getattr(e, "code", None) in CODIGOS_ERROR_TOKEN or estado == 401:
+        detalle = getattr(e, "message", None) or e
+        raise SesionInvalida(f"El token fue rechazado ({detalle}): volvé a iniciar sesión.") from e
+
+
+async def _ejecutar_pasos(pasos: Pasos) -> Any:
+    """Como db._ejecutar_pasos, esperando cada execute()."""
+    try:
+        consulta = next(pasos)
+        while True:
+            try:
+                result = await consulta.execute()
+            except Exception as e:
+                _relanzar_si_es_de_sesion(e)
+                consulta = pasos.throw(e)
+            else:
+                consulta = pasos.send(result)
+    except StopIteration as fin:
+        return fin.value
+
+
+# ---------------------------------------------------------
+#  INSERTAR MOVIMIENTO
+# ---------------------------------------------------------
+@medir_db
+async def insertar_movimiento(
+    usuario_id: str,
+    fecha: str,
+    categoria: str,
+    tipo: str,
+    descripcion: str,
+    monto: float,
+    cuenta: str,
+    etiquetas_json: Optional[str],
+    *,
+    token: Optional[str] = None,
+) -> bool:
+    """
+    Inserta un movimiento en la tabla 'movimientos'.
+    Devuelve True si fue insertado correctamente.
+    """
+    try:
+        supabase = await get_supabase_client_async(token)
+
+        campos = _campos(fecha, categoria, tipo, descripcion, monto, cuenta, etiquetas_json)
+        result = await _consulta_insertar(supabase, usuario_id, campos).execute()
+
+        invalidar_cache_movimientos(usuario_id)
+        return result.data is not None
+
+    except Exception as e:
+        _relanzar_si_es_de_sesion(e)
+        print(f"[DB] Error al insertar movimiento: {e}")
+        return False
+
+
+# ---------------------------------------------------------
+#  INSERTAR MOVIMIENTOS EN LOTE (importación CSV)
+# ---------------------------------------------------------
+@medir_db
+async def insertar_movimientos_bulk(
+    usuario_id: str,
+    rows: List[Dict[str, Any]],
+    chunk_size: int = BULK_CHUNK_SIZE,
+    on_chunk: Optional[Callable[[Dict[str, Any]], None]] = None,
+    invalidar_cache: bool = True,
+    concurrencia: int = BULK_CONCURRENCIA,
+    *,
+    token: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Como db.insertar_movimientos_bulk (mismo reporte y reintento fila por
+    fila), pero con hasta `concurrencia` bloques en vuelo a la vez.
+
+    `on_chunk` se llama a medida que termina cada bloque, no necesariamente
+    en orden, y desde el event loop: con el runner, no debe dibujar en la
+    página. El reporte final sí trae los bloques en orden.
+    """
+    chunk_size = max(1, int(chunk_size))
+    reporte: Dict[str, Any] = {"insertados": 0, "errores": 0, "bloques": []}
+
+    try:
+        supabase = await get_supabase_client_async(token)
+    except Exception as e:
+        _relanzar_si_es_de_sesion(e)
+        print(f"[DB] Error al insertar movimientos en lote: {e}")
+        return _reporte_sin_cliente(rows, e)
+
+    limite = asyncio.Semaphore(max(1, int(concurrencia)))
+
+    async def insertar(n_bloque: int, inicio: int) -> Dict[str, Any]:
+        bloque = rows[inicio:inicio + chunk_size]
+        async with limite:
+            info = await _ejecutar_pasos(_pasos_insertar_bloque(supabase, usuario_id, n_bloque, inicio, bloque))
+        if on_chunk is not None:
+            on_chunk(info)
+        return info
+
+    bloques = await asyncio.gather(*(
+        insertar(n_bloque, inicio)
+        for n_bloque, inicio in enumerate(range(0, len(rows), chunk_size))
+    ))
+
+    for info in bloques:
+        _sumar_bloque(reporte, info)
+
+    if invalidar_cache and reporte["insertados"]:
+        invalidar_cache_movimientos(usuario_id)
+    return reporte
+
+
+# ---------------------------------------------------------
+#  OBTENER MOVIMIENTOS (ACTIVOS Y BORRADOS)
+# ---------------------------------------------------------
+@medir_db
+async def obtener_movimientos(usuario_id: str, *, token: Optional[str] = None) -> List[Dict[str, Any]]:
+    try:
+        supabase = await get_supabase_client_async(token)
+        result = await _consulta_movimientos(supabase, usuario_id, deleted=False).execute()
+        return result.data or []
+    except Exception as e:
+        _relanzar_si_es_de_sesion(e)
+        print(f"[DB] Error al obtener movimientos: {e}")
+        return []
+
+
+@medir_db
+async def obtener_movimientos_borrados(usuario_id: str, *, token: Optional[str] = None) -> List[Dict[str, Any]]:
+    try:
+        supabase = await get_supabase_client_async(token)
+        result = await _consulta_movimientos(supabase, usuario_id, deleted=True).execute()
+        return result.data or []
+    except Exception as e:
+        _relanzar_si_es_de_sesion(e)
+        print(f"[DB] Error al obtener movimientos borrados: {e}")
+        return []
+
+
+@medir_db
+async def obtener_movimientos_modificados(
+    usuario_id: str,
+    desde: Optional[str] = None,
+    *,
+    token: Optional[str] = None,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Filas del usuario (activas y borradas) con updated_at >= `desde`, de a
+    SYNC_PAGE_SIZE por request. None si hubo error.
+    """
+    try:
+        supabase = await get_supabase_client_async(token)
+        return await _ejecutar_pasos(_pasos_modificados(supabase, usuario_id, desde))
+
+    except Exception as e:
+        _relanzar_si_es_de_sesion(e)
+        print(f"[DB] Error al obtener movimientos modificados: {e}")
+        return None
+
+
+# ---------------------------------------------------------
+#  OBTENER MOVIMIENTOS PAGINADOS (offset y keyset)
+# ---------------------------------------------------------
+@medir_db
+async def obtener_movimientos_paginados(
+    usuario_id: str,
+    limit: int = 50,
+    offset: int = 0,
+    fecha_desde: Optional[str] = None,
+    fecha_hasta: Optional[str] = None,
+    cuenta: Optional[str] = None,
+    categoria: Optional[str] = None,
+    *,
+    token: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Página por offset con el total: {"data", "count"} (ver db.py)."""
+    try:
+        supabase = await get_supabase_client_async(token)
+
+        query = _consulta_paginados(supabase, usuario_id, limit, offset, fecha_desde, fecha_hasta, cuenta, categoria)
+        return _armar_paginados(await query.execute(), offset)
+
+    except Exception as e:
+        _relanzar_si_es_de_sesion(e)
+        print(f"[DB] Error al obtener movimientos paginados: {e}")
+        return {"data": [], "count": 0}
+
+
+@medir_db
+async def obtener_movimientos_keyset(
+    usuario_id: str,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    fecha_desde: Optional[str] = None,
+    fecha_hasta: Optional[str] = None,
+    cuenta: Optional[str] = None,
+    categoria: Optional[str] = None,
+    texto: Optional[str] = None,
+    *,
+    token: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Página por cursor ordenada por fecha desc, id desc:
+    {"data", "siguiente", "anterior"} (ver db.py). None si hubo error.
+    """
+    try:
+        supabase = await get_supabase_client_async(token)
+
+        query, hacia_atras = _consulta_keyset(
+            supabase, usuario_id, limit, cursor, fecha_desde, fecha_hasta, cuenta, categoria, texto
+        )
+        return _armar_pagina((await query.execute()).data or [], limit, cursor, hacia_atras)
+
+    except Exception as e:
+        _relanzar_si_es_de_sesion(e)
+        print(f"[DB] Error al obtener movimientos por cursor: {e}")
+        return None
+
+
+@medir_db
+async def contar_movimientos(
+    usuario_id: str,
+    fecha_desde: Optional[str] = None,
+    fecha_hasta: Optional[str] = None,
+    cuenta: Optional[str] = None,
+    categoria: Optional[str] = None,
+    texto: Optional[str] = None,
+    estimado: bool = False,
+    *,
+    token: Optional[str] = None,
+) -> Optional[int]:
+    """
+    Cantidad de movimientos activos que coinciden con los filtros (ver
+    db.py). None si hubo error.
+    """
+    try:
+        supabase = await get_supabase_client_async(token)
+
+        query = _consulta_conteo(supabase, usuario_id, fecha_desde, fecha_hasta, cuenta, categoria, texto, estimado)
+        return int((await query.execute()).count or 0)
+
+    except Exception as e:
+        _relanzar_si_es_de_sesion(e)
+        print(f"[DB] Error al contar movimientos: {e}")
+        return None
+
+
+# ---------------------------------------------------------
+#  RESÚMENES AGREGADOS (RPC, ver sql/002 y sql/003)
+# ---------------------------------------------------------
+@medir_db
+async def obtener_resumen_movimientos(
+    usuario_id: str,
+    fecha_desde: Optional[str] = None,
+    fecha_hasta: Optional[str] = None,
+    *,
+    token: Optional[str] = None,
+) -> Optional[List[Dict[str, Any]]]:
+    """Totales por mes, categoría y cuenta calculados en Postgres. None si falla."""
+    try:
+        supabase = await get_supabase_client_async(token)
+        return await _ejecutar_pasos(_pasos_rpc_paginado(
+            supabase, "resumen_movimientos", _params_resumen(usuario_id, fecha_desde, fecha_hasta)
+        ))
+    except Exception as e:
+        _relanzar_si_es_de_sesion(e)
+        print(f"[DB] Error al obtener resumen de movimientos: {e}")
+        return None
+
+
+@medir_db
+async def obtener_resumen_diario(
+    usuario_id: str,
+    fecha_desde: Optional[str] = None,
+    fecha_hasta: Optional[str] = None,
+    *,
+    token: Optional[str] = None,
+) -> Optional[List[Dict[str, Any]]]:
+    """Totales por día calculados en Postgres. None si falla."""
+    try:
+        supabase = await get_supabase_client_async(token)
+        return await _ejecutar_pasos(_pasos_rpc_paginado(
+            supabase, "resumen_diario", _params_resumen(usuario_id, fecha_desde, fecha_hasta)
+        ))
+    except Exception as e:
+        _relanzar_si_es_de_sesion(e)
+        print(f"[DB] Error al obtener resumen diario: {e}")
+        return None
+
+
+@medir_db
+async def reconstruir_resumen_mensual(
+    usuario_id: Optional[str] = None,
+    *,
+    token: Optional[str] = None,
+) -> Optional[int]:
+    """
+    Recalcula el rollup movimientos_resumen_mensual (sin usuario_id, el de
+    todos los usuarios). Devuelve la cantidad de filas generadas, o None.
+    """
+    try:
+        supabase = await get_supabase_client_async(token)
+        result = await _consulta_reconstruir_resumen(supabase, usuario_id).execute()
+        if usuario_id:
+            invalidar_cache_movimientos(usuario_id)
+        return int(result.data or 0)
+    except Exception as e:
+        _relanzar_si_es_de_sesion(e)
+        print(f"[DB] Error al reconstruir resumen mensual: {e}")
+        return None
+
+
+@medir_db
+async def obtener_uso_catalogos(
+    usuario_id: str,
+    *,
+    token: Optional[str] = None,
+) -> Optional[Dict[str, Dict[str, int]]]:
+    """Movimientos activos por categoría y por etiqueta (ver db.py). None si falla."""
+    try:
+        supabase = await get_supabase_client_async(token)
+        return _armar_uso_catalogos((await _consulta_uso_catalogos(supabase, usuario_id).execute()).data)
+    except Exception as e:
+        _relanzar_si_es_de_sesion(e)
+        print(f"[DB] Error al obtener uso de catálogos: {e}")
+        return None
+
+
+# ---------------------------------------------------------
+#  OBTENER UN MOVIMIENTO POR ID
+# ---------------------------------------------------------
+@medir_db
+async def obtener_movimiento_por_id(
+    usuario_id: str,
+    movimiento_id: int,
+    *,
+    token: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    try:
+        supabase = await get_supabase_client_async(token)
+
+        result = await _consulta_por_id(supabase, usuario_id, movimiento_id).execute()
+
+        return result.data
+
+    except Exception as e:
+        _relanzar_si_es_de_sesion(e)
+        print(f"[DB] Error al obtener movimiento por id: {e}")
+        return None
+
+
+# ---------------------------------------------------------
+#  ACTUALIZAR, ELIMINAR (LÓGICO) Y RESTAURAR
+# ---------------------------------------------------------
+async def _actualizar(usuario_id: str, movimiento_id: int, data: Dict[str, Any], token: Optional[str]) -> bool:
+    supabase = await get_supabase_client_async(token)
+    result = await _consulta_actualizar(supabase, usuario_id, movimiento_id, data).execute()
+    return result.data is not None
+
+
+@medir_db
+async def actualizar_movimiento(
+    usuario_id: str,
+    movimiento_id: int,
+    fecha: str,
+    categoria: str,
+    tipo: str,
+    descripcion: str,
+    monto: float,
+    cuenta: str,
+    etiquetas_json: Optional[str],
+    *,
+    token: Optional[str] = None,
+) -> bool:
+    try:
+        data = _datos_actualizacion(_campos(fecha, categoria, tipo, descripcion, monto, cuenta, etiquetas_json))
+        ok = await _actualizar(usuario_id, movimiento_id, data, token)
+        invalidar_cache_movimientos(usuario_id)
+        return ok
+
+    except Exception as e:
+        _relanzar_si_es_de_sesion(e)
+        print(f"[DB] Error al actualizar movimiento: {e}")
+        return False
+
+
+@medir_db
+async def eliminar_movimiento_logico(usuario_id: str, movimiento_id: int, *, token: Optional[str] = None) -> bool:
+    try:
+        ok = await _actualizar(usuario_id, movimiento_id, {"deleted": True}, token)
+        invalidar_cache_movimientos(usuario_id, DATASET_ACTIVOS, DATASET_BORRADOS)
+        return ok
+
+    except Exception as e:
+        _relanzar_si_es_de_sesion(e)
+        print(f"[DB] Error al eliminar (lógico) movimiento: {e}")
+        return False
+
+
+@medir_db
+async def restaurar_movimiento(usuario_id: str, movimiento_id: int, *, token: Optional[str] = None) -> bool:
+    try:
+        ok = await _actualizar(usuario_id, movimiento_id, {"deleted": False}, token)
+        invalidar_cache_movimientos(usuario_id, DATASET_ACTIVOS, DATASET_BORRADOS)
+        return ok
+
+    except Exception as e:
+        _relanzar_si_es_de_sesion(e)
+        print(f"[DB] Error al restaurar movimiento: {e}")
+        return False
+
+
+# -------------------------------------------------------------------
+#   CATÁLOGOS (ver catalogos.py)
+# -------------------------------------------------------------------
+# Las lecturas async van siempre a la base (las tres tablas a la vez si no
+# está la RPC); el CatalogStore cacheado sigue siendo el de las páginas.
+# Las escrituras lo descartan para que la próxima lectura síncrona lo
+# vuelva a cargar.
+@medir_db
+async def provisionar_catalogos(usuario_id: str, *, token: Optional[str] = None) -> bool:
+    """
+    Carga los catálogos sugeridos en las tablas vacías del usuario (las tres
+    a la vez) y lo marca como provisionado, con la sesión de `token`.
+    Devuelve True si todo salió bien.
+    """
+    supabase = await get_supabase_client_async(token)
+
+    async def provisionar(tabla: str, sugeridos: List[str]) -> bool:
+        try:
+            await _ejecutar_pasos(_pasos_provisionar(supabase, tabla, usuario_id, sugeridos))
+            return True
+        except Exception as e:
+            _relanzar_si_es_de_sesion(e)
+            print(f"Error cargando {tabla}:", e)
+            return False
+
+    ok = all(await asyncio.gather(*(provisionar(t, s) for t, s in SUGERIDOS.items())))
+
+    catalogos.obtener_catalog_store.clear(usuario_id)
+
+    if ok:
+        try:
+            await _consulta_marcar_provisionados(supabase, usuario_id).execute()
+        except Exception as e:
+            _relanzar_si_es_de_sesion(e)
+            print("Error marcando catálogos provisionados:", e)
+    return ok
+
+
+@medir_db
+async def cargar_catalogos(usuario_id: str, *, token: Optional[str] = None) -> Dict[str, List[str]]:
+    """
+    Los tres catálogos ordenados por nombre, con la RPC obtener_catalogos
+    (un request) o, si no está instalada, una query por tabla en paralelo.
+    """
+    supabase = await get_supabase_client_async(token)
+
+    try:
+        return _armar_catalogos((await _consulta_catalogos(supabase, usuario_id).execute()).data)
+    except Exception as e:
+        _relanzar_si_es_de_sesion(e)
+        print("Error cargando catálogos (rpc), se usan queries por tabla:", e)
+
+    resultados = await asyncio.gather(*(
+        _consulta_catalogo(supabase, catalogo, usuario_id).execute() for catalogo in CATALOGOS
+    ))
+    return {catalogo: _armar_catalogo(result) for catalogo, result in zip(CATALOGOS, resultados)}
+
+
+async def obtener_categorias(usuario_id: str, *, token: Optional[str] = None) -> List[str]:
+    return (await cargar_catalogos(usuario_id, token=token))["categorias"]
+
+
+async def obtener_etiquetas(usuario_id: str, *, token: Optional[str] = None) -> List[str]:
+    return (await cargar_catalogos(usuario_id, token=token))["etiquetas"]
+
+
+async def obtener_cuentas(usuario_id: str, *, token: Optional[str] = None) -> List[str]:
+    return (await cargar_catalogos(usuario_id, token=token))["cuentas"]
+
+
+async def _agregar(tabla: str, usuario_id: str, nombre: str, token: Optional[str]) -> None:
+    if not nombre.strip():
+        return
+    supabase = await get_supabase_client_async(token)
+    await _consulta_agregar(supabase, tabla, usuario_id, nombre.strip()).execute()
+    catalogos.obtener_catalog_store.clear(usuario_id)
+
+
+@medir_db
+async def agregar_categoria(usuario_id: str, nombre: str, *, token: Optional[str] = None):
+    await _agregar("categorias", usuario_id, nombre, token)
+
+
+@medir_db
+async def agregar_etiqueta(usuario_id: str, nombre: str, *, token: Optional[str] = None):
+    await _agregar("etiquetas", usuario_id, nombre, token)
+
+
+@medir_db
+async def agregar_cuenta(usuario_id: str, nombre: str, *, token: Optional[str] = None):
+    await _agregar("cuentas", usuario_id, nombre, token)
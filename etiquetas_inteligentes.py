@@ -1,7 +1,22 @@
 import re
+import os
+import json
 from collections import defaultdict, Counter
+from dataclasses import dataclass
+from typing import Dict, List
 import math
 
+import numpy as np
+
+# Modelos persistidos, un JSON por usuario y modelo. Contienen palabras de
+# las descripciones de los movimientos: FINANZAS_MODELOS_DIR permite dejarlos
+# fuera del directorio de la app (por defecto "modelos_etiquetas", ignorado
+# por git)
+MODELOS_DIR = (os.getenv("FINANZAS_MODELOS_DIR") or "modelos_etiquetas").strip()
+
+# Descripciones que se puntúan juntas en predecir_etiquetas_batch
+PREDICCION_LOTE = 2048
+
 
 def limpiar_texto(texto):
     texto = texto.lower()
@@ -36,6 +51,9 @@ def entrenar_modelo(movimientos):
 
 
 def predecir_etiquetas(modelo, descripcion, top_n=3):
+    if isinstance(modelo, ModeloCompilado):
+        return predecir_etiquetas_batch(modelo, [descripcion], top_n)[0]
+
     descripcion = limpiar_texto(descripcion)
     palabras = descripcion.split()
 
@@ -57,4 +75,211 @@ def predecir_etiquetas(modelo, descripcion, top_n=3):
         scores[etiqueta] = score
 
     sugeridas = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-    return [etq for etq, _ in sugeridas[:top_n]]
\ No newline at end of file
+    return [etq for etq, _ in sugeridas[:top_n]]
+
+
+# -------------------------------------------------------------------
+#   MODELO COMPILADO (predicción vectorizada)
+# -------------------------------------------------------------------
+# El score de predecir_etiquetas para una etiqueta con `count` apariciones es
+#   log(prior + 1e-9) + sum_palabras log((freq + 1) / (count + 1))
+#   = base - n_palabras * log(count + 1) + sum_palabras log(freq + 1)
+# El modelo compilado guarda log(freq + 1) como matriz palabra x etiqueta,
+# así una descripción se puntúa sumando filas de la matriz y un lote entero
+# con unas pocas operaciones de numpy. Las palabras fuera del vocabulario
+# aportan log(1) = 0 y solo cuentan en n_palabras.
+#
+# La matriz es rala (cada palabra aparece con pocas etiquetas) y se guarda
+# por filas en formato CSR con arrays de numpy: las entradas de la palabra k
+# son columnas[punteros[k]:punteros[k + 1]] y log_freq[...] con los mismos
+# índices. Ocupa lo que el modelo de entrenar_modelo y no
+# vocabulario x etiquetas, que con un historial largo son cientos de MB.
+@dataclass(frozen=True)
+class ModeloCompilado:
+    etiquetas: List[str]
+    vocabulario: Dict[str, int]
+    punteros: np.ndarray      # (palabras + 1,): inicio de las entradas de cada palabra
+    columnas: np.ndarray      # (entradas,): etiqueta de cada entrada
+    log_freq: np.ndarray      # (entradas,): log(freq + 1)
+    base: np.ndarray          # (etiquetas,): log(prior + 1e-9)
+    log_conteo: np.ndarray    # (etiquetas,): log(count + 1)
+
+
+def compilar_modelo(modelo):
+    """Convierte el modelo de entrenar_modelo en un ModeloCompilado."""
+    etiqueta_conteo = modelo["etiqueta_conteo"]
+    palabra_por_etiqueta = modelo["palabra_por_etiqueta"]
+
+    etiquetas = list(etiqueta_conteo)
+    conteos = np.array([etiqueta_conteo[e] for e in etiquetas], dtype=float)
+    total = conteos.sum()
+
+    vocabulario: Dict[str, int] = {}
+    filas, columnas, valores = [], [], []
+    for j, etiqueta in enumerate(etiquetas):
+        for palabra, freq in palabra_por_etiqueta.get(etiqueta, {}).items():
+            filas.append(vocabulario.setdefault(palabra, len(vocabulario)))
+            columnas.append(j)
+            valores.append(freq)
+
+    filas = np.array(filas, dtype=np.int64)
+    orden = np.argsort(filas, kind="stable")
+    punteros = np.zeros(len(vocabulario) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(filas, minlength=len(vocabulario)), out=punteros[1:])
+
+    return ModeloCompilado(
+        etiquetas=etiquetas,
+        vocabulario=vocabulario,
+        punteros=punteros,
+        columnas=np.array(columnas, dtype=np.int64)[orden],
+        log_freq=np.log1p(np.array(valores, dtype=float))[orden],
+        base=np.log(conteos / total + 1e-9) if total else conteos,
+        log_conteo=np.log1p(conteos),
+    )
+
+
+def puntuar_batch(modelo: ModeloCompilado, descripciones) -> np.ndarray:
+    """Matriz (descripciones, etiquetas) con el score de cada par."""
+    vocabulario = modelo.vocabulario
+    n_palabras = np.zeros(len(descripciones))
+    indices: List[int] = []
+    duenios: List[int] = []
+
+    for i, descripcion in enumerate(descripciones):
+        palabras = limpiar_texto(descripcion or "").split()
+        n_palabras[i] = len(palabras)
+        conocidas = [vocabulario[p] for p in palabras if p in vocabulario]
+        indices.extend(conocidas)
+        duenios.extend([i] * len(conocidas))
+
+    scores = modelo.base[None, :] - n_palabras[:, None] * modelo.log_conteo[None, :]
+    n_etiquetas = len(modelo.etiquetas)
+    if not indices or not n_etiquetas:
+        return scores
+
+    # Entradas de la matriz de cada palabra conocida (repetidas si la palabra
+    # se repite), sumadas en la fila de su descripción
+    indices = np.array(indices, dtype=np.int64)
+    inicios = modelo.punteros[indices]
+    largos = modelo.punteros[indices + 1] - inicios
+    desplazamientos = np.cumsum(largos) - largos
+    entradas = np.repeat(inicios - desplazamientos, largos) + np.arange(largos.sum())
+    celdas = np.repeat(np.array(duenios, dtype=np.int64), largos) * n_etiquetas + modelo.columnas[entradas]
+    scores += np.bincount(
+        celdas, weights=modelo.log_freq[entradas], minlength=scores.size
+    ).reshape(scores.shape)
+    return scores
+
+
+def predecir_etiquetas_batch(modelo, descripciones, top_n=3):
+    """
+    Sugiere hasta `top_n` etiquetas para cada descripción, con el mismo
+    criterio que predecir_etiquetas. Acepta el modelo de entrenar_modelo o
+    uno ya compilado (conviene compilarlo una vez y reutilizarlo).
+    """
+    if not isinstance(modelo, ModeloCompilado):
+        modelo = compilar_modelo(modelo)
+    descripciones = list(descripciones)
+    if not modelo.etiquetas or not descripciones:
+        return [[] for _ in descripciones]
+
+    etiquetas = modelo.etiquetas
+    sugeridas = []
+    # De a PREDICCION_LOTE descripciones, para acotar la memoria intermedia
+    for inicio in range(0, len(descripciones), PREDICCION_LOTE):
+        # Redondeo para que los empates exactos de predecir_etiquetas no se
+        # rompan por el error de punto flotante de sumar en otro orden
+        scores = np.round(puntuar_batch(modelo, descripciones[inicio:inicio + PREDICCION_LOTE]), 9)
+        if top_n == 1:
+            top = np.argmax(scores, axis=1)[:, None]
+        else:
+            top = np.argsort(-scores, axis=1, kind="stable")[:, :top_n]
+        sugeridas.extend([etiquetas[j] for j in fila] for fila in top.tolist())
+    return sugeridas
+
+
+# -------------------------------------------------------------------
+#   ACTUALIZACIÓN INCREMENTAL
+# -------------------------------------------------------------------
+def modelo_vacio():
+    return {"palabra_por_etiqueta": {}, "etiqueta_conteo": {}}
+
+
+def _sumar_movimiento(modelo, mov, signo):
+    """Suma (signo=1) o resta (signo=-1) los conteos de un movimiento."""
+    palabra_por_etiqueta = modelo["palabra_por_etiqueta"]
+    etiqueta_conteo = modelo["etiqueta_conteo"]
+    palabras = limpiar_texto(mov.get("descripcion") or "").split()
+
+    for etiqueta in mov.get("etiquetas") or []:
+        conteo = etiqueta_conteo.get(etiqueta, 0) + signo
+        if conteo <= 0:
+            etiqueta_conteo.pop(etiqueta, None)
+            palabra_por_etiqueta.pop(etiqueta, None)
+            continue
+        etiqueta_conteo[etiqueta] = conteo
+
+        palabras_etiqueta = palabra_por_etiqueta.setdefault(etiqueta, {})
+        for palabra in palabras:
+            freq = palabras_etiqueta.get(palabra, 0) + signo
+            if freq > 0:
+                palabras_etiqueta[palabra] = freq
+            else:
+                palabras_etiqueta.pop(palabra, None)
+
+
+def actualizar_modelo(modelo, quitar, agregar):
+    """
+    Devuelve una copia del modelo sin los movimientos de `quitar` y con los
+    de `agregar` (misma forma que en entrenar_modelo). Una edición es quitar
+    la versión anterior y agregar la nueva. El modelo original no se modifica.
+    """
+    nuevo = {
+        "palabra_por_etiqueta": {k: dict(v) for k, v in modelo["palabra_por_etiqueta"].items()},
+        "etiqueta_conteo": dict(modelo["etiqueta_conteo"]),
+    }
+    for mov in quitar:
+        _sumar_movimiento(nuevo, mov, -1)
+    for mov in agregar:
+        _sumar_movimiento(nuevo, mov, 1)
+    return nuevo
+
+
+# -------------------------------------------------------------------
+#   PERSISTENCIA
+# -------------------------------------------------------------------
+def _ruta_modelo(usuario_id, nombre="etiquetas"):
+    os.makedirs(MODELOS_DIR, exist_ok=True)
+    archivo = f"{usuario_id}.json" if nombre == "etiquetas" else f"{usuario_id}_{nombre}.json"
+    return os.path.join(MODELOS_DIR, archivo)
+
+
+def guardar_modelo(usuario_id, modelo, clave, nombre="etiquetas"):
+    """
+    Guarda el modelo `nombre` del usuario junto con `clave`, que identifica
+    el estado de los movimientos con que se entrenó. La escritura es atómica.
+    """
+    try:
+        ruta = _ruta_modelo(usuario_id, nombre)
+        temporal = ruta + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump({"clave": clave, "modelo": modelo}, f, ensure_ascii=False)
+        os.replace(temporal, ruta)
+    except Exception as e:
+        print(f"[ETIQUETAS] Error al guardar modelo de {usuario_id}: {e}")
+
+
+def cargar_modelo(usuario_id, clave, nombre="etiquetas"):
+    """Devuelve el modelo guardado si fue entrenado con `clave`; si no, None."""
+    try:
+        ruta = _ruta_modelo(usuario_id, nombre)
+        if not os.path.exists(ruta):
+            return None
+        with open(ruta, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("clave") != clave:
+            return None
+        return data["modelo"]
+    except Exception as e:
+        print(f"[ETIQUETAS] Error al cargar modelo de {usuario_id}: {e}")
+        return None
\ No newline at end of file
@@ -0,0 +1,377 @@
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from db import insertar_movimientos_bulk, invalidar_cache_movimientos
+from etiquetas_inteligentes import ModeloCompilado, limpiar_texto, predecir_etiquetas_batch
+
+COLUMNAS_OBLIGATORIAS = ["fecha", "categoria", "tipo", "descripcion", "monto", "cuenta"]
+
+# Filas del CSV que se leen por bloque. Acota la memoria pico del importador
+# sin importar el tamaño del archivo.
+CSV_CHUNK_ROWS = 20_000
+
+# Filas de muestra que se muestran en la previsualización
+MUESTRA_FILAS = 20
+
+# Máximo de errores que se guardan con detalle (el resto solo se cuenta)
+MAX_ERRORES_DETALLE = 1_000
+
+
+TIPOS_VALIDOS = ["ingreso", "gasto"]
+
+# Formatos de fecha aceptados, en orden de prioridad
+FORMATOS_FECHA = ["%Y-%m-%d", "%d/%m/%Y"]
+
+
+# -------------------------------------------------------------------
+#   LECTURA POR BLOQUES
+# -------------------------------------------------------------------
+def leer_csv_por_bloques(archivo, chunk_rows: int = CSV_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Lee el CSV en bloques de `chunk_rows` filas, con todas las columnas
+    como texto (la normalización se hace después, bloque por bloque).
+    """
+    if hasattr(archivo, "seek"):
+        archivo.seek(0)
+    return pd.read_csv(archivo, chunksize=chunk_rows, dtype=str, keep_default_na=False)
+
+
+def columnas_faltantes(columnas) -> List[str]:
+    return [col for col in COLUMNAS_OBLIGATORIAS if col not in columnas]
+
+
+# -------------------------------------------------------------------
+#   NORMALIZACIÓN VECTORIZADA
+# -------------------------------------------------------------------
+def _texto(df: pd.DataFrame, columna: str) -> pd.Series:
+    if columna not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    return df[columna].fillna("").astype(str).str.strip()
+
+
+def parsear_fechas(valores: pd.Series) -> pd.Series:
+    """Convierte texto a fechas probando FORMATOS_FECHA. NaT si no coincide ninguno."""
+    fechas = pd.to_datetime(valores, format=FORMATOS_FECHA[0], errors="coerce")
+    for formato in FORMATOS_FECHA[1:]:
+        faltan = fechas.isna() & (valores != "")
+        if not faltan.any():
+            break
+        fechas = fechas.where(~faltan, pd.to_datetime(valores[faltan], format=formato, errors="coerce"))
+    return fechas
+
+
+# Puntos como separador de miles sin decimales ("12.500", "1.234.567")
+_MILES_SIN_DECIMALES = r"^-?\d{1,3}(?:\.\d{3})+$"
+
+
+def parsear_montos(valores: pd.Series) -> pd.Series:
+    """
+    Convierte montos a float. NaN si el valor no es un número.
+
+    - con coma: formato argentino, "." de miles y "," decimal ("1.234,56")
+    - solo puntos agrupando de a tres dígitos: miles sin centavos
+      ("12.500" -> 12500, "1.234.567" -> 1234567), como en el formato argentino
+    - el resto: decimal simple ("1234.56", "12.5")
+
+    "1.234" es ambiguo y se lee como miles (1234); un monto con tres
+    decimales se escribe con coma ("1,234").
+    """
+    valores = valores.str.replace(r"[\s$]", "", regex=True)
+    argentino = valores.str.contains(",", regex=False) | valores.str.match(_MILES_SIN_DECIMALES)
+    sin_miles = valores.str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+    return pd.to_numeric(valores.where(~argentino, sin_miles), errors="coerce")
+
+
+def separar_etiquetas(valores: pd.Series) -> pd.Series:
+    """
+    Separa las etiquetas por comas. Las celdas vacías quedan como lista vacía.
+    Cada combinación distinta se separa una sola vez (los extractos repiten mucho).
+    """
+    codigos, unicos = pd.factorize(valores)
+    listas = [[e.strip() for e in v.split(",") if e.strip()] for v in unicos.tolist()]
+    listas.append([])  # código -1 (valores faltantes)
+    return pd.Series([listas[c] for c in codigos.tolist()], index=valores.index, dtype=object)
+
+
+def normalizar_movimientos(df: pd.DataFrame, fila_inicial: int = 0) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Valida y normaliza un bloque del CSV con operaciones por columna.
+
+    Devuelve (limpio, errores):
+      - limpio: DataFrame con fila, fecha (YYYY-MM-DD), categoria, tipo,
+        descripcion, monto (float), cuenta y etiquetas (lista), listo para
+        db.insertar_movimientos_bulk
+      - errores: DataFrame con fila y error (motivos separados por "; ")
+
+    "fila" es el número de fila de datos dentro del archivo (desde 0).
+    """
+    filas = pd.RangeIndex(fila_inicial, fila_inicial + len(df))
+
+    fecha_txt = _texto(df, "fecha")
+    monto_txt = _texto(df, "monto")
+    tipo = _texto(df, "tipo").str.lower()
+
+    fechas = parsear_fechas(fecha_txt)
+    montos = parsear_montos(monto_txt)
+
+    # (máscara, motivo, valor que se agrega al motivo)
+    chequeos = [
+        (fecha_txt == "", "fecha vacía", None),
+        ((fecha_txt != "") & fechas.isna(), "fecha inválida: ", fecha_txt),
+        (monto_txt == "", "monto vacío", None),
+        ((monto_txt != "") & montos.isna(), "monto inválido: ", monto_txt),
+        (~tipo.isin(TIPOS_VALIDOS), "tipo inválido: ", tipo),
+    ]
+    con_error = np.zeros(len(df), dtype=bool)
+    for mascara, _, _ in chequeos:
+        con_error |= mascara.to_numpy(dtype=bool)
+
+    # Los motivos se arman solo para las filas con error
+    posiciones = np.flatnonzero(con_error)
+    motivos: List[List[str]] = [[] for _ in posiciones]
+    for mascara, texto, valores in chequeos:
+        marcadas = np.flatnonzero(mascara.to_numpy(dtype=bool)[posiciones])
+        if valores is not None:
+            valores = valores.to_numpy(dtype=object)[posiciones]
+        for p in marcadas:
+            motivos[p].append(texto if valores is None else texto + valores[p])
+
+    errores = pd.DataFrame({
+        "fila": filas[con_error],
+        "error": ["; ".join(m) for m in motivos],
+    })
+
+    ok = pd.Series(~con_error, index=df.index)
+    categoria = _texto(df, "categoria")[ok]
+    cuenta = _texto(df, "cuenta")[ok]
+    limpio = pd.DataFrame({
+        "fila": filas[~con_error],
+        "fecha": fechas[ok].dt.strftime("%Y-%m-%d").to_numpy(),
+        "categoria": categoria.mask(categoria == "", "Sin categoría").to_numpy(),
+        "tipo": tipo[ok].to_numpy(),
+        "descripcion": _texto(df, "descripcion")[ok].to_numpy(),
+        "monto": montos[ok].astype(float).to_numpy(),
+        "cuenta": cuenta.mask(cuenta == "", "Sin cuenta").to_numpy(),
+        "etiquetas": separar_etiquetas(_texto(df, "etiquetas")[ok]).to_numpy(),
+    })
+
+    return limpio, errores
+
+
+# -------------------------------------------------------------------
+#   AUTOCOMPLETADO DE ETIQUETAS Y CATEGORÍAS
+# -------------------------------------------------------------------
+def _faltantes(limpio: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """Máscaras de filas con descripción y sin etiquetas / sin categoría."""
+    codigos, unicas = pd.factorize(limpio["descripcion"])
+    con_texto = np.array([limpiar_texto(d) != "" for d in unicas.tolist()] + [False])
+    con_descripcion = con_texto[codigos]
+    sin_etiquetas = con_descripcion & (limpio["etiquetas"].map(len).to_numpy() == 0)
+    sin_categoria = con_descripcion & (limpio["categoria"] == "Sin categoría").to_numpy()
+    return sin_etiquetas, sin_categoria
+
+
+def _predecir_unicas(modelo: ModeloCompilado, descripciones: pd.Series) -> List[Optional[str]]:
+    """La etiqueta más probable de cada descripción, prediciendo una vez por descripción distinta."""
+    codigos, unicas = pd.factorize(descripciones)
+    propuestas = predecir_etiquetas_batch(modelo, unicas.tolist(), top_n=1)
+    return [propuestas[c][0] if propuestas[c] else None for c in codigos.tolist()]
+
+
+def completar_faltantes(
+    limpio: pd.DataFrame,
+    modelo_etiquetas: Optional[ModeloCompilado] = None,
+    modelo_categorias: Optional[ModeloCompilado] = None,
+) -> pd.DataFrame:
+    """
+    Completa, en lote, las etiquetas vacías y la categoría "Sin categoría"
+    de las filas con descripción usando los modelos del usuario
+    (models.modelo_etiquetas_compilado / modelo_categorias_compilado).
+    Se propone una etiqueta por fila. Agrega las columnas booleanas
+    etiquetas_sugeridas y categoria_sugerida.
+    """
+    limpio = limpio.copy()
+    sin_etiquetas, sin_categoria = _faltantes(limpio)
+    etiquetas_sugeridas = np.zeros(len(limpio), dtype=bool)
+    categoria_sugerida = np.zeros(len(limpio), dtype=bool)
+
+    if modelo_etiquetas is not None and modelo_etiquetas.etiquetas and sin_etiquetas.any():
+        etiquetas = limpio["etiquetas"].to_numpy(dtype=object, copy=True)
+        posiciones = np.flatnonzero(sin_etiquetas)
+        for pos, propuesta in zip(posiciones, _predecir_unicas(modelo_etiquetas, limpio["descripcion"].iloc[posiciones])):
+            if propuesta is not None:
+                etiquetas[pos] = [propuesta]
+                etiquetas_sugeridas[pos] = True
+        limpio["etiquetas"] = etiquetas
+
+    if modelo_categorias is not None and modelo_categorias.etiquetas and sin_categoria.any():
+        categorias = limpio["categoria"].to_numpy(dtype=object, copy=True)
+        posiciones = np.flatnonzero(sin_categoria)
+        for pos, propuesta in zip(posiciones, _predecir_unicas(modelo_categorias, limpio["descripcion"].iloc[posiciones])):
+            if propuesta is not None:
+                categorias[pos] = propuesta
+                categoria_sugerida[pos] = True
+        limpio["categoria"] = categorias
+
+    limpio["etiquetas_sugeridas"] = etiquetas_sugeridas
+    limpio["categoria_sugerida"] = categoria_sugerida
+    return limpio
+
+
+# -------------------------------------------------------------------
+#   PREVISUALIZACIÓN (MUESTRA + ESTADÍSTICAS)
+# -------------------------------------------------------------------
+def resumir_csv(
+    archivo,
+    chunk_rows: int = CSV_CHUNK_ROWS,
+    muestra_filas: int = MUESTRA_FILAS,
+    modelo_etiquetas: Optional[ModeloCompilado] = None,
+    modelo_categorias: Optional[ModeloCompilado] = None,
+) -> Dict[str, Any]:
+    """
+    Recorre el CSV por bloques y devuelve una muestra de las primeras filas
+    más estadísticas del archivo completo, sin cargarlo entero en memoria.
+    Con modelos, propone etiquetas/categoría solo para la muestra; en el
+    resto del archivo únicamente cuenta las filas que se completarían.
+
+    Devuelve un dict con:
+      - muestra: DataFrame con las primeras `muestra_filas` filas
+      - columnas, faltantes: columnas encontradas y obligatorias que faltan
+      - filas, validas, errores: conteos
+      - ingresos, gastos: sumas de montos válidos por tipo
+      - fecha_min, fecha_max: rango de fechas (texto)
+      - cuentas: cantidad de cuentas distintas
+      - sin_etiquetas, sin_categoria: filas con descripción que se completarían
+      - propuestas: DataFrame con las filas de la muestra que recibieron
+        etiquetas o categoría sugeridas (vacío sin modelos)
+    """
+    resumen: Dict[str, Any] = {
+        "muestra": pd.DataFrame(),
+        "columnas": [],
+        "faltantes": [],
+        "filas": 0,
+        "validas": 0,
+        "errores": 0,
+        "ingresos": 0.0,
+        "gastos": 0.0,
+        "fecha_min": None,
+        "fecha_max": None,
+        "cuentas": 0,
+        "sin_etiquetas": 0,
+        "sin_categoria": 0,
+        "propuestas": pd.DataFrame(),
+    }
+    cuentas = set()
+    autocompletar = modelo_etiquetas is not None or modelo_categorias is not None
+
+    for n_bloque, df in enumerate(leer_csv_por_bloques(archivo, chunk_rows)):
+        if n_bloque == 0:
+            resumen["muestra"] = df.head(muestra_filas)
+            resumen["columnas"] = df.columns.tolist()
+            resumen["faltantes"] = columnas_faltantes(df.columns)
+            if resumen["faltantes"]:
+                return resumen
+
+        limpio, errores = normalizar_movimientos(df, fila_inicial=resumen["filas"])
+        resumen["filas"] += len(df)
+        resumen["validas"] += len(limpio)
+        resumen["errores"] += len(errores)
+
+        if limpio.empty:
+            continue
+
+        if autocompletar:
+            sin_etiquetas, sin_categoria = _faltantes(limpio)
+            resumen["sin_etiquetas"] += int(sin_etiquetas.sum()) if modelo_etiquetas is not None else 0
+            resumen["sin_categoria"] += int(sin_categoria.sum()) if modelo_categorias is not None else 0
+            if resumen["propuestas"].empty:
+                completado = completar_faltantes(limpio.head(muestra_filas), modelo_etiquetas, modelo_categorias)
+                sugeridas = completado["etiquetas_sugeridas"] | completado["categoria_sugerida"]
+                resumen["propuestas"] = completado.loc[sugeridas, ["fila", "descripcion", "categoria", "etiquetas"]]
+
+        resumen["ingresos"] += float(limpio.loc[limpio["tipo"] == "ingreso", "monto"].sum())
+        resumen["gastos"] += float(limpio.loc[limpio["tipo"] == "gasto", "monto"].sum())
+        cuentas.update(limpio["cuenta"].unique().tolist())
+
+        fecha_min, fecha_max = limpio["fecha"].min(), limpio["fecha"].max()
+        if resumen["fecha_min"] is None or fecha_min < resumen["fecha_min"]:
+            resumen["fecha_min"] = fecha_min
+        if resumen["fecha_max"] is None or fecha_max > resumen["fecha_max"]:
+            resumen["fecha_max"] = fecha_max
+
+    resumen["cuentas"] = len(cuentas)
+    return resumen
+
+
+# -------------------------------------------------------------------
+#   IMPORTACIÓN EN STREAMING
+# -------------------------------------------------------------------
+def importar_csv_streaming(
+    usuario_id: str,
+    archivo,
+    chunk_rows: int = CSV_CHUNK_ROWS,
+    on_progreso: Optional[Callable[[Dict[str, Any]], None]] = None,
+    modelo_etiquetas: Optional[ModeloCompilado] = None,
+    modelo_categorias: Optional[ModeloCompilado] = None,
+) -> Dict[str, Any]:
+    """
+    Importa el CSV bloque a bloque: lee `chunk_rows` filas, las normaliza y
+    las inserta con db.insertar_movimientos_bulk antes de leer el siguiente
+    bloque. En memoria solo vive un bloque a la vez.
+
+    Con `modelo_etiquetas` / `modelo_categorias`, cada bloque pasa por
+    completar_faltantes antes de insertarse.
+
+    Devuelve un dict con:
+      - leidas, insertados, errores: conteos totales
+      - etiquetas_sugeridas, categorias_sugeridas: filas completadas por los modelos
+      - detalle_errores: hasta MAX_ERRORES_DETALLE dicts {"fila", "error"}
+
+    `on_progreso` se llama tras cada bloque insertado con los conteos acumulados.
+    La cache del usuario se invalida una sola vez al final.
+    """
+    reporte: Dict[str, Any] = {
+        "leidas": 0,
+        "insertados": 0,
+        "errores": 0,
+        "etiquetas_sugeridas": 0,
+        "categorias_sugeridas": 0,
+        "detalle_errores": [],
+    }
+
+    def _registrar_errores(errores: List[Dict[str, Any]]):
+        reporte["errores"] += len(errores)
+        lugar = MAX_ERRORES_DETALLE - len(reporte["detalle_errores"])
+        if lugar > 0:
+            reporte["detalle_errores"].extend(errores[:lugar])
+
+    def _on_chunk(info: Dict[str, Any]):
+        reporte["insertados"] += len(info["insertados"])
+        _registrar_errores(info["fallidos"])
+        if on_progreso is not None:
+            on_progreso(dict(reporte, detalle_errores=None))
+
+    for n_bloque, df in enumerate(leer_csv_por_bloques(archivo, chunk_rows)):
+        if n_bloque == 0:
+            faltantes = columnas_faltantes(df.columns)
+            if faltantes:
+                raise ValueError(f"Faltan columnas obligatorias: {faltantes}")
+
+        limpio, errores = normalizar_movimientos(df, fila_inicial=reporte["leidas"])
+        reporte["leidas"] += len(df)
+        _registrar_errores(errores.to_dict("records"))
+
+        if not limpio.empty and (modelo_etiquetas is not None or modelo_categorias is not None):
+            limpio = completar_faltantes(limpio, modelo_etiquetas, modelo_categorias)
+            reporte["etiquetas_sugeridas"] += int(limpio["etiquetas_sugeridas"].sum())
+            reporte["categorias_sugeridas"] += int(limpio["categoria_sugerida"].sum())
+
+        insertar_movimientos_bulk(
+            usuario_id, limpio.to_dict("records"), on_chunk=_on_chunk, invalidar_cache=False
+        )
+
+    if reporte["insertados"]:
+        invalidar_cache_movimientos(usuario_id)
+    return reporte
@@ -0,0 +1,340 @@
+import atexit
+import bisect
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from consultas import rerun
+
+# ---------------------------------------------------------
+#  MÉTRICAS DE LATENCIA (DB, PÁGINAS Y CACHE)
+# ---------------------------------------------------------
+# Instrumentación liviana de los caminos calientes:
+#   - cada llamada de db.py, catalogos.py y db_async.py (latencia, filas y bytes devueltos)
+#   - cada página: tiempo de preparación de datos y de dibujado
+#   - aciertos y fallos de las caches medidas (listar_movimientos)
+#
+# FINANZAS_METRICAS elige el destino:
+#   (vacío, default) -> desactivadas; los decoradores solo llaman a la función
+#   jsonl            -> un evento JSON por línea en FINANZAS_METRICAS_ARCHIVO
+#   prometheus       -> totales e histogramas en formato texto de Prometheus
+#                       (para el textfile collector de node_exporter), que se
+#                       reescribe a lo sumo cada FINANZAS_METRICAS_INTERVALO s
+DESTINO_JSONL = "jsonl"
+DESTINO_PROMETHEUS = "prometheus"
+
+DESTINO = (os.getenv("FINANZAS_METRICAS") or "").strip().lower()
+ARCHIVO = (
+    os.getenv("FINANZAS_METRICAS_ARCHIVO")
+    or ("metricas.prom" if DESTINO == DESTINO_PROMETHEUS else "metricas.jsonl")
+).strip()
+INTERVALO = float(os.getenv("FINANZAS_METRICAS_INTERVALO") or 10)
+
+if DESTINO not in ("", DESTINO_JSONL, DESTINO_PROMETHEUS):
+    raise RuntimeError(
+        f"FINANZAS_METRICAS inválido: {DESTINO!r} (usar {DESTINO_JSONL!r} o {DESTINO_PROMETHEUS!r})."
+    )
+
+ACTIVAS = bool(DESTINO)
+
+PREFIJO = "finanzas"
+
+# Límites (segundos) de los buckets de los histogramas de latencia
+BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+
+# ---------------------------------------------------------
+#  DESTINOS
+# ---------------------------------------------------------
+class _Serie:
+    """Acumulado de una métrica con un juego de etiquetas."""
+
+    def __init__(self):
+        self.cantidad = 0
+        self.segundos: Optional[float] = None
+        self.buckets = [0] * len(BUCKETS)
+        self.valores: Dict[str, float] = {}
+
+
+class _Prometheus:
+    """Acumula en memoria y reescribe el archivo de texto de forma atómica."""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.series: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], _Serie] = {}
+        self.lock = threading.Lock()
+        self.ultima_escritura = 0.0
+
+    def registrar(self, evento: Dict[str, Any]) -> None:
+        etiquetas = tuple(sorted(evento["etiquetas"].items()))
+        with self.lock:
+            serie = self.series.setdefault((evento["metrica"], etiquetas), _Serie())
+            serie.cantidad += 1
+            segundos = evento.get("segundos")
+            if segundos is not None:
+                serie.segundos = (serie.segundos or 0.0) + segundos
+                for i in range(bisect.bisect_left(BUCKETS, segundos), len(BUCKETS)):
+                    serie.buckets[i] += 1
+            for nombre, valor in evento["valores"].items():
+                serie.valores[nombre] = serie.valores.get(nombre, 0) + valor
+
+            if time.monotonic() - self.ultima_escritura >= INTERVALO:
+                self._escribir()
+
+    def _escribir(self) -> None:
+        try:
+            tmp = f"{self.ruta}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(self.texto())
+            os.replace(tmp, self.ruta)
+        except Exception as e:
+            print(f"[METRICAS] Error al escribir {self.ruta}: {e}")
+        self.ultima_escritura = time.monotonic()
+
+    def volcar(self) -> None:
+        with self.lock:
+            self._escribir()
+
+    def texto(self) -> str:
+        """Las series acumuladas en formato de exposición de Prometheus."""
+        lineas: Dict[str, List[str]] = {}
+
+        def agregar(nombre: str, tipo: str, etiquetas, valor: float, sufijo: str = "", extra=()):
+            pares = ",".join(f'{k}="{_escapar(v)}"' for k, v in tuple(etiquetas) + tuple(extra))
+            if nombre not in lineas:
+                lineas[nombre] = [f"# TYPE {nombre} {tipo}"]
+            lineas[nombre].append(f"{nombre}{sufijo}{{{pares}}} {valor:g}")
+
+        for (metrica, etiquetas), serie in sorted(self.series.items()):
+            base = f"{PREFIJO}_{metrica}"
+            if serie.segundos is not None:
+                nombre = f"{base}_segundos"
+                for limite, acumulado in zip(BUCKETS, serie.buckets):
+                    agregar(nombre, "histogram", etiquetas, acumulado, "_bucket", [("le", f"{limite:g}")])
+                agregar(nombre, "histogram", etiquetas, serie.cantidad, "_bucket", [("le", "+Inf")])
+                agregar(nombre, "histogram", etiquetas, serie.segundos, "_sum")
+                agregar(nombre, "histogram", etiquetas, serie.cantidad, "_count")
+            else:
+                agregar(f"{base}_total", "counter", etiquetas, serie.cantidad)
+            for valor, total in sorted(serie.valores.items()):
+                agregar(f"{base}_{valor}_total", "counter", etiquetas, total)
+
+        return "".join("\n".join(bloque) + "\n" for bloque in lineas.values())
+
+
+class _Jsonl:
+    """Agrega un evento por línea al archivo."""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.lock = threading.Lock()
+        self.archivo = None
+
+    def registrar(self, evento: Dict[str, Any]) -> None:
+        linea = json.dumps(
+            {"ts": round(time.time(), 3), "metrica": evento["metrica"], **evento["etiquetas"],
+             **({"segundos": round(evento["segundos"], 6)} if evento.get("segundos") is not None else {}),
+             **evento["valores"]},
+            ensure_ascii=False,
+        )
+        with self.lock:
+            try:
+                if self.archivo is None:
+                    self.archivo = open(self.ruta, "a", encoding="utf-8")
+                self.archivo.write(linea + "\n")
+                self.archivo.flush()
+            except Exception as e:
+                print(f"[METRICAS] Error al escribir {self.ruta}: {e}")
+
+    def volcar(self) -> None:
+        with self.lock:
+            if self.archivo is not None:
+                self.archivo.flush()
+
+
+def _escapar(valor: Any) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_destino = None
+if DESTINO == DESTINO_JSONL:
+    _destino = _Jsonl(ARCHIVO)
+elif DESTINO == DESTINO_PROMETHEUS:
+    _destino = _Prometheus(ARCHIVO)
+if _destino is not None:
+    atexit.register(_destino.volcar)
+
+
+def registrar(
+    metrica: str,
+    etiquetas: Dict[str, str],
+    segundos: Optional[float] = None,
+    **valores: float,
+) -> None:
+    """
+    Registra un evento de `metrica` (p. ej. "db", "pagina", "cache"). Con
+    `segundos` alimenta un histograma de latencia; `valores` (filas, bytes,
+    errores) se suman como contadores.
+    """
+    if _destino is None:
+        return
+    try:
+        _destino.registrar({"metrica": metrica, "etiquetas": etiquetas, "segundos": segundos, "valores": valores})
+    except Exception as e:
+        print(f"[METRICAS] Error al registrar {metrica}: {e}")
+
+
+# ---------------------------------------------------------
+#  LLAMADAS A LA BASE
+# ---------------------------------------------------------
+def _filas_y_datos(resultado: Any) -> Tuple[int, Any]:
+    """Cantidad de filas de un resultado de db.py / catalogos.py y la parte con datos."""
+    if resultado is None or isinstance(resultado, (bool, int, float, str)):
+        return 0, None
+    if isinstance(resultado, dict):
+        if isinstance(resultado.get("data"), list):
+            return len(resultado["data"]), resultado["data"]
+        if isinstance(resultado.get("insertados"), int):
+            return resultado["insertados"], None
+        if all(isinstance(v, list) for v in resultado.values()):
+            return sum(len(v) for v in resultado.values()), resultado
+        return 1, resultado
+    if isinstance(resultado, (list, tuple)):
+        return len(resultado), resultado
+    return 0, None
+
+
+def _registrar_db(nombre: str, resultado: Any, segundos: float) -> None:
+    filas, datos = _filas_y_datos(resultado)
+    tamaño = len(json.dumps(datos, default=str).encode("utf-8")) if datos else 0
+    registrar("db", {"funcion": nombre}, segundos, filas=filas, bytes=tamaño)
+
+
+def medir_db(func: Callable) -> Callable:
+    """
+    Decorador para las funciones que hablan con la base: registra latencia,
+    filas devueltas y tamaño en bytes (JSON) de lo devuelto, como la métrica
+    "db" con la etiqueta funcion="<módulo>.<función>". Sirve también para
+    las corrutinas de db_async.py (mide hasta que terminan).
+    """
+    nombre = f"{func.__module__}.{func.__name__}"
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def medida_async(*args, **kwargs):
+            if not ACTIVAS:
+                return await func(*args, **kwargs)
+            inicio = time.perf_counter()
+            try:
+                resultado = await func(*args, **kwargs)
+            except BaseException:
+                registrar("db", {"funcion": nombre}, time.perf_counter() - inicio, errores=1)
+                raise
+            _registrar_db(nombre, resultado, time.perf_counter() - inicio)
+            return resultado
+        return medida_async
+
+    @functools.wraps(func)
+    def medida(*args, **kwargs):
+        if not ACTIVAS:
+            return func(*args, **kwargs)
+        inicio = time.perf_counter()
+        try:
+            resultado = func(*args, **kwargs)
+        except BaseException:
+            registrar("db", {"funcion": nombre}, time.perf_counter() - inicio, errores=1)
+            raise
+        _registrar_db(nombre, resultado, time.perf_counter() - inicio)
+        return resultado
+    return medida
+
+
+# ---------------------------------------------------------
+#  PÁGINAS: PREPARACIÓN DE DATOS Y DIBUJADO
+# ---------------------------------------------------------
+# medir_pagina envuelve el main() de cada página y mide su tiempo total.
+# Dentro, `with fase("datos"):` marca la preparación de datos; el resto del
+# tiempo se registra como fase "render".
+_pagina_actual: contextvars.ContextVar = contextvars.ContextVar("pagina_actual", default=None)
+
+FASE_DATOS = "datos"
+FASE_RENDER = "render"
+
+
+def medir_pagina(pagina: str) -> Callable:
+    """
+    Decorador para el main() de las páginas. Además de los tiempos, abre el
+    rerun en el que se cuentan los round trips a la base (consultas.rerun).
+    """
+    def decorador(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def medida(*args, **kwargs):
+            with rerun(pagina):
+                if not ACTIVAS:
+                    return func(*args, **kwargs)
+                fases: Dict[str, float] = {}
+                token = _pagina_actual.set((pagina, fases))
+                inicio = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    total = time.perf_counter() - inicio
+                    _pagina_actual.reset(token)
+                    for nombre, segundos in fases.items():
+                        registrar("pagina", {"pagina": pagina, "fase": nombre}, segundos)
+                    registrar("pagina", {"pagina": pagina, "fase": FASE_RENDER}, max(total - sum(fases.values()), 0.0))
+        return medida
+    return decorador
+
+
+@contextmanager
+def fase(nombre: str = FASE_DATOS) -> Iterator[None]:
+    """Mide un tramo de la página en curso (por defecto, la preparación de datos)."""
+    actual = _pagina_actual.get()
+    if actual is None:
+        yield
+        return
+    _, fases = actual
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        fases[nombre] = fases.get(nombre, 0.0) + time.perf_counter() - inicio
+
+
+# ---------------------------------------------------------
+#  ACIERTOS Y FALLOS DE CACHE
+# ---------------------------------------------------------
+# Streamlit no informa si una llamada salió de la cache. medir_cache recibe
+# el decorador de cache (p. ej. st.cache_data(ttl=300)) y marca cuándo se
+# ejecutó la función de verdad: si se ejecutó fue un fallo, si no un acierto.
+_calculando = threading.local()
+
+
+def medir_cache(nombre: str, cache: Callable[[Callable], Callable]) -> Callable:
+    def decorador(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def calcular(*args, **kwargs):
+            _calculando.fallo = True
+            return func(*args, **kwargs)
+
+        cacheada = cache(calcular)
+
+        @functools.wraps(func)
+        def medida(*args, **kwargs):
+            if not ACTIVAS:
+                return cacheada(*args, **kwargs)
+            _calculando.fallo = False
+            resultado = cacheada(*args, **kwargs)
+            registrar("cache", {"cache": nombre, "resultado": "miss" if _calculando.fallo else "hit"})
+            return resultado
+
+        medida.clear = cacheada.clear
+        return medida
+    return decorador
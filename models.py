@@ -1,9 +1,30 @@
-from dataclasses import dataclass
-from typing import List, Any, Dict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import List, Any, Dict, Optional, Set
 import json
+import math
+import threading
+import numpy as np
+import pandas as pd
 import streamlit as st
 
-from db import obtener_movimientos, obtener_movimientos_borrados
+from db import (
+    CONTEO_ESTIMADO_DESDE,
+    CONTEO_EXACTO_HASTA,
+    obtener_movimientos_modificados,
+    contar_movimientos,
+    normalizar_busqueda,
+)
+from cache_usuarios import DATASET_ACTIVOS, DATASET_BORRADOS, generacion, registrar_cache
+from metricas import medir_cache
+from etiquetas_inteligentes import (
+    ModeloCompilado,
+    entrenar_modelo,
+    actualizar_modelo,
+    compilar_modelo,
+    guardar_modelo,
+    cargar_modelo,
+)
 
 @dataclass
 class Movimiento:
@@ -21,7 +42,7 @@ class Movimiento:
 
 def _parse_etiquetas(raw: Any) -> list:
     """Convierte etiquetas en lista segura."""
-    if raw is None:
+    if raw is None or (isinstance(raw, float) and math.isnan(raw)):
         return []
     if isinstance(raw, list):
         return [str(x) for x in raw]
@@ -45,57 +66,448 @@ def _parse_deleted(value: Any) -> bool:
     return False
 
 
-@st.cache_data(ttl=300)
+def _a_movimiento(row: Dict[str, Any]) -> Movimiento:
+    return Movimiento(
+        id=row.get("id"),
+        fecha=row.get("fecha") or "",
+        categoria=row.get("categoria") or "Sin categoría",
+        tipo=row.get("tipo") or "",
+        descripcion=row.get("descripcion") or "",
+        monto=float(row.get("monto") or 0),
+        cuenta=row.get("cuenta") or "Sin cuenta",
+        etiquetas=_parse_etiquetas(row.get("etiquetas")),
+        created_at=row.get("created_at"),
+        deleted=_parse_deleted(row.get("deleted")),
+    )
+
+
+# ---------------------------------------------------------
+#  SINCRONIZACIÓN INCREMENTAL (watermark por usuario)
+# ---------------------------------------------------------
+# Cada usuario tiene en memoria todas sus filas (activas y borradas) y el
+# mayor updated_at visto. Al refrescar solo se piden las filas con
+# updated_at >= watermark - MARGEN_SYNC; el margen cubre transacciones que
+# confirmaron con un updated_at apenas anterior al watermark. Como el merge
+# es por id, volver a recibir una fila no tiene efecto.
+MARGEN_SYNC = timedelta(seconds=30)
+
+
+@dataclass
+class EstadoSync:
+    filas: Dict[Any, Dict[str, Any]] = field(default_factory=dict)
+    watermark: Optional[str] = None
+    # Se incrementa cada vez que una sincronización trae cambios reales
+    version: int = 0
+    ledger: Optional["Ledger"] = None
+    # Ids modificados desde la última actualización del ledger
+    ids_pendientes: Set[Any] = field(default_factory=set)
+    # Modelos de sugerencia por nombre ("etiquetas", "categorias") y, para
+    # cada uno, por id modificado desde su última actualización, la fila tal
+    # como la conoce el modelo (None si es nueva)
+    modelos: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    modelos_pendientes: Dict[str, Dict[Any, Optional[Dict[str, Any]]]] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+
+@st.cache_resource(ttl=3600, max_entries=200, show_spinner=False)
+def _estado_sync(usuario_id: str) -> EstadoSync:
+    return EstadoSync()
+
+
+def _parse_timestamp(valor: Any) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(str(valor).replace("Z", "+00:00"))
+    except Exception:
+        return None
+
+
+def sincronizar_movimientos(usuario_id: str) -> EstadoSync:
+    """
+    Trae los cambios del usuario desde el último watermark y los mezcla en
+    su estado en memoria. La primera vez (o si la tabla no tiene updated_at)
+    trae todas las filas. Si la consulta falla, se conserva el estado previo.
+    """
+    estado = _estado_sync(usuario_id)
+
+    with estado.lock:
+        desde = None
+        marca = _parse_timestamp(estado.watermark) if estado.watermark else None
+        if marca is not None:
+            desde = (marca - MARGEN_SYNC).isoformat()
+
+        cambios = obtener_movimientos_modificados(usuario_id, desde)
+        if cambios is None:
+            return estado
+
+        if desde is None:
+            # Sincronización completa: reemplaza todo el estado
+            filas = {row.get("id"): row for row in cambios}
+            if filas != estado.filas:
+                estado.filas = filas
+                estado.version += 1
+                estado.ledger = None
+                estado.ids_pendientes = set()
+                estado.modelos = {}
+                estado.modelos_pendientes = {}
+        else:
+            hubo_cambios = False
+            for row in cambios:
+                if estado.filas.get(row.get("id")) != row:
+                    for pendientes in estado.modelos_pendientes.values():
+                        pendientes.setdefault(row.get("id"), estado.filas.get(row.get("id")))
+                    estado.filas[row.get("id")] = row
+                    estado.ids_pendientes.add(row.get("id"))
+                    hubo_cambios = True
+            if hubo_cambios:
+                estado.version += 1
+
+        marcas = [m for m in (_parse_timestamp(r.get("updated_at")) for r in cambios) if m is not None]
+        if marcas:
+            nueva = max(marcas)
+            if marca is None or nueva > marca:
+                estado.watermark = nueva.isoformat()
+
+    return estado
+
+
+def _filas_ordenadas(estado: EstadoSync, borradas: bool) -> List[Dict[str, Any]]:
+    """Filas activas o borradas, ordenadas por fecha desc, id desc."""
+    filas = [r for r in estado.filas.values() if _parse_deleted(r.get("deleted")) == borradas]
+    filas.sort(key=lambda r: (str(r.get("fecha") or ""), r.get("id") or 0), reverse=True)
+    return filas
+
+
+@registrar_cache(DATASET_ACTIVOS)
+@medir_cache("listar_movimientos", st.cache_data(ttl=300))
 def listar_movimientos(usuario_id: str) -> List[Movimiento]:
     """
     Devuelve la lista de movimientos como objetos Movimiento.
-    Cacheada por Streamlit por defecto 300s (5 minutos).
-    """
-    rows = obtener_movimientos(usuario_id)
-    movimientos: List[Movimiento] = []
-
-    for row in rows:
-        movimientos.append(
-            Movimiento(
-                id=row.get("id"),
-                fecha=row.get("fecha") or "",
-                categoria=row.get("categoria") or "Sin categoría",
-                tipo=row.get("tipo") or "",
-                descripcion=row.get("descripcion") or "",
-                monto=float(row.get("monto") or 0),
-                cuenta=row.get("cuenta") or "Sin cuenta",
-                etiquetas=_parse_etiquetas(row.get("etiquetas")),
-                created_at=row.get("created_at"),
-                deleted=_parse_deleted(row.get("deleted")),
-            )
-        )
-
-    return movimientos
+    Cacheada por Streamlit por defecto 300s (5 minutos); al vencer solo se
+    sincronizan los cambios desde el último watermark.
+    """
+    estado = sincronizar_movimientos(usuario_id)
+    return [_a_movimiento(row) for row in _filas_ordenadas(estado, borradas=False)]
 
 
+@registrar_cache(DATASET_BORRADOS)
 @st.cache_data(ttl=300)
 def listar_movimientos_borrados(usuario_id: str) -> List[Movimiento]:
     """
     Lista movimientos marcados como borrados (deleted = True).
     Cacheada por 300s.
     """
-    rows = obtener_movimientos_borrados(usuario_id)
-    movimientos: List[Movimiento] = []
-
-    for row in rows:
-        movimientos.append(
-            Movimiento(
-                id=row.get("id"),
-                fecha=row.get("fecha") or "",
-                categoria=row.get("categoria") or "Sin categoría",
-                tipo=row.get("tipo") or "",
-                descripcion=row.get("descripcion") or "",
-                monto=float(row.get("monto") or 0),
-                cuenta=row.get("cuenta") or "Sin cuenta",
-                etiquetas=_parse_etiquetas(row.get("etiquetas")),
-                created_at=row.get("created_at"),
-                deleted=_parse_deleted(row.get("deleted")),
-            )
-        )
-
-    return movimientos
\ No newline at end of file
+    estado = sincronizar_movimientos(usuario_id)
+    return [_a_movimiento(row) for row in _filas_ordenadas(estado, borradas=True)]
+
+
+# ---------------------------------------------------------
+#  CONTEOS CACHEADOS POR FILTRO
+# ---------------------------------------------------------
+@st.cache_data(ttl=600, max_entries=1000, show_spinner=False)
+def _contar_cacheado(
+    usuario_id: str,
+    filtros: tuple,
+    estimado: bool,
+    generacion_activos: int,
+) -> int:
+    fecha_desde, fecha_hasta, cuenta, categoria, texto = filtros
+    total = contar_movimientos(usuario_id, fecha_desde, fecha_hasta, cuenta, categoria, texto, estimado=estimado)
+    if total is None:
+        # Las excepciones no quedan en la cache: el próximo rerun reintenta
+        raise _ConteoFallido()
+    return total
+
+
+class _ConteoFallido(Exception):
+    pass
+
+
+def _contar(usuario_id: str, filtros: tuple, estimado: bool) -> Optional[int]:
+    try:
+        return _contar_cacheado(usuario_id, filtros, estimado, generacion(usuario_id, DATASET_ACTIVOS))
+    except _ConteoFallido:
+        return None
+
+
+def contar_movimientos_filtrados(
+    usuario_id: str,
+    fecha_desde: Optional[str] = None,
+    fecha_hasta: Optional[str] = None,
+    cuenta: Optional[str] = None,
+    categoria: Optional[str] = None,
+    texto: Optional[str] = None,
+    estimado: Optional[bool] = None,
+) -> Optional[int]:
+    """
+    Total de movimientos activos con esos filtros, contado una sola vez por
+    usuario y combinación de filtros y reutilizado al cambiar de página.
+    Las escrituras del usuario lo invalidan (ver cache_usuarios.generacion).
+
+    Por defecto es exacto; si CONTEO_ESTIMADO_DESDE está configurado, los
+    totales por encima de ese umbral quedan estimados (ver
+    conteo_es_estimado). `estimado` True/False fuerza un modo. Devuelve None
+    si el conteo falló (y no lo guarda en la cache).
+    """
+    filtros = (fecha_desde or None, fecha_hasta or None, cuenta or None, categoria or None, normalizar_busqueda(texto) or None)
+    if estimado is not None:
+        return _contar(usuario_id, filtros, estimado)
+    if not CONTEO_ESTIMADO_DESDE:
+        return _contar(usuario_id, filtros, False)
+
+    # La estimación es barata y, hasta CONTEO_EXACTO_HASTA, exacta: solo se
+    # cuenta de nuevo si quedó entre ese límite y el umbral
+    total = _contar(usuario_id, filtros, True)
+    if total is None or total > CONTEO_ESTIMADO_DESDE or total <= CONTEO_EXACTO_HASTA:
+        return total
+    return _contar(usuario_id, filtros, False)
+
+
+def conteo_es_estimado(total: Optional[int], estimado: Optional[bool] = None) -> bool:
+    """True si contar_movimientos_filtrados pudo devolver `total` estimado."""
+    if total is None or total <= CONTEO_EXACTO_HASTA:
+        return False
+    if estimado is not None:
+        return estimado
+    return bool(CONTEO_ESTIMADO_DESDE) and total > CONTEO_ESTIMADO_DESDE
+
+
+# ---------------------------------------------------------
+#  LEDGER COLUMNAR (compartido por las páginas de análisis)
+# ---------------------------------------------------------
+COLUMNAS_LEDGER = [
+    "id",
+    "Fecha",
+    "Tipo",
+    "Categoría",
+    "Descripción",
+    "Monto",
+    "Monto_signed",
+    "Cuenta",
+    "Etiquetas",
+    "Mes",
+    "Año",
+]
+
+
+@dataclass(frozen=True)
+class Ledger:
+    """
+    Movimientos activos de un usuario en formato columnar, con las columnas
+    derivadas ya calculadas (Fecha parseada, Monto_signed, Mes "YYYY-MM", Año).
+
+    La misma instancia se comparte entre reruns y páginas: es de solo
+    lectura. Las páginas filtran o agrupan `df`; si necesitan agregar
+    columnas deben trabajar sobre una copia. `version` cambia cada vez que
+    la sincronización trae cambios del usuario.
+    """
+    df: pd.DataFrame
+    version: int = 0
+
+    @property
+    def vacio(self) -> bool:
+        return self.df.empty
+
+    @property
+    def meses(self) -> List[str]:
+        return sorted(self.df["Mes"].dropna().unique().tolist())
+
+    @property
+    def años(self) -> List[int]:
+        return sorted(int(a) for a in self.df["Año"].dropna().unique())
+
+    def del_mes(self, mes: str) -> pd.DataFrame:
+        return self.df[self.df["Mes"] == mes]
+
+    def del_año(self, año: int) -> pd.DataFrame:
+        return self.df[self.df["Año"] == año]
+
+
+def _claves_mes(fecha: pd.Series) -> np.ndarray:
+    """Devuelve "YYYY-MM" por fila formateando solo los meses distintos (NaN si no hay fecha)."""
+    codigos, unicos = pd.factorize(fecha.dt.year * 100 + fecha.dt.month)
+    etiquetas = [f"{int(c) // 100:04d}-{int(c) % 100:02d}" for c in unicos] + [np.nan]
+    return np.array(etiquetas, dtype=object)[codigos]
+
+
+def construir_ledger(rows: List[Dict[str, Any]]) -> Ledger:
+    """Arma el Ledger a partir de las filas crudas de 'movimientos', sin recorrerlas fila por fila."""
+    if not rows:
+        return Ledger(pd.DataFrame(columns=COLUMNAS_LEDGER))
+
+    crudo = pd.DataFrame(rows)
+
+    def _col(nombre: str, defecto: Any) -> pd.Series:
+        if nombre not in crudo.columns:
+            return pd.Series(defecto, index=crudo.index)
+        return crudo[nombre]
+
+    fecha = pd.to_datetime(_col("fecha", None), errors="coerce")
+    tipo = _col("tipo", "").fillna("").astype(str).str.strip().str.lower()
+    monto = pd.to_numeric(_col("monto", 0), errors="coerce").fillna(0.0).astype(float)
+
+    df = pd.DataFrame({
+        "id": _col("id", None),
+        "Fecha": fecha,
+        "Tipo": tipo,
+        "Categoría": _col("categoria", None).fillna("Sin categoría").replace("", "Sin categoría"),
+        "Descripción": _col("descripcion", "").fillna(""),
+        "Monto": monto,
+        "Monto_signed": np.where(tipo == "ingreso", monto, -monto),
+        "Cuenta": _col("cuenta", None).fillna("Sin cuenta").replace("", "Sin cuenta"),
+        "Etiquetas": [
+            e if isinstance(e, list) else _parse_etiquetas(e)
+            for e in _col("etiquetas", None).tolist()
+        ],
+        "Mes": _claves_mes(fecha),
+        "Año": fecha.dt.year.astype("Int64"),
+    })
+
+    return Ledger(_solo_lectura(df))
+
+
+def _solo_lectura(df: pd.DataFrame) -> pd.DataFrame:
+    """Marca los arrays numéricos como solo lectura (el ledger se comparte)."""
+    for columna in ("Monto", "Monto_signed"):
+        valores = df[columna].to_numpy()
+        if valores.flags.writeable:
+            try:
+                valores.setflags(write=False)
+            except ValueError:
+                pass
+    return df
+
+
+def _ordenar_ledger(df: pd.DataFrame) -> pd.DataFrame:
+    return df.sort_values(["Fecha", "id"], ascending=False, kind="stable", ignore_index=True)
+
+
+def _actualizar_ledger(estado: EstadoSync) -> Ledger:
+    """
+    Devuelve el Ledger del estado sincronizado. Si solo cambiaron algunas
+    filas, reemplaza esas filas en el ledger anterior en lugar de rehacerlo.
+    """
+    with estado.lock:
+        if estado.ledger is None:
+            activas = [r for r in estado.filas.values() if not _parse_deleted(r.get("deleted"))]
+            ledger = construir_ledger(activas)
+            estado.ledger = Ledger(_solo_lectura(_ordenar_ledger(ledger.df)), estado.version)
+        elif estado.ids_pendientes:
+            ids = estado.ids_pendientes
+            base = estado.ledger.df
+            base = base[~base["id"].isin(list(ids))]
+            nuevas = [
+                estado.filas[i] for i in ids
+                if i in estado.filas and not _parse_deleted(estado.filas[i].get("deleted"))
+            ]
+            if nuevas:
+                base = pd.concat([base, construir_ledger(nuevas).df], ignore_index=True)
+            estado.ledger = Ledger(_solo_lectura(_ordenar_ledger(base)), estado.version)
+
+        estado.ids_pendientes = set()
+        return estado.ledger
+
+
+@registrar_cache(DATASET_ACTIVOS)
+@st.cache_resource(ttl=300, show_spinner=False)
+def obtener_ledger(usuario_id: str) -> Ledger:
+    """
+    Devuelve el Ledger de movimientos activos del usuario.
+    Se construye una vez y se comparte (sin copias) durante 300s; al vencer
+    o invalidarse se sincronizan y mezclan solo los cambios.
+    """
+    return _actualizar_ledger(sincronizar_movimientos(usuario_id))
+
+
+# ---------------------------------------------------------
+#  MODELOS DE SUGERENCIA (persistidos e incrementales)
+# ---------------------------------------------------------
+# Cada modelo (etiquetas, y categorías con el mismo clasificador) se
+# entrena una vez con todo el historial y se guarda en disco
+# (etiquetas_inteligentes.MODELOS_DIR). Después, cada sincronización que trae
+# movimientos nuevos, editados o borrados solo resta la versión anterior de
+# esas filas y suma la nueva. El archivo se identifica por el watermark de
+# sincronización y la cantidad de filas: el contador `version` del estado
+# vive en memoria y se reinicia con el proceso, el watermark no.
+def _mov_modelo(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {"descripcion": row.get("descripcion") or "", "etiquetas": _parse_etiquetas(row.get("etiquetas"))}
+
+
+def _mov_categoria(row: Dict[str, Any]) -> Dict[str, Any]:
+    categoria = row.get("categoria") or "Sin categoría"
+    etiquetas = [] if categoria == "Sin categoría" else [categoria]
+    return {"descripcion": row.get("descripcion") or "", "etiquetas": etiquetas}
+
+
+# Nombre del modelo -> cómo se convierte una fila en ejemplo de entrenamiento
+_EJEMPLOS_MODELO = {
+    "etiquetas": _mov_modelo,
+    "categorias": _mov_categoria,
+}
+
+
+def _activa(row: Optional[Dict[str, Any]]) -> bool:
+    return row is not None and not _parse_deleted(row.get("deleted"))
+
+
+def _actualizar_modelo(usuario_id: str, estado: EstadoSync, nombre: str = "etiquetas") -> Dict[str, Any]:
+    ejemplo = _EJEMPLOS_MODELO[nombre]
+
+    with estado.lock:
+        clave = {"watermark": estado.watermark, "filas": len(estado.filas)}
+        modelo = estado.modelos.get(nombre)
+        pendientes = estado.modelos_pendientes.get(nombre) or {}
+
+        if modelo is None:
+            modelo = cargar_modelo(usuario_id, clave, nombre) if estado.watermark else None
+            if modelo is None:
+                modelo = entrenar_modelo([ejemplo(r) for r in estado.filas.values() if _activa(r)])
+                guardar_modelo(usuario_id, modelo, clave, nombre)
+        elif pendientes:
+            quitar = [ejemplo(r) for r in pendientes.values() if _activa(r)]
+            agregar = [ejemplo(estado.filas[i]) for i in pendientes if _activa(estado.filas.get(i))]
+            modelo = actualizar_modelo(modelo, quitar, agregar)
+            guardar_modelo(usuario_id, modelo, clave, nombre)
+
+        estado.modelos[nombre] = modelo
+        estado.modelos_pendientes[nombre] = {}
+        return modelo
+
+
+@registrar_cache(DATASET_ACTIVOS)
+@st.cache_resource(ttl=300, show_spinner=False)
+def modelo_etiquetas(usuario_id: str) -> Dict[str, Any]:
+    """
+    Modelo de sugerencia de etiquetas del usuario, listo para
+    etiquetas_inteligentes.predecir_etiquetas. Se comparte sin copias; no
+    modificarlo. Las escrituras del usuario lo invalidan y la siguiente
+    llamada aplica solo los cambios.
+    """
+    return _actualizar_modelo(usuario_id, sincronizar_movimientos(usuario_id), "etiquetas")
+
+
+@registrar_cache(DATASET_ACTIVOS)
+@st.cache_resource(ttl=300, show_spinner=False)
+def modelo_etiquetas_compilado(usuario_id: str) -> ModeloCompilado:
+    """
+    modelo_etiquetas compilado para predicción vectorizada
+    (predecir_etiquetas / predecir_etiquetas_batch). Se recompila al
+    vencer o invalidarse la cache (escrituras del usuario).
+    """
+    return compilar_modelo(modelo_etiquetas(usuario_id))
+
+
+@registrar_cache(DATASET_ACTIVOS)
+@st.cache_resource(ttl=300, show_spinner=False)
+def modelo_categorias(usuario_id: str) -> Dict[str, Any]:
+    """
+    Mismo clasificador que el de etiquetas, entrenado con la categoría de
+    cada movimiento ("Sin categoría" no cuenta).
+    """
+    return _actualizar_modelo(usuario_id, sincronizar_movimientos(usuario_id), "categorias")
+
+
+@registrar_cache(DATASET_ACTIVOS)
+@st.cache_resource(ttl=300, show_spinner=False)
+def modelo_categorias_compilado(usuario_id: str) -> ModeloCompilado:
+    """modelo_categorias compilado para predicción vectorizada."""
+    return compilar_modelo(modelo_categorias(usuario_id))
@@ -1,9 +1,9 @@
 import streamlit as st
-import pandas as pd
 import json
 import os
 
-from models import listar_movimientos
+from analytics import obtener_analitica
+from metricas import fase, medir_pagina
 from auth import check_auth
 from ui import topbar
 
@@ -27,6 +27,7 @@ def cargar_objetivos():
     return data
 
 
+@medir_pagina("10_Alertas")
 def main():
     check_auth()
     topbar()
@@ -38,41 +39,20 @@ def main():
 
     st.markdown("---")
 
-    objetivos = cargar_objetivos()
-    movimientos = listar_movimientos(usuario_id)
+    with fase():
+        objetivos = cargar_objetivos()
+        analitica = obtener_analitica(usuario_id)
 
-    if not movimientos:
+    if analitica.vacio:
         st.info("Todavía no hay movimientos cargados.")
         return
 
-    df = pd.DataFrame(
-        [
-            {
-                "Fecha": m.fecha,
-                "Tipo": m.tipo.lower(),
-                "Categoría": m.categoria,
-                "Monto": m.monto,
-                "Cuenta": m.cuenta,
-            }
-            for m in movimientos
-        ]
-    )
-
-    df["Fecha"] = pd.to_datetime(df["Fecha"])
-    df["Mes"] = df["Fecha"].dt.to_period("M").astype(str)
-    df["Monto_signed"] = df.apply(
-        lambda row: row["Monto"] if row["Tipo"] == "ingreso" else -row["Monto"],
-        axis=1,
-    )
-
     # ----------------------------------------------------------------------
     # 🏦 ALERTAS POR CUENTA
     # ----------------------------------------------------------------------
     st.header("🏦 Alertas por Cuenta")
 
-    saldo_por_cuenta = df.groupby("Cuenta")["Monto_signed"].sum()
-
-    for cuenta, saldo in saldo_por_cuenta.items():
+    for cuenta, saldo in analitica.saldo_por_cuenta().items():
         minimo = objetivos["cuentas_min"].get(cuenta)
         objetivo = objetivos["cuentas"].get(cuenta)
 
@@ -107,13 +87,7 @@ def main():
     # ----------------------------------------------------------------------
     st.header("📂 Alertas por Categoría")
 
-    gastos_por_cat = (
-        df[df["Tipo"] == "gasto"]
-        .groupby("Categoría")["Monto"]
-        .sum()
-    )
-
-    for categoria, gasto in gastos_por_cat.items():
+    for categoria, gasto in analitica.gastos_por_categoria().items():
         objetivo = objetivos["categorias"].get(categoria)
 
         if objetivo is not None:
@@ -135,7 +109,7 @@ def main():
     # ----------------------------------------------------------------------
     st.header("📅 Alerta de Balance Mensual")
 
-    resumen_mensual = df.groupby("Mes")["Monto_signed"].sum().sort_index()
+    resumen_mensual = analitica.por_mes.set_index("mes")["balance"]
 
     mes_actual = resumen_mensual.index.max()
     balance_actual = resumen_mensual.loc[mes_actual]
@@ -158,35 +132,24 @@ def main():
     # ----------------------------------------------------------------------
     st.header("📈 Alerta de Gasto Inusual")
 
-    gastos_mensuales = (
-        df[df["Tipo"] == "gasto"]
-        .groupby(["Mes", "Categoría"])["Monto"]
-        .sum()
-        .reset_index()
-    )
-
-    meses = sorted(gastos_mensuales["Mes"].unique())
+    meses = analitica.meses_con_gastos
 
     if len(meses) >= 2:
         mes_actual = meses[-1]
         mes_anterior = meses[-2]
 
-        df_act = gastos_mensuales[gastos_mensuales["Mes"] == mes_actual]
-        df_ant = gastos_mensuales[gastos_mensuales["Mes"] == mes_anterior]
-
-        merged = pd.merge(df_act, df_ant, on="Categoría", how="left", suffixes=("_act", "_ant"))
-        merged["Monto_ant"] = merged["Monto_ant"].fillna(0)
-
-        for _, row in merged.iterrows():
-            if row["Monto_ant"] > 0:
-                variacion = (row["Monto_act"] - row["Monto_ant"]) / row["Monto_ant"]
-                if variacion > 0.5:
-                    st.warning(
-                        f"🔶 Gasto inusual en **{row['Categoría']}**.\n"
-                        f"Mes actual: ${formato_argentino(row['Monto_act'])} — "
-                        f"Mes anterior: ${formato_argentino(row['Monto_ant'])}\n"
-                        f"Aumento del {variacion*100:.1f}%"
-                    )
+        comparacion = analitica.comparar_gastos(mes_actual, mes_anterior)
+        comparacion = comparacion[(comparacion["Gasto_actual"] > 0) & (comparacion["Gasto_anterior"] > 0)]
+
+        for categoria, row in comparacion.iterrows():
+            variacion = row["Variación"] / row["Gasto_anterior"]
+            if variacion > 0.5:
+                st.warning(
+                    f"🔶 Gasto inusual en **{categoria}**.\n"
+                    f"Mes actual: ${formato_argentino(row['Gasto_actual'])} — "
+                    f"Mes anterior: ${formato_argentino(row['Gasto_anterior'])}\n"
+                    f"Aumento del {variacion*100:.1f}%"
+                )
     else:
         st.info("No hay suficientes meses para comparar gastos.")
 
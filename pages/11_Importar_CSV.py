@@ -1,21 +1,18 @@
 import streamlit as st
 import pandas as pd
-import json
 
-from db import insertar_movimiento
+from importador import COLUMNAS_OBLIGATORIAS, resumir_csv, importar_csv_streaming
+from models import modelo_etiquetas_compilado, modelo_categorias_compilado
+from metricas import fase, medir_pagina
 from auth import check_auth
 from ui import topbar
 
 
-def formato_argentino_a_float(valor):
-    if isinstance(valor, str):
-        valor = valor.replace(".", "").replace(",", ".")
-    try:
-        return float(valor)
-    except:
-        return None
+def formato_argentino(valor):
+    return f"{valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
 
+@medir_pagina("11_Importar_CSV")
 def main():
     check_auth()
     topbar()
@@ -29,11 +26,11 @@ def main():
         """
         El archivo debe contener las siguientes columnas:
 
-        - **fecha** (YYYY-MM-DD)  
+        - **fecha** (YYYY-MM-DD o DD/MM/YYYY)  
         - **categoria**  
         - **tipo** (ingreso / gasto)  
         - **descripcion**  
-        - **monto**  
+        - **monto** (1.234,56 o 1234.56)  
         - **cuenta**  
         - **etiquetas** (opcional, separadas por comas)
         """
@@ -44,56 +41,99 @@ def main():
     if archivo is None:
         return
 
-    try:
-        df = pd.read_csv(archivo)
-    except Exception as e:
-        st.error(f"Error al leer el CSV: {e}")
-        return
-
-    columnas_obligatorias = ["fecha", "categoria", "tipo", "descripcion", "monto", "cuenta"]
-
-    if not all(col in df.columns for col in columnas_obligatorias):
+    autocompletar = st.checkbox(
+        "🤖 Completar etiquetas y categorías vacías con sugerencias",
+        value=False,
+        help="Usa el historial de tus movimientos para proponer una etiqueta y una categoría "
+             "en las filas que las tengan vacías.",
+    )
+    modelos = {}
+    if autocompletar:
+        with st.spinner("Preparando sugerencias..."), fase():
+            modelos = {
+                "modelo_etiquetas": modelo_etiquetas_compilado(usuario_id),
+                "modelo_categorias": modelo_categorias_compilado(usuario_id),
+            }
+
+    # El resumen recorre el archivo por bloques; se guarda por archivo
+    # para no recalcularlo en cada rerun.
+    clave_archivo = (getattr(archivo, "file_id", archivo.name), archivo.size, autocompletar)
+    if st.session_state.get("importar_csv_clave") != clave_archivo:
+        try:
+            with st.spinner("Analizando archivo..."), fase():
+                resumen = resumir_csv(archivo, **modelos)
+        except Exception as e:
+            st.error(f"Error al leer el CSV: {e}")
+            return
+        st.session_state["importar_csv_clave"] = clave_archivo
+        st.session_state["importar_csv_resumen"] = resumen
+
+    resumen = st.session_state["importar_csv_resumen"]
+
+    if resumen["faltantes"]:
         st.error("El CSV no contiene todas las columnas obligatorias.")
-        st.write("Columnas requeridas:", columnas_obligatorias)
-        st.write("Columnas encontradas:", df.columns.tolist())
+        st.write("Columnas requeridas:", COLUMNAS_OBLIGATORIAS)
+        st.write("Columnas encontradas:", resumen["columnas"])
         return
 
-    df["monto"] = df["monto"].apply(formato_argentino_a_float)
-
-    if "etiquetas" not in df.columns:
-        df["etiquetas"] = ""
-
     st.subheader("📄 Previsualización del archivo")
-    st.dataframe(df, use_container_width=True)
+    st.caption(f"Primeras {len(resumen['muestra'])} filas de {resumen['filas']}")
+    st.dataframe(resumen["muestra"], use_container_width=True)
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("🧾 Filas válidas", f"{resumen['validas']} / {resumen['filas']}")
+    col2.metric("💰 Ingresos", f"${formato_argentino(resumen['ingresos'])}")
+    col3.metric("💸 Gastos", f"${formato_argentino(resumen['gastos'])}")
+    if resumen["fecha_min"]:
+        st.caption(
+            f"Período: {resumen['fecha_min']} → {resumen['fecha_max']} — "
+            f"{resumen['cuentas']} cuentas distintas"
+        )
+    if resumen["errores"]:
+        st.warning(f"Filas con error de formato: {resumen['errores']}")
+
+    if autocompletar:
+        st.subheader("🤖 Sugerencias")
+        st.caption(
+            f"Se completarán las etiquetas de hasta {resumen['sin_etiquetas']} filas "
+            f"y la categoría de hasta {resumen['sin_categoria']} filas."
+        )
+        if not resumen["propuestas"].empty:
+            propuestas = resumen["propuestas"].assign(
+                etiquetas=resumen["propuestas"]["etiquetas"].map(", ".join)
+            )
+            st.dataframe(propuestas, use_container_width=True, hide_index=True)
 
     if st.button("📥 Importar movimientos", use_container_width=True):
-        errores = 0
-        cargados = 0
-
-        for _, row in df.iterrows():
-            try:
-                etiquetas = []
-                if isinstance(row["etiquetas"], str) and row["etiquetas"].strip():
-                    etiquetas = [e.strip() for e in row["etiquetas"].split(",") if e.strip()]
-
-                insertar_movimiento(
-                    usuario_id=usuario_id,
-                    fecha=str(row["fecha"]),
-                    categoria=row["categoria"],
-                    tipo=row["tipo"].lower(),
-                    descripcion=row["descripcion"],
-                    monto=float(row["monto"]),
-                    cuenta=row["cuenta"],
-                    etiquetas_json=json.dumps(etiquetas, ensure_ascii=False),
-                )
-                cargados += 1
-            except:
-                errores += 1
-
-        st.success(f"Movimientos cargados: {cargados}")
-        if errores > 0:
-            st.warning(f"Movimientos con error: {errores}")
-
+        total = max(resumen["filas"], 1)
+        progreso = st.progress(0.0, text="Importando movimientos...")
+
+        def _on_progreso(info):
+            procesadas = info["insertados"] + info["errores"]
+            progreso.progress(
+                min(procesadas / total, 1.0),
+                text=f"{info['insertados']} cargados, {info['errores']} con error",
+            )
+
+        try:
+            with fase("importar"):
+                reporte = importar_csv_streaming(usuario_id, archivo, on_progreso=_on_progreso, **modelos)
+        except Exception as e:
+            progreso.empty()
+            st.error(f"Error al importar el CSV: {e}")
+            return
+        progreso.empty()
+
+        st.success(f"Movimientos cargados: {reporte['insertados']}")
+        if reporte["etiquetas_sugeridas"] or reporte["categorias_sugeridas"]:
+            st.info(
+                f"Completados con sugerencias: {reporte['etiquetas_sugeridas']} etiquetas, "
+                f"{reporte['categorias_sugeridas']} categorías"
+            )
+        if reporte["errores"] > 0:
+            st.warning(f"Movimientos con error: {reporte['errores']}")
+            if reporte["detalle_errores"]:
+                st.dataframe(pd.DataFrame(reporte["detalle_errores"]), use_container_width=True)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
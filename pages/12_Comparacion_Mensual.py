@@ -1,8 +1,8 @@
 import streamlit as st
-import pandas as pd
 import altair as alt
 
-from models import listar_movimientos
+from analytics import obtener_analitica
+from metricas import fase, medir_pagina
 from auth import check_auth
 from ui import topbar
 
@@ -11,6 +11,7 @@ def formato_argentino(valor):
     return f"{valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
 
+@medir_pagina("12_Comparacion_Mensual")
 def main():
     check_auth()
     topbar()
@@ -22,34 +23,14 @@ def main():
 
     st.markdown("---")
 
-    movimientos = listar_movimientos(usuario_id)
+    with fase():
+        analitica = obtener_analitica(usuario_id)
 
-    if not movimientos:
+    if analitica.vacio:
         st.info("Todavía no hay movimientos cargados.")
         return
 
-    df = pd.DataFrame(
-        [
-            {
-                "Fecha": m.fecha,
-                "Tipo": m.tipo.lower(),
-                "Categoría": m.categoria,
-                "Monto": m.monto,
-                "Cuenta": m.cuenta,
-            }
-            for m in movimientos
-        ]
-    )
-
-    df["Fecha"] = pd.to_datetime(df["Fecha"])
-    df["Mes"] = df["Fecha"].dt.to_period("M").astype(str)
-
-    df["Monto_signed"] = df.apply(
-        lambda row: row["Monto"] if row["Tipo"] == "ingreso" else -row["Monto"],
-        axis=1,
-    )
-
-    meses = sorted(df["Mes"].unique())
+    meses = analitica.meses
 
     if len(meses) < 2:
         st.info("Se necesitan al menos dos meses para comparar.")
@@ -60,11 +41,8 @@ def main():
 
     st.header(f"📅 Comparación: {mes_anterior} → {mes_actual}")
 
-    df_act = df[df["Mes"] == mes_actual]
-    df_ant = df[df["Mes"] == mes_anterior]
-
-    balance_act = df_act["Monto_signed"].sum()
-    balance_ant = df_ant["Monto_signed"].sum()
+    balance_act = analitica.totales(mes_actual)["balance"]
+    balance_ant = analitica.totales(mes_anterior)["balance"]
 
     variacion = balance_act - balance_ant
     variacion_pct = (variacion / abs(balance_ant)) * 100 if balance_ant != 0 else 0
@@ -78,14 +56,10 @@ def main():
 
     st.subheader("📈 Gráfico de comparación mensual")
 
-    resumen = (
-        df.groupby("Mes", as_index=False)["Monto_signed"]
-        .sum()
-        .rename(columns={"Monto_signed": "Balance"})
-    )
+    mensual = analitica.por_mes.rename(columns={"mes": "Mes", "balance": "Balance"})
 
     chart = (
-        alt.Chart(resumen)
+        alt.Chart(mensual[["Mes", "Balance"]])
         .mark_bar()
         .encode(
             x="Mes:N",
@@ -102,28 +76,7 @@ def main():
 
     st.subheader("🏆 Categorías que más crecieron")
 
-    gastos_act = (
-        df_act[df_act["Tipo"] == "gasto"]
-        .groupby("Categoría")["Monto"]
-        .sum()
-    )
-
-    gastos_ant = (
-        df_ant[df_ant["Tipo"] == "gasto"]
-        .groupby("Categoría")["Monto"]
-        .sum()
-    )
-
-    comparacion = pd.DataFrame({
-        "Gasto_actual": gastos_act,
-        "Gasto_anterior": gastos_ant
-    }).fillna(0)
-
-    comparacion["Variación"] = comparacion["Gasto_actual"] - comparacion["Gasto_anterior"]
-    comparacion["Variación_pct"] = (
-        comparacion["Variación"] / comparacion["Gasto_anterior"].replace(0, 1)
-    ) * 100
-
+    comparacion = analitica.comparar_gastos(mes_actual, mes_anterior)
     comparacion = comparacion.sort_values("Variación", ascending=False).head(5)
 
     st.dataframe(comparacion, use_container_width=True)
@@ -1,8 +1,8 @@
 import streamlit as st
-import pandas as pd
 import altair as alt
 
-from models import listar_movimientos
+from analytics import obtener_analitica
+from metricas import fase, medir_pagina
 from auth import check_auth
 from ui import topbar
 
@@ -11,6 +11,7 @@ def formato_argentino(valor):
     return f"{valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
 
+@medir_pagina("13_Dashboard_Anual")
 def main():
     check_auth()
     topbar()
@@ -22,45 +23,18 @@ def main():
 
     st.markdown("---")
 
-    movimientos = listar_movimientos(usuario_id)
+    with fase():
+        analitica = obtener_analitica(usuario_id)
 
-    if not movimientos:
+    if analitica.vacio:
         st.info("Todavía no hay movimientos cargados.")
         return
 
-    df = pd.DataFrame(
-        [
-            {
-                "Fecha": m.fecha,
-                "Tipo": m.tipo.lower(),
-                "Categoría": m.categoria,
-                "Monto": m.monto,
-                "Cuenta": m.cuenta,
-            }
-            for m in movimientos
-        ]
-    )
-
-    df["Fecha"] = pd.to_datetime(df["Fecha"])
-    df["Año"] = df["Fecha"].dt.year
-
-    df["Monto_signed"] = df.apply(
-        lambda row: row["Monto"] if row["Tipo"] == "ingreso" else -row["Monto"],
-        axis=1,
-    )
-
     st.header("📅 Resumen por Año")
 
-    resumen = (
-        df.groupby("Año", as_index=False)["Monto_signed"]
-        .sum()
-        .rename(columns={"Monto_signed": "Balance"})
-    )
-
-    resumen["Ingresos"] = df[df["Tipo"] == "ingreso"].groupby("Año")["Monto"].sum()
-    resumen["Gastos"] = df[df["Tipo"] == "gasto"].groupby("Año")["Monto"].sum()
-
-    resumen = resumen.fillna(0)
+    resumen = analitica.por_año.rename(
+        columns={"anio": "Año", "balance": "Balance", "ingresos": "Ingresos", "gastos": "Gastos"}
+    )[["Año", "Balance", "Ingresos", "Gastos"]]
 
     st.dataframe(resumen, use_container_width=True)
 
@@ -87,16 +61,7 @@ def main():
 
     año_sel = st.selectbox("Seleccionar año", resumen["Año"].tolist())
 
-    df_año = df[df["Año"] == año_sel]
-
-    top_cat = (
-        df_año[df_año["Tipo"] == "gasto"]
-        .groupby("Categoría")["Monto"]
-        .sum()
-        .sort_values(ascending=False)
-        .reset_index()
-        .head(5)
-    )
+    top_cat = analitica.ranking_categorias(año=año_sel, solo_gastos=True).head(5)
 
     st.dataframe(top_cat, use_container_width=True)
 
@@ -3,7 +3,8 @@ import pandas as pd
 import altair as alt
 import numpy as np
 
-from models import listar_movimientos
+from analytics import obtener_analitica
+from metricas import fase, medir_pagina
 from auth import check_auth
 from ui import topbar
 
@@ -12,6 +13,7 @@ def formato_argentino(valor):
     return f"{valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
 
+@medir_pagina("14_Forecast")
 def main():
     check_auth()
     topbar()
@@ -27,42 +29,14 @@ def main():
 
     st.markdown("---")
 
-    movimientos = listar_movimientos(usuario_id)
+    with fase():
+        analitica = obtener_analitica(usuario_id)
 
-    if not movimientos:
+    if analitica.vacio:
         st.info("Todavía no hay movimientos cargados.")
         return
 
-    df = pd.DataFrame(
-        [
-            {
-                "Fecha": m.fecha,
-                "Tipo": m.tipo.lower(),
-                "Monto": m.monto,
-            }
-            for m in movimientos
-        ]
-    )
-
-    df["Fecha"] = pd.to_datetime(df["Fecha"], errors="coerce")
-    df = df.dropna(subset=["Fecha"])
-
-    if df.empty:
-        st.info("No hay datos válidos de fecha para generar el forecast.")
-        return
-
-    df["Mes"] = df["Fecha"].dt.to_period("M").astype(str)
-
-    df["Monto_signed"] = df.apply(
-        lambda row: row["Monto"] if row["Tipo"] == "ingreso" else -row["Monto"],
-        axis=1,
-    )
-
-    mensual = (
-        df.groupby("Mes", as_index=False)["Monto_signed"]
-        .sum()
-        .rename(columns={"Monto_signed": "Balance"})
-    )
+    mensual = analitica.por_mes[["mes", "balance"]].rename(columns={"mes": "Mes", "balance": "Balance"})
 
     mensual = mensual.sort_values("Mes").reset_index(drop=True)
     mensual["Mes_num"] = np.arange(len(mensual))
@@ -1,7 +1,7 @@
 import streamlit as st
-import pandas as pd
 
-from models import listar_movimientos
+from analytics import obtener_analitica
+from metricas import fase, medir_pagina
 from auth import check_auth
 from ui import topbar
 
@@ -10,6 +10,7 @@ def formato_argentino(valor):
     return f"{valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
 
+@medir_pagina("1_Resumen")
 def main():
     check_auth()
     topbar()
@@ -21,33 +22,16 @@ def main():
 
     st.markdown("---")
 
-    movimientos = listar_movimientos(usuario_id)
+    with fase():
+        analitica = obtener_analitica(usuario_id)
 
-    if not movimientos:
+    if analitica.vacio:
         st.info("Todavía no hay movimientos cargados.")
         return
 
-    df = pd.DataFrame(
-        [
-            {
-                "Fecha": m.fecha,
-                "Tipo": m.tipo,
-                "Categoría": m.categoria,
-                "Monto": m.monto,
-                "Cuenta": m.cuenta,
-            }
-            for m in movimientos
-        ]
-    )
-
-    df["Fecha"] = pd.to_datetime(df["Fecha"])
-    df["Monto_signed"] = df.apply(
-        lambda row: row["Monto"] if row["Tipo"] == "ingreso" else -row["Monto"],
-        axis=1,
-    )
-
-    total_ingresos = df[df["Tipo"] == "ingreso"]["Monto"].sum()
-    total_gastos = df[df["Tipo"] == "gasto"]["Monto"].sum()
+    total = analitica.totales()
+    total_ingresos = total["ingresos"]
+    total_gastos = total["gastos"]
     balance = total_ingresos - total_gastos
 
     col1, col2, col3 = st.columns(3)
@@ -59,24 +43,17 @@ def main():
 
     st.subheader("📅 Evolución mensual")
 
-    df["Mes"] = df["Fecha"].dt.to_period("M").astype(str)
-    resumen_mensual = df.groupby("Mes")["Monto_signed"].sum().reset_index()
+    resumen_mensual = analitica.por_mes.rename(columns={"mes": "Mes", "balance": "Balance"})
 
-    st.line_chart(resumen_mensual, x="Mes", y="Monto_signed")
+    st.line_chart(resumen_mensual, x="Mes", y="Balance")
 
     st.markdown("---")
 
     st.subheader("🏆 Categorías más relevantes")
 
-    categorias = (
-        df.groupby("Categoría")["Monto"]
-        .sum()
-        .sort_values(ascending=False)
-        .reset_index()
-    )
+    categorias = analitica.ranking_categorias()
 
     st.dataframe(categorias, use_container_width=True)
 
-
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -2,9 +2,14 @@ import streamlit as st
 import pandas as pd
 from typing import Optional
 
+from metricas import fase, medir_pagina
 from auth import check_auth
 from ui import topbar
-from db import obtener_movimientos_paginados, eliminar_movimiento_logico
+from db import obtener_movimientos_keyset, eliminar_movimiento_logico
+from models import contar_movimientos_filtrados, conteo_es_estimado
+from cache_usuarios import DATASET_ACTIVOS, generacion
+from prefetch import obtener_pagina, prefetch
+from carga_paralela import lanzar
 from catalogos import obtener_cuentas, obtener_categorias
 
 
@@ -13,14 +18,21 @@ PAGE_SIZE_OPTIONS = [10, 25, 50, 100]
 
 def _reset_pagination_if_filters_changed(key: str, current_filters: tuple):
     """
-    Guarda filtros en session_state bajo key+'_filters' y resetea page si cambiaron.
+    Guarda filtros en session_state bajo key+'_filters' y vuelve a la primera
+    página (page 0, sin cursor) si cambiaron.
     """
     prev = st.session_state.get(f"{key}_filters")
     if prev != current_filters:
         st.session_state[f"{key}_filters"] = current_filters
-        st.session_state[f"{key}_page"] = 0
+        _ir_a_pagina(key, 0, None)
 
 
+def _ir_a_pagina(key: str, page: int, cursor: Optional[str]):
+    st.session_state[f"{key}_page"] = page
+    st.session_state[f"{key}_cursor"] = cursor
+
+
+@medir_pagina("2_Movimientos")
 def main():
     check_auth()
     topbar()
@@ -38,19 +50,20 @@ def main():
 
     # Inicializar valores de paginación en session_state
     if "movimientos_page" not in st.session_state:
-        st.session_state["movimientos_page"] = 0
+        _ir_a_pagina("movimientos", 0, None)
     if "movimientos_page_size" not in st.session_state:
         st.session_state["movimientos_page_size"] = PAGE_SIZE_OPTIONS[1]  # default 25
 
     # Cargar catálogos
-    try:
-        cuentas = obtener_cuentas(usuario_id)
-    except Exception:
-        cuentas = []
-    try:
-        categorias = obtener_categorias(usuario_id)
-    except Exception:
-        categorias = []
+    with fase():
+        try:
+            cuentas = obtener_cuentas(usuario_id)
+        except Exception:
+            cuentas = []
+        try:
+            categorias = obtener_categorias(usuario_id)
+        except Exception:
+            categorias = []
 
     # Filtros UI
     colf1, colf2, colf3, colf4 = st.columns([3, 3, 2, 2])
@@ -63,6 +76,8 @@ def main():
     with colf4:
         categoria_filtro = st.selectbox("📂 Categoría", ["Todas"] + categorias)
 
+    busqueda = st.text_input("🔎 Buscar en la descripción", value="", placeholder="p. ej. supermercado, cafe")
+
     # Page size selector
     colp1, colp2 = st.columns([3, 1])
     with colp1:
@@ -72,7 +87,7 @@ def main():
         if st.button("Aplicar filtros", use_container_width=True):
             # will cause fetching with new filters + reset page
             st.session_state["movimientos_page_size"] = page_size
-            st.session_state["movimientos_page"] = 0
+            _ir_a_pagina("movimientos", 0, None)
 
     # Guardar/actualizar page_size en session_state
     st.session_state["movimientos_page_size"] = page_size
@@ -83,34 +98,56 @@ def main():
         str(fecha_hasta) if fecha_hasta else "",
         cuenta_filtro or "Todas",
         categoria_filtro or "Todas",
+        busqueda.strip(),
         page_size,
     )
     _reset_pagination_if_filters_changed("movimientos", filtros_tuple)
 
-    # Obtener página actual desde session_state
+    # Obtener página actual desde session_state (número solo para mostrar; la
+    # consulta usa el cursor, así cualquier página cuesta lo mismo que la primera)
     page = st.session_state.get("movimientos_page", 0)
+    cursor = st.session_state.get("movimientos_cursor")
     limit = int(st.session_state.get("movimientos_page_size", page_size))
     offset = page * limit
 
-    # Llamada al servidor (con spinner)
-    with st.spinner("Obteniendo movimientos..."):
-        fecha_desde_str: Optional[str] = str(fecha_desde) if fecha_desde else None
-        fecha_hasta_str: Optional[str] = str(fecha_hasta) if fecha_hasta else None
-
-        result = obtener_movimientos_paginados(
-            usuario_id=usuario_id,
-            limit=limit,
-            offset=offset,
-            fecha_desde=fecha_desde_str,
-            fecha_hasta=fecha_hasta_str,
-            cuenta=(None if (cuenta_filtro == "Todas") else cuenta_filtro),
-            categoria=(None if (categoria_filtro == "Todas") else categoria_filtro),
-        )
+    fecha_desde_str: Optional[str] = str(fecha_desde) if fecha_desde else None
+    fecha_hasta_str: Optional[str] = str(fecha_hasta) if fecha_hasta else None
+
+    filtros = dict(
+        fecha_desde=fecha_desde_str,
+        fecha_hasta=fecha_hasta_str,
+        cuenta=(None if (cuenta_filtro == "Todas") else cuenta_filtro),
+        categoria=(None if (categoria_filtro == "Todas") else categoria_filtro),
+        texto=(busqueda.strip() or None),
+    )
+
+    def cargar_pagina(c: Optional[str]):
+        return obtener_movimientos_keyset(usuario_id=usuario_id, limit=limit, cursor=c, **filtros)
+
+    # Las páginas vecinas se prefetchean en segundo plano; la clave cambia con
+    # los filtros o con una escritura del usuario y descarta lo prefetcheado
+    clave_prefetch = (usuario_id, filtros_tuple, limit, generacion(usuario_id, DATASET_ACTIVOS))
+
+    # Llamada al servidor (con spinner si la página no estaba prefetcheada);
+    # el conteo corre en paralelo con la página
+    with st.spinner("Obteniendo movimientos..."), fase():
+        conteo = lanzar(lambda: contar_movimientos_filtrados(usuario_id, **filtros))
+        result = obtener_pagina("movimientos_prefetch", clave_prefetch, cursor, cargar_pagina)
+        total = conteo.result()
+
+    if result is None:
+        # Falló la consulta: no es una página vacía, se reintenta al recargar
+        st.error("No se pudieron obtener los movimientos. Intentá de nuevo en unos segundos.")
+        return
 
     rows = result.get("data", []) or []
-    total = int(result.get("count", 0) or 0)
 
-    if total == 0:
+    if not rows and cursor is not None:
+        # La página quedó vacía (p. ej. se borraron sus filas): volver al inicio
+        _ir_a_pagina("movimientos", 0, None)
+        st.rerun()
+
+    if not rows:
         st.info("No hay movimientos que coincidan con los filtros seleccionados.")
         return
 
@@ -122,24 +159,34 @@ def main():
     st.markdown("### 📋 Listado de movimientos (página actual)")
     st.dataframe(df[available_cols], use_container_width=True)
 
-    # Paginación UI
+    # Paginación UI. Al volver a la primera página se usa "sin cursor", así
+    # coincide con la entrada de la cache de esa página.
+    cursor_siguiente = result.get("siguiente")
+    hay_anterior = result.get("anterior") is not None
+    cursor_anterior = result.get("anterior") if page > 1 else None
+
+    vecinas = ([cursor_siguiente] if cursor_siguiente else []) + ([cursor_anterior] if hay_anterior else [])
+    prefetch("movimientos_prefetch", clave_prefetch, vecinas, cargar_pagina)
+
     coln1, coln2, coln3 = st.columns([1, 1, 4])
     with coln1:
-        if st.button("⬅️ Anterior", disabled=(page == 0)):
-            if page > 0:
-                st.session_state["movimientos_page"] = page - 1
-                st.experimental_rerun()
+        if st.button("⬅️ Anterior", disabled=(not hay_anterior)):
+            _ir_a_pagina("movimientos", max(page - 1, 0), cursor_anterior)
+            st.rerun()
     with coln2:
-        # Calcular si hay siguiente página
-        has_next = (offset + len(rows)) < total
-        if st.button("Siguiente ➡️", disabled=(not has_next)):
-            if has_next:
-                st.session_state["movimientos_page"] = page + 1
-                st.experimental_rerun()
+        if st.button("Siguiente ➡️", disabled=(cursor_siguiente is None)):
+            _ir_a_pagina("movimientos", page + 1, cursor_siguiente)
+            st.rerun()
     with coln3:
         start_display = offset + 1
         end_display = offset + len(rows)
-        st.markdown(f"Mostrando {start_display}–{end_display} de {total} movimientos — Página {page + 1}")
+        # Sin total (falló el conteo) se muestra solo el rango; si es una
+        # estimación de Postgres, con "≈"
+        if total is None:
+            total_display = ""
+        else:
+            total_display = f" de {'≈' if conteo_es_estimado(total) else ''}{total}"
+        st.markdown(f"Mostrando {start_display}–{end_display}{total_display} movimientos — Página {page + 1}")
 
     st.markdown("---")
     st.markdown("### 🗑 Borrar movimiento (lógico) — solo IDs de la página actual")
@@ -157,7 +204,7 @@ def main():
             # después de borrar, mantener en la misma página o recargar si página quedó vacía
             # si la página actual quedó vacía y no es la primera página, retrocedemos una página
             # forzamos recarga completa
-            st.experimental_rerun()
+            st.rerun()
         else:
             st.error("Error al borrar movimiento.")
 
@@ -2,6 +2,7 @@ import streamlit as st
 import json
 import datetime
 
+from metricas import fase, medir_pagina
 from auth import check_auth
 from ui import topbar
 from db import insertar_movimiento
@@ -13,8 +14,8 @@ from catalogos import (
     agregar_etiqueta,
     agregar_cuenta,
 )
-from models import listar_movimientos
-from etiquetas_inteligentes import entrenar_modelo, predecir_etiquetas
+from autocompletado import indice_categorias, indice_etiquetas
+from carga_paralela import cargar_en_paralelo
 
 
 def formato_argentino_a_float(valor):
@@ -34,6 +35,7 @@ def formato_argentino_a_float(valor):
         return None
 
 
+@medir_pagina("3_Cargar")
 def main():
     check_auth()
     topbar()
@@ -49,21 +51,31 @@ def main():
 
     st.markdown("---")
 
-    # Cargar catálogos
-    try:
-        categorias = obtener_categorias(usuario_id)
-    except Exception:
-        categorias = []
-
-    try:
-        cuentas = obtener_cuentas(usuario_id)
-    except Exception:
-        cuentas = []
+    # Cargar catálogos e índices de uso a la vez
+    with fase():
+        datos = cargar_en_paralelo(
+            {
+                "categorias": lambda: obtener_categorias(usuario_id),
+                "cuentas": lambda: obtener_cuentas(usuario_id),
+                "etiquetas": lambda: obtener_etiquetas(usuario_id),
+                # Categorías y etiquetas ordenadas por uso (las más usadas primero)
+                "categorias_por_uso": lambda: [
+                    c for c in indice_categorias(usuario_id).completar("", limite=None) if c != "Sin categoría"
+                ],
+                "etiquetas_por_uso": lambda: indice_etiquetas(usuario_id).completar("", limite=None),
+            },
+            por_defecto={
+                "categorias": [],
+                "cuentas": [],
+                "etiquetas": [],
+                "categorias_por_uso": None,
+                "etiquetas_por_uso": None,
+            },
+        )
 
-    try:
-        etiquetas_base = obtener_etiquetas(usuario_id)
-    except Exception:
-        etiquetas_base = []
+    categorias = datos["categorias_por_uso"] if datos["categorias_por_uso"] is not None else datos["categorias"]
+    cuentas = datos["cuentas"]
+    etiquetas_base = datos["etiquetas_por_uso"] if datos["etiquetas_por_uso"] is not None else datos["etiquetas"]
 
     with st.form("form_cargar", clear_on_submit=False):
         col1, col2, col3 = st.columns(3)
@@ -76,8 +88,8 @@ def main():
             cuenta = st.selectbox("🏦 Cuenta", options=["Sin cuenta"] + cuentas)
         with col3:
             monto_input = st.text_input("💵 Monto", value="")
-            etiquetas_input = st.text_input(
-                "🏷 Etiquetas (separadas por comas)", value=""
+            etiquetas_input = st.multiselect(
+                "🏷 Etiquetas", options=etiquetas_base, accept_new_options=True
             )
 
         descripcion = st.text_area("📝 Descripción", value="", max_chars=500)
@@ -91,9 +103,7 @@ def main():
             st.error("El monto no es válido. Usá números, p. ej. 1250.50 o 1.250,50")
             st.stop()
 
-        etiquetas = []
-        if isinstance(etiquetas_input, str) and etiquetas_input.strip():
-            etiquetas = [e.strip() for e in etiquetas_input.split(",") if e.strip()]
+        etiquetas = [e.strip() for e in etiquetas_input if e.strip()]
 
         success = insertar_movimiento(
             usuario_id=usuario_id,
@@ -107,9 +117,13 @@ def main():
         )
 
         if success:
+            # Las etiquetas nuevas quedan en el catálogo para autocompletar
+            for etiqueta in etiquetas:
+                if etiqueta not in etiquetas_base:
+                    agregar_etiqueta(usuario_id, etiqueta)
             st.success("✅ Movimiento guardado correctamente.")
             # Forzar recarga y mostrar cambios
-            st.experimental_rerun()
+            st.rerun()
         else:
             st.error("❌ Error al guardar el movimiento. Revisá los logs del servidor.")
 
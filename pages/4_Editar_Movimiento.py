@@ -1,6 +1,7 @@
 import streamlit as st
 import json
 
+from metricas import fase, medir_pagina
 from auth import check_auth
 from ui import topbar
 from db import obtener_movimientos, obtener_movimiento_por_id, actualizar_movimiento
@@ -12,8 +13,10 @@ from catalogos import (
     agregar_etiqueta,
     agregar_cuenta,
 )
-from models import listar_movimientos
-from etiquetas_inteligentes import entrenar_modelo, predecir_etiquetas
+from models import modelo_etiquetas_compilado
+from autocompletado import indice_categorias, indice_etiquetas
+from etiquetas_inteligentes import predecir_etiquetas
+from carga_paralela import cargar_en_paralelo
 
 
 def formato_monto_a_str(m):
@@ -23,6 +26,7 @@ def formato_monto_a_str(m):
         return ""
 
 
+@medir_pagina("4_Editar_Movimiento")
 def main():
     check_auth()
     topbar()
@@ -38,8 +42,30 @@ def main():
 
     st.markdown("---")
 
-    # Obtener movimientos directos desde la DB (no cacheado aquí para permitir edición inmediata)
-    movimientos = obtener_movimientos(usuario_id)
+    # Obtener movimientos directos desde la DB (no cacheado aquí para permitir
+    # edición inmediata) a la vez que los catálogos e índices del formulario
+    with fase():
+        datos = cargar_en_paralelo(
+            {
+                "movimientos": lambda: obtener_movimientos(usuario_id),
+                "categorias": lambda: obtener_categorias(usuario_id),
+                "cuentas": lambda: obtener_cuentas(usuario_id),
+                "etiquetas": lambda: obtener_etiquetas(usuario_id),
+                # Categorías y etiquetas ordenadas por uso (las más usadas primero)
+                "categorias_por_uso": lambda: [
+                    c for c in indice_categorias(usuario_id).completar("", limite=None) if c != "Sin categoría"
+                ],
+                "etiquetas_por_uso": lambda: indice_etiquetas(usuario_id).completar("", limite=None),
+            },
+            por_defecto={
+                "categorias": [],
+                "cuentas": [],
+                "etiquetas": [],
+                "categorias_por_uso": None,
+                "etiquetas_por_uso": None,
+            },
+        )
+    movimientos = datos["movimientos"]
 
     if not movimientos:
         st.info("No hay movimientos para editar.")
@@ -48,26 +74,15 @@ def main():
     ids = [m["id"] for m in movimientos]
     id_sel = st.selectbox("📄 Seleccionar movimiento por ID", ids)
 
-    mov = obtener_movimiento_por_id(usuario_id, id_sel)
+    with fase():
+        mov = obtener_movimiento_por_id(usuario_id, id_sel)
     if not mov:
         st.error("No se encontró el movimiento seleccionado.")
         return
 
-    # Cargar catálogos
-    try:
-        categorias = obtener_categorias(usuario_id)
-    except Exception:
-        categorias = []
-
-    try:
-        cuentas = obtener_cuentas(usuario_id)
-    except Exception:
-        cuentas = []
-
-    try:
-        etiquetas_base = obtener_etiquetas(usuario_id)
-    except Exception:
-        etiquetas_base = []
+    categorias = datos["categorias_por_uso"] if datos["categorias_por_uso"] is not None else datos["categorias"]
+    cuentas = datos["cuentas"]
+    etiquetas_base = datos["etiquetas_por_uso"] if datos["etiquetas_por_uso"] is not None else datos["etiquetas"]
 
     # Preparar valores iniciales
     fecha_init = mov.get("fecha") or ""
@@ -78,9 +93,18 @@ def main():
     cuenta_init = mov.get("cuenta") or "Sin cuenta"
     etiquetas_raw = mov.get("etiquetas") or []
     if isinstance(etiquetas_raw, list):
-        etiquetas_init = ", ".join([str(e) for e in etiquetas_raw])
+        etiquetas_init = [str(e) for e in etiquetas_raw if str(e).strip()]
     else:
-        etiquetas_init = str(etiquetas_raw)
+        etiquetas_init = [e.strip() for e in str(etiquetas_raw).split(",") if e.strip()]
+
+    # Sugerencias del modelo de etiquetas (persistido, no se reentrena acá)
+    if descripcion_init.strip():
+        try:
+            sugeridas = predecir_etiquetas(modelo_etiquetas_compilado(usuario_id), descripcion_init)
+        except Exception:
+            sugeridas = []
+        if sugeridas:
+            st.caption("💡 Etiquetas sugeridas: " + ", ".join(sugeridas))
 
     with st.form("form_editar", clear_on_submit=False):
         col1, col2, col3 = st.columns(3)
@@ -92,7 +116,12 @@ def main():
             cuenta = st.selectbox("🏦 Cuenta", options=["Sin cuenta"] + cuentas, index=(0 if cuenta_init == "Sin cuenta" else (cuentas.index(cuenta_init)+1) if cuenta_init in cuentas else 0))
         with col3:
             monto_input = st.text_input("💵 Monto", value=monto_init)
-            etiquetas_input = st.text_input("🏷 Etiquetas (separadas por comas)", value=etiquetas_init)
+            etiquetas_input = st.multiselect(
+                "🏷 Etiquetas",
+                options=etiquetas_base + [e for e in etiquetas_init if e not in etiquetas_base],
+                default=etiquetas_init,
+                accept_new_options=True,
+            )
 
         descripcion = st.text_area("📝 Descripción", value=descripcion_init, max_chars=500)
 
@@ -106,9 +135,7 @@ def main():
             st.error("Monto inválido. Usá formato numérico, p. ej. 1250.50 o 1.250,50")
             st.stop()
 
-        etiquetas = []
-        if isinstance(etiquetas_input, str) and etiquetas_input.strip():
-            etiquetas = [e.strip() for e in etiquetas_input.split(",") if e.strip()]
+        etiquetas = [e.strip() for e in etiquetas_input if e.strip()]
 
         ok = actualizar_movimiento(
             usuario_id=usuario_id,
@@ -123,8 +150,12 @@ def main():
         )
 
         if ok:
+            # Las etiquetas nuevas quedan en el catálogo para autocompletar
+            for etiqueta in etiquetas:
+                if etiqueta not in etiquetas_base:
+                    agregar_etiqueta(usuario_id, etiqueta)
             st.success("✅ Movimiento actualizado correctamente.")
-            st.experimental_rerun()
+            st.rerun()
         else:
             st.error("❌ Error al actualizar el movimiento. Revisá los logs del servidor.")
 
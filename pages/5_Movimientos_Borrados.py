@@ -1,11 +1,13 @@
 import streamlit as st
 import pandas as pd
 
+from metricas import fase, medir_pagina
 from auth import check_auth
 from ui import topbar
 from models import listar_movimientos_borrados
 
 
+@medir_pagina("5_Movimientos_Borrados")
 def main():
     check_auth()
     topbar()
@@ -18,7 +20,8 @@ def main():
 
     st.markdown("---")
 
-    movimientos = listar_movimientos_borrados(usuario_id)
+    with fase():
+        movimientos = listar_movimientos_borrados(usuario_id)
 
     if not movimientos:
         st.info("No hay movimientos borrados.")
@@ -1,12 +1,14 @@
 import streamlit as st
 import pandas as pd
 
+from metricas import fase, medir_pagina
 from auth import check_auth
 from ui import topbar
 from models import listar_movimientos_borrados
 from db import restaurar_movimiento
 
 
+@medir_pagina("6_Restaurar_Movimiento")
 def main():
     check_auth()
     topbar()
@@ -19,7 +21,8 @@ def main():
 
     st.markdown("---")
 
-    movimientos = listar_movimientos_borrados(usuario_id)
+    with fase():
+        movimientos = listar_movimientos_borrados(usuario_id)
 
     if not movimientos:
         st.info("No hay movimientos borrados para restaurar.")
@@ -1,7 +1,7 @@
 import streamlit as st
-import pandas as pd
 
-from models import listar_movimientos
+from analytics import obtener_analitica
+from metricas import fase, medir_pagina
 from auth import check_auth
 from ui import topbar
 
@@ -10,6 +10,7 @@ def formato_argentino(valor):
     return f"{valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
 
+@medir_pagina("7_Balanace_por_Cuenta")
 def main():
     check_auth()
     topbar()
@@ -21,39 +22,24 @@ def main():
 
     st.markdown("---")
 
-    movimientos = listar_movimientos(usuario_id)
+    with fase():
+        analitica = obtener_analitica(usuario_id)
 
-    if not movimientos:
+    if analitica.vacio:
         st.info("Todavía no hay movimientos cargados.")
         return
 
-    df = pd.DataFrame(
-        [
-            {
-                "Cuenta": m.cuenta,
-                "Tipo": m.tipo.lower(),
-                "Monto": m.monto,
-            }
-            for m in movimientos
-        ]
-    )
-
-    df["Monto_signed"] = df.apply(
-        lambda row: row["Monto"] if row["Tipo"] == "ingreso" else -row["Monto"],
-        axis=1,
-    )
-
-    saldo_por_cuenta = df.groupby("Cuenta")["Monto_signed"].sum().reset_index()
+    saldos = analitica.saldo_por_cuenta().rename_axis("Cuenta").reset_index(name="Monto_signed")
 
     st.subheader("📋 Saldos actuales por cuenta")
-    saldo_por_cuenta["Saldo"] = saldo_por_cuenta["Monto_signed"].apply(formato_argentino)
+    saldos["Saldo"] = saldos["Monto_signed"].apply(formato_argentino)
 
-    st.dataframe(saldo_por_cuenta[["Cuenta", "Saldo"]], use_container_width=True)
+    st.dataframe(saldos[["Cuenta", "Saldo"]], use_container_width=True)
 
     st.markdown("---")
 
     st.subheader("📈 Gráfico de saldos")
-    st.bar_chart(saldo_por_cuenta, x="Cuenta", y="Monto_signed")
+    st.bar_chart(saldos, x="Cuenta", y="Monto_signed")
 
 
 if __name__ == "__main__":
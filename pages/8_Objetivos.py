@@ -1,9 +1,9 @@
 import streamlit as st
 import json
 import os
-import pandas as pd
 
-from models import listar_movimientos
+from analytics import obtener_analitica
+from metricas import fase, medir_pagina
 from auth import check_auth
 from ui import topbar
 
@@ -38,6 +38,7 @@ def guardar_objetivos(user_id: str, data):
         json.dump(data, f, indent=4, ensure_ascii=False)
 
 
+@medir_pagina("8_Objetivos")
 def main():
     check_auth()
     topbar()
@@ -49,37 +50,20 @@ def main():
 
     st.markdown("---")
 
-    objetivos = cargar_objetivos(user_id)
-    movimientos = listar_movimientos(user_id)
+    with fase():
+        objetivos = cargar_objetivos(user_id)
+        analitica = obtener_analitica(user_id)
 
-    if not movimientos:
+    if analitica.vacio:
         st.info("Todavía no hay movimientos cargados.")
         return
 
-    df = pd.DataFrame(
-        [
-            {
-                "Fecha": m.fecha,
-                "Tipo": m.tipo.lower(),
-                "Categoría": m.categoria,
-                "Monto": m.monto,
-                "Cuenta": m.cuenta,
-            }
-            for m in movimientos
-        ]
-    )
-
-    df["Monto_signed"] = df.apply(
-        lambda row: row["Monto"] if row["Tipo"] == "ingreso" else -row["Monto"],
-        axis=1,
-    )
-
     # -------------------------------
     # OBJETIVOS POR CUENTA
     # -------------------------------
     st.header("🏦 Objetivos por Cuenta")
 
-    cuentas = sorted(df["Cuenta"].unique().tolist())
+    cuentas = analitica.cuentas
     cuenta_sel = st.selectbox("Seleccionar cuenta", cuentas)
 
     objetivo_total = st.number_input(
@@ -106,9 +90,7 @@ def main():
 
     st.subheader("📊 Progreso por cuenta")
 
-    saldo_por_cuenta = df.groupby("Cuenta")["Monto_signed"].sum()
-
-    for cuenta, saldo in saldo_por_cuenta.items():
+    for cuenta, saldo in analitica.saldo_por_cuenta().items():
         st.write(f"### {cuenta}")
         st.write(f"Saldo actual: **${formato_argentino(saldo)}**")
 
@@ -135,7 +117,7 @@ def main():
     # -------------------------------
     st.header("📂 Objetivos por Categoría")
 
-    categorias = sorted(df["Categoría"].unique().tolist())
+    categorias = analitica.categorias
     categoria_sel = st.selectbox("Seleccionar categoría", categorias)
 
     objetivo_cat = st.number_input(
@@ -153,13 +135,7 @@ def main():
 
     st.subheader("📊 Progreso por categoría")
 
-    gastos_por_cat = (
-        df[df["Tipo"] == "gasto"]
-        .groupby("Categoría")["Monto"]
-        .sum()
-    )
-
-    for categoria, gasto in gastos_por_cat.items():
+    for categoria, gasto in analitica.gastos_por_categoria().items():
         st.write(f"### {categoria}")
         st.write(f"Gasto actual: **${formato_argentino(gasto)}**")
 
@@ -1,7 +1,8 @@
 import streamlit as st
-import pandas as pd
 
-from models import listar_movimientos
+from analytics import obtener_analitica
+from resumenes import limites_del_mes, obtener_diario
+from metricas import fase, medir_pagina
 from auth import check_auth
 from ui import topbar
 
@@ -10,6 +11,7 @@ def formato_argentino(valor):
     return f"{valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
 
+@medir_pagina("9_Dashboard_Mensual")
 def main():
     check_auth()
     topbar()
@@ -21,40 +23,19 @@ def main():
 
     st.markdown("---")
 
-    movimientos = listar_movimientos(usuario_id)
+    with fase():
+        analitica = obtener_analitica(usuario_id)
 
-    if not movimientos:
+    if analitica.vacio:
         st.info("Todavía no hay movimientos cargados.")
         return
 
-    df = pd.DataFrame(
-        [
-            {
-                "Fecha": m.fecha,
-                "Tipo": m.tipo.lower(),
-                "Categoría": m.categoria,
-                "Monto": m.monto,
-                "Cuenta": m.cuenta,
-            }
-            for m in movimientos
-        ]
-    )
-
-    df["Fecha"] = pd.to_datetime(df["Fecha"])
-    df["Mes"] = df["Fecha"].dt.to_period("M").astype(str)
-
-    df["Monto_signed"] = df.apply(
-        lambda row: row["Monto"] if row["Tipo"] == "ingreso" else -row["Monto"],
-        axis=1,
-    )
-
-    meses = sorted(df["Mes"].unique())
+    meses = analitica.meses
     mes_sel = st.selectbox("Seleccionar mes", meses)
 
-    df_mes = df[df["Mes"] == mes_sel]
-
-    ingresos = df_mes[df_mes["Tipo"] == "ingreso"]["Monto"].sum()
-    gastos = df_mes[df_mes["Tipo"] == "gasto"]["Monto"].sum()
+    total = analitica.totales(mes_sel)
+    ingresos = total["ingresos"]
+    gastos = total["gastos"]
     balance = ingresos - gastos
 
     col1, col2, col3 = st.columns(3)
@@ -65,20 +46,20 @@ def main():
     st.markdown("---")
 
     st.subheader("📈 Evolución del mes")
-    st.line_chart(df_mes, x="Fecha", y="Monto_signed")
+    with fase():
+        diario_mes = obtener_diario(usuario_id, *limites_del_mes(mes_sel))
+    if diario_mes.empty:
+        st.warning("No se pudo cargar la evolución diaria del mes.")
+    else:
+        diario_mes = diario_mes.rename(columns={"fecha": "Fecha", "balance": "Balance"})
+        st.line_chart(diario_mes, x="Fecha", y="Balance")
 
     st.markdown("---")
 
     st.subheader("🏆 Categorías del mes")
-    categorias = (
-        df_mes.groupby("Categoría")["Monto"]
-        .sum()
-        .sort_values(ascending=False)
-        .reset_index()
-    )
+    categorias = analitica.ranking_categorias(mes_sel)
 
     st.dataframe(categorias, use_container_width=True)
 
-
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,125 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+import streamlit as st
+
+from carga_paralela import con_contexto
+
+# ---------------------------------------------------------
+#  PREFETCH DE PÁGINAS EN SEGUNDO PLANO
+# ---------------------------------------------------------
+# Mientras el usuario mira una página, las vecinas (anterior y siguiente) se
+# piden en un hilo del pool compartido y quedan en una cache chica de la
+# sesión. Al hacer clic, la página ya está (o está en vuelo) y no hace falta
+# esperar un request nuevo. La cache se identifica con una clave (usuario,
+# filtros, tamaño de página, generación): si la clave cambia, lo pendiente se
+# cancela y lo ya traído se descarta.
+#
+# `cargar` devuelve None (o lanza) si la página no se pudo traer: esas páginas
+# no quedan en la cache y se vuelven a pedir la próxima vez.
+#
+# Cada página corre con el contexto de quien la pidió (con_contexto de
+# carga_paralela.py): las funciones cacheadas de Streamlit tienen su
+# ScriptRunContext y los round trips se anotan en el rerun que lanzó el
+# prefetch, aunque terminen después de que la página se dibujó.
+
+PREFETCH_WORKERS = 4
+
+# Páginas que se guardan por sesión (las más viejas se descartan)
+PREFETCH_MAX_PAGINAS = 6
+
+
+@st.cache_resource(show_spinner=False)
+def _executor() -> ThreadPoolExecutor:
+    """Pool de hilos compartido por todas las sesiones."""
+    return ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+
+
+class CachePaginas:
+    """Páginas pedidas (terminadas o en vuelo) para una misma clave, por cursor."""
+
+    def __init__(self, clave: Hashable):
+        self.clave = clave
+        self.futuros: Dict[Optional[str], Future] = {}
+
+    def guardar(self, cursor: Optional[str], futuro: Future) -> None:
+        self.futuros.pop(cursor, None)
+        self.futuros[cursor] = futuro
+        while len(self.futuros) > PREFETCH_MAX_PAGINAS:
+            viejo = next(iter(self.futuros))
+            self.futuros.pop(viejo).cancel()
+
+    def descartar(self) -> None:
+        for futuro in self.futuros.values():
+            futuro.cancel()
+        self.futuros.clear()
+
+
+def _fallido(futuro: Future) -> bool:
+    """True si el futuro terminó sin una página (cancelado, con error o None)."""
+    if not futuro.done():
+        return False
+    if futuro.cancelled() or futuro.exception() is not None:
+        return True
+    return futuro.result() is None
+
+
+def _cache_sesion(nombre: str, clave: Hashable) -> CachePaginas:
+    cache = st.session_state.get(nombre)
+    if cache is None or cache.clave != clave:
+        if cache is not None:
+            cache.descartar()
+        cache = CachePaginas(clave)
+        st.session_state[nombre] = cache
+    return cache
+
+
+def obtener_pagina(
+    nombre: str,
+    clave: Hashable,
+    cursor: Optional[str],
+    cargar: Callable[[Optional[str]], Any],
+) -> Any:
+    """
+    Devuelve la página de `cursor`: la prefetcheada si existe (esperándola si
+    todavía está en vuelo) o la carga en el momento con `cargar(cursor)`.
+    Devuelve None si no se pudo traer; en ese caso no se guarda nada.
+    """
+    cache = _cache_sesion(nombre, clave)
+    futuro = cache.futuros.get(cursor)
+
+    resultado = None
+    if futuro is not None and not futuro.cancelled():
+        try:
+            resultado = futuro.result()
+        except Exception as e:
+            print(f"[PREFETCH] Error al obtener página prefetcheada: {e}")
+
+    if resultado is None:
+        cache.futuros.pop(cursor, None)
+        resultado = cargar(cursor)
+        if resultado is None:
+            return None
+        futuro = Future()
+        futuro.set_result(resultado)
+
+    cache.guardar(cursor, futuro)
+    return resultado
+
+
+def prefetch(
+    nombre: str,
+    clave: Hashable,
+    cursores: Iterable[Optional[str]],
+    cargar: Callable[[Optional[str]], Any],
+) -> None:
+    """Pide en segundo plano las páginas de `cursores` que no estén en la cache."""
+    cache = _cache_sesion(nombre, clave)
+    for cursor in cursores:
+        futuro = cache.futuros.get(cursor)
+        if futuro is not None and not _fallido(futuro):
+            continue
+        try:
+            cache.guardar(cursor, _executor().submit(con_contexto(cargar), cursor))
+        except Exception as e:
+            print(f"[PREFETCH] Error al programar página: {e}")
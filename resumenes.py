@@ -0,0 +1,164 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from db import obtener_resumen_movimientos, obtener_resumen_diario
+from models import obtener_ledger
+from cache_usuarios import DATASET_ACTIVOS, generacion, registrar_cache
+
+# ---------------------------------------------------------
+#  RESÚMENES AGREGADOS PARA DASHBOARDS
+# ---------------------------------------------------------
+# Los dashboards, alertas y forecast trabajan sobre totales ya agrupados
+# (por mes, categoría y cuenta, o por día) que calcula Postgres. El resumen
+# por mes sale del rollup movimientos_resumen_mensual (sql/003), que los
+# triggers mantienen al día, así su costo no crece con el historial. El
+# diario se pide siempre acotado a un rango de fechas (el mes que se mira).
+# Si resumen_movimientos no está instalada, se calculan los mismos totales en
+# memoria a partir del ledger; resumir_ledger y resumir_ledger_diario son el
+# equivalente exacto de las funciones SQL. Si falla resumen_diario, el
+# diario queda vacío: no se baja el ledger entero para un rango de días.
+
+COLUMNAS_RESUMEN = ["mes", "anio", "categoria", "cuenta", "ingresos", "gastos", "balance", "cantidad"]
+COLUMNAS_DIARIO = ["fecha", "ingresos", "gastos", "balance", "cantidad"]
+COLUMNAS_MONTOS = ["ingresos", "gastos", "balance"]
+
+
+def _a_frame(rows: List[Dict[str, Any]], columnas: List[str]) -> pd.DataFrame:
+    df = pd.DataFrame(rows, columns=columnas)
+    for columna in COLUMNAS_MONTOS:
+        df[columna] = pd.to_numeric(df[columna], errors="coerce").fillna(0.0).astype(float)
+    df["cantidad"] = pd.to_numeric(df["cantidad"], errors="coerce").fillna(0).astype(int)
+    return df
+
+
+def _filtrar_fechas(df: pd.DataFrame, fecha_desde: Optional[str], fecha_hasta: Optional[str]) -> pd.DataFrame:
+    df = df[df["Fecha"].notna()]
+    if fecha_desde:
+        df = df[df["Fecha"] >= pd.Timestamp(fecha_desde)]
+    if fecha_hasta:
+        df = df[df["Fecha"] <= pd.Timestamp(fecha_hasta)]
+    return df
+
+
+def _con_montos_por_tipo(df: pd.DataFrame) -> pd.DataFrame:
+    return df.assign(
+        ingresos=np.where(df["Tipo"] == "ingreso", df["Monto"], 0.0),
+        gastos=np.where(df["Tipo"] == "gasto", df["Monto"], 0.0),
+    )
+
+
+def resumir_ledger(
+    df: pd.DataFrame,
+    fecha_desde: Optional[str] = None,
+    fecha_hasta: Optional[str] = None,
+) -> pd.DataFrame:
+    """Equivalente en memoria de la función SQL resumen_movimientos, sobre un ledger."""
+    df = _filtrar_fechas(df, fecha_desde, fecha_hasta)
+    if df.empty:
+        return _a_frame([], COLUMNAS_RESUMEN)
+
+    resumen = (
+        _con_montos_por_tipo(df)
+        .groupby(["Mes", "Año", "Categoría", "Cuenta"], as_index=False)
+        .agg(
+            ingresos=("ingresos", "sum"),
+            gastos=("gastos", "sum"),
+            balance=("Monto_signed", "sum"),
+            cantidad=("Monto", "size"),
+        )
+        .rename(columns={"Mes": "mes", "Año": "anio", "Categoría": "categoria", "Cuenta": "cuenta"})
+    )
+    resumen["anio"] = resumen["anio"].astype(int)
+    return resumen[COLUMNAS_RESUMEN]
+
+
+def resumir_ledger_diario(
+    df: pd.DataFrame,
+    fecha_desde: Optional[str] = None,
+    fecha_hasta: Optional[str] = None,
+) -> pd.DataFrame:
+    """Equivalente en memoria de la función SQL resumen_diario, sobre un ledger."""
+    df = _filtrar_fechas(df, fecha_desde, fecha_hasta)
+    if df.empty:
+        return _a_frame([], COLUMNAS_DIARIO)
+
+    diario = (
+        _con_montos_por_tipo(df)
+        .groupby("Fecha", as_index=False)
+        .agg(
+            ingresos=("ingresos", "sum"),
+            gastos=("gastos", "sum"),
+            balance=("Monto_signed", "sum"),
+            cantidad=("Monto", "size"),
+        )
+        .rename(columns={"Fecha": "fecha"})
+    )
+    return diario[COLUMNAS_DIARIO]
+
+
+# ---------------------------------------------------------
+#  LECTURA CACHEADA POR USUARIO
+# ---------------------------------------------------------
+@registrar_cache(DATASET_ACTIVOS)
+@st.cache_data(ttl=300, show_spinner=False)
+def obtener_resumen(usuario_id: str) -> pd.DataFrame:
+    """
+    Totales por mes, categoría y cuenta de todo el historial del usuario.
+    Cacheado 300s; se invalida con las escrituras del usuario.
+    """
+    rows = obtener_resumen_movimientos(usuario_id)
+    if rows is None:
+        return resumir_ledger(obtener_ledger(usuario_id).df)
+    return _a_frame(rows, COLUMNAS_RESUMEN)
+
+
+def limites_del_mes(mes: str) -> Tuple[str, str]:
+    """Primer y último día de `mes` ("YYYY-MM") como "YYYY-MM-DD"."""
+    periodo = pd.Period(mes, freq="M")
+    return periodo.start_time.strftime("%Y-%m-%d"), periodo.end_time.strftime("%Y-%m-%d")
+
+
+class _DiarioFallido(Exception):
+    pass
+
+
+@st.cache_data(ttl=300, max_entries=1000, show_spinner=False)
+def _diario_cacheado(
+    usuario_id: str,
+    fecha_desde: Optional[str],
+    fecha_hasta: Optional[str],
+    generacion_activos: int,
+) -> pd.DataFrame:
+    rows = obtener_resumen_diario(usuario_id, fecha_desde, fecha_hasta)
+    if rows is None:
+        # Las excepciones no quedan en la cache: el próximo rerun reintenta
+        raise _DiarioFallido()
+    diario = _a_frame(rows, COLUMNAS_DIARIO)
+    diario["fecha"] = pd.to_datetime(diario["fecha"], errors="coerce")
+    diario["mes"] = diario["fecha"].dt.strftime("%Y-%m")
+    return diario
+
+
+def obtener_diario(
+    usuario_id: str,
+    fecha_desde: Optional[str] = None,
+    fecha_hasta: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Totales por día del usuario entre `fecha_desde` y `fecha_hasta`
+    (a lo sumo una fila por día con movimientos, ordenadas por fecha).
+    Cacheado 300s por rango; las escrituras del usuario lo invalidan (ver
+    cache_usuarios.generacion). Si falla, devuelve un DataFrame vacío.
+    """
+    try:
+        return _diario_cacheado(usuario_id, fecha_desde, fecha_hasta, generacion(usuario_id, DATASET_ACTIVOS))
+    except _DiarioFallido:
+        print(f"[DB] Error al obtener el diario de {fecha_desde} a {fecha_hasta}: se devuelve vacío")
+        diario = _a_frame([], COLUMNAS_DIARIO)
+        diario["fecha"] = pd.to_datetime(diario["fecha"])
+        diario["mes"] = diario["fecha"].dt.strftime("%Y-%m")
+        return diario
+
@@ -0,0 +1,43 @@
+"""
+Reconstruye el rollup mensual (movimientos_resumen_mensual) desde la tabla
+movimientos. Útil tras cargar datos por fuera de la app o si el rollup
+quedó desfasado.
+
+Uso (desde la raíz del proyecto):
+    python scripts/reconstruir_resumen.py              # todos los usuarios
+    python scripts/reconstruir_resumen.py <usuario_id> # un usuario
+
+Necesita SUPABASE_URL y SUPABASE_SERVICE_ROLE_KEY en el entorno: la
+reconstrucción corre por fuera de la sesión de un usuario. Con
+FINANZAS_BACKEND=sqlite no hay rollup (los resúmenes se calculan al vuelo)
+y el script termina con error.
+"""
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+
+def main() -> int:
+    if (os.getenv("FINANZAS_BACKEND") or "").strip().lower() != "sqlite":
+        service_key = (os.getenv("SUPABASE_SERVICE_ROLE_KEY") or "").strip()
+        if not service_key:
+            print("Falta SUPABASE_SERVICE_ROLE_KEY en las variables de entorno.")
+            return 1
+        os.environ["SUPABASE_ANON_KEY"] = service_key
+
+    from db import reconstruir_resumen_mensual
+
+    usuario_id = sys.argv[1] if len(sys.argv) > 1 else None
+    filas = reconstruir_resumen_mensual(usuario_id)
+    if filas is None:
+        return 1
+
+    destino = f"el usuario {usuario_id}" if usuario_id else "todos los usuarios"
+    print(f"Rollup mensual reconstruido para {destino}: {filas} filas.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""
+Corre cada página (con AppTest de Streamlit, sin navegador) sobre una base
+SQLite temporal con movimientos sintéticos y verifica que no haga más round
+trips a la base que su presupuesto: la primera carga, con las caches frías,
+contra consultas.PRESUPUESTOS_CACHE_FRIA, y un segundo rerun contra
+consultas.PRESUPUESTOS.
+
+Uso (desde la raíz del proyecto):
+    python scripts/verificar_consultas.py               # todas las páginas
+    python scripts/verificar_consultas.py 3_Cargar -v   # una página, con detalle
+
+Sale con código 1 si alguna página se pasa de su presupuesto o falla.
+"""
+import argparse
+import os
+import sys
+import tempfile
+from concurrent.futures import wait
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "benchmarks"))
+
+FILAS = 2000
+
+
+def _preparar_base(filas: int) -> str:
+    """Crea un usuario con catálogos, `filas` movimientos y uno borrado; devuelve su id."""
+    from catalogos import provisionar_catalogos
+    from db import eliminar_movimiento_logico, insertar_movimientos_bulk, obtener_movimientos
+    from generador import generar_movimientos, a_filas
+    from supabase_client import get_supabase_client
+
+    auth = get_supabase_client().auth
+    credenciales = {"email": "consultas@local", "password": "consultas"}
+    auth.sign_up(credenciales)
+    usuario_id = auth.sign_in_with_password(credenciales).user.id
+    provisionar_catalogos(usuario_id)
+
+    df = generar_movimientos(filas, usuario_id=usuario_id)
+    insertar_movimientos_bulk(usuario_id, a_filas(df[["fecha", "categoria", "tipo", "descripcion", "monto", "cuenta", "etiquetas"]]))
+    eliminar_movimiento_logico(usuario_id, obtener_movimientos(usuario_id)[0]["id"])
+    return usuario_id
+
+
+def _archivo(pagina: str) -> str:
+    if pagina == "app":
+        return os.path.join(RAIZ, "app.py")
+    return os.path.join(RAIZ, "pages", f"{pagina}.py")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paginas", nargs="*", help="páginas a verificar (por defecto todas)")
+    parser.add_argument("--filas", type=int, default=FILAS, help="movimientos sintéticos del usuario")
+    parser.add_argument("-v", "--detalle", action="store_true", help="listar las consultas de cada página")
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix="finanzas-consultas-")
+    os.environ["FINANZAS_BACKEND"] = "sqlite"
+    os.environ["FINANZAS_SQLITE_PATH"] = os.path.join(directorio, "finanzas.sqlite3")
+    os.environ["FINANZAS_MODELOS_DIR"] = os.path.join(directorio, "modelos_etiquetas")
+    os.chdir(RAIZ)
+
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+    from consultas import CLAVE_SESION, PRESUPUESTOS, PRESUPUESTOS_CACHE_FRIA, verificar_presupuesto
+    from prefetch import CachePaginas
+
+    paginas = args.paginas or list(PRESUPUESTOS)
+    desconocidas = [p for p in paginas if p not in PRESUPUESTOS]
+    if desconocidas:
+        print(f"Páginas sin presupuesto: {', '.join(desconocidas)}")
+        return 1
+
+    usuario_id = _preparar_base(args.filas)
+
+    fallas = 0
+    for pagina in paginas:
+        st.cache_data.clear()
+        st.cache_resource.clear()
+
+        at = AppTest.from_file(_archivo(pagina), default_timeout=120)
+        at.session_state["user"] = {"id": usuario_id, "email": "consultas@local"}
+
+        for cache_fria, presupuestos in ((True, PRESUPUESTOS_CACHE_FRIA), (False, PRESUPUESTOS)):
+            at.run()
+            etiqueta = f"{pagina} ({'cache fría' if cache_fria else 'rerun'})"
+            if at.exception:
+                fallas += 1
+                print(f"{etiqueta:<40} ERROR    {at.exception[0].value}")
+                break
+
+            # Las páginas prefetcheadas se cuentan en el rerun que las pidió:
+            # se esperan para que el conteo no dependa de cuánto tardan
+            for valor in at.session_state.values():
+                if isinstance(valor, CachePaginas):
+                    wait(valor.futuros.values())
+
+            rerun = at.session_state[CLAVE_SESION]
+            try:
+                verificar_presupuesto(rerun, cache_fria=cache_fria)
+                estado = "OK"
+            except AssertionError:
+                fallas += 1
+                estado = "EXCEDIDO"
+            print(f"{etiqueta:<40} {estado:<8} {len(rerun):>3} / {presupuestos[pagina]}")
+            if args.detalle or estado != "OK":
+                for consulta in rerun.consultas:
+                    print(f"    {consulta.funcion:<45} {consulta.operacion:<28} {consulta.segundos * 1000:7.1f} ms")
+
+    return 1 if fallas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
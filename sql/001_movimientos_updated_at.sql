@@ -0,0 +1,29 @@
+-- ---------------------------------------------------------
+--  MOVIMIENTOS: columna updated_at (watermark de sincronización)
+-- ---------------------------------------------------------
+-- La app sincroniza el ledger de cada usuario de forma incremental:
+-- solo pide las filas con updated_at >= último watermark visto
+-- (incluye los cambios de deleted por borrado lógico / restauración).
+
+alter table public.movimientos
+    add column if not exists updated_at timestamptz not null default clock_timestamp();
+
+create or replace function public.movimientos_set_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at := clock_timestamp();
+    return new;
+end;
+$$;
+
+drop trigger if exists movimientos_set_updated_at on public.movimientos;
+
+create trigger movimientos_set_updated_at
+    before insert or update on public.movimientos
+    for each row
+    execute function public.movimientos_set_updated_at();
+
+create index if not exists movimientos_usuario_updated_at_idx
+    on public.movimientos (usuario_id, updated_at);
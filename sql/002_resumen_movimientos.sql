@@ -0,0 +1,83 @@
+-- ---------------------------------------------------------
+--  RESUMEN AGREGADO DE MOVIMIENTOS (dashboards)
+-- ---------------------------------------------------------
+-- Los dashboards solo necesitan totales agrupados; estas funciones los
+-- calculan en Postgres y devuelven unos pocos cientos de filas en lugar
+-- de todo el historial. Se invocan vía RPC desde db.py:
+--   db.obtener_resumen_movimientos -> resumen_movimientos
+--   db.obtener_resumen_diario      -> resumen_diario
+-- security invoker: las políticas RLS de movimientos siguen aplicando.
+
+create or replace function public.resumen_movimientos(
+    p_usuario_id uuid,
+    p_desde date default null,
+    p_hasta date default null
+)
+returns table (
+    mes text,
+    anio integer,
+    categoria text,
+    cuenta text,
+    ingresos numeric,
+    gastos numeric,
+    balance numeric,
+    cantidad bigint
+)
+language sql
+stable
+security invoker
+as $$
+    select
+        to_char(m.fecha, 'YYYY-MM') as mes,
+        extract(year from m.fecha)::integer as anio,
+        coalesce(nullif(m.categoria, ''), 'Sin categoría') as categoria,
+        coalesce(nullif(m.cuenta, ''), 'Sin cuenta') as cuenta,
+        sum(case when lower(m.tipo) = 'ingreso' then m.monto else 0 end) as ingresos,
+        sum(case when lower(m.tipo) = 'gasto' then m.monto else 0 end) as gastos,
+        sum(case when lower(m.tipo) = 'ingreso' then m.monto else -m.monto end) as balance,
+        count(*) as cantidad
+    from public.movimientos m
+    where m.usuario_id = p_usuario_id
+      and not m.deleted
+      and m.fecha is not null
+      and (p_desde is null or m.fecha >= p_desde)
+      and (p_hasta is null or m.fecha <= p_hasta)
+    group by 1, 2, 3, 4
+    order by 1, 3, 4;
+$$;
+
+create or replace function public.resumen_diario(
+    p_usuario_id uuid,
+    p_desde date default null,
+    p_hasta date default null
+)
+returns table (
+    fecha date,
+    ingresos numeric,
+    gastos numeric,
+    balance numeric,
+    cantidad bigint
+)
+language sql
+stable
+security invoker
+as $$
+    select
+        m.fecha,
+        sum(case when lower(m.tipo) = 'ingreso' then m.monto else 0 end) as ingresos,
+        sum(case when lower(m.tipo) = 'gasto' then m.monto else 0 end) as gastos,
+        sum(case when lower(m.tipo) = 'ingreso' then m.monto else -m.monto end) as balance,
+        count(*) as cantidad
+    from public.movimientos m
+    where m.usuario_id = p_usuario_id
+      and not m.deleted
+      and m.fecha is not null
+      and (p_desde is null or m.fecha >= p_desde)
+      and (p_hasta is null or m.fecha <= p_hasta)
+    group by m.fecha
+    order by m.fecha;
+$$;
+
+create index if not exists movimientos_usuario_fecha_idx
+    on public.movimientos (usuario_id, fecha)
+    where not deleted;
@@ -0,0 +1,214 @@
+-- ---------------------------------------------------------
+--  ROLLUP MENSUAL DE MOVIMIENTOS
+-- ---------------------------------------------------------
+-- Totales por usuario, mes, categoría, cuenta y tipo. Se mantiene con un
+-- trigger sobre movimientos, así cada escritura de db.py (insertar,
+-- insertar en lote, actualizar, borrado lógico y restauración) actualiza
+-- el rollup en la misma transacción. Los dashboards, alertas y forecast
+-- leen estas pocas filas en lugar de recorrer todo el historial.
+--
+-- Reconstrucción completa:
+--   select public.reconstruir_resumen_mensual();            -- todos (service role / SQL Editor)
+--   select public.reconstruir_resumen_mensual('<uuid>');    -- un usuario
+-- o desde la app: python scripts/reconstruir_resumen.py [usuario_id]
+
+create table if not exists public.movimientos_resumen_mensual (
+    usuario_id uuid not null,
+    mes date not null,
+    categoria text not null,
+    cuenta text not null,
+    tipo text not null,
+    total numeric not null default 0,
+    cantidad bigint not null default 0,
+    primary key (usuario_id, mes, categoria, cuenta, tipo)
+);
+
+alter table public.movimientos_resumen_mensual enable row level security;
+
+drop policy if exists "resumen_mensual_select_propio" on public.movimientos_resumen_mensual;
+
+create policy "resumen_mensual_select_propio"
+    on public.movimientos_resumen_mensual
+    for select
+    using (auth.uid() = usuario_id);
+
+
+-- Suma (p_signo = 1) o resta (p_signo = -1) un movimiento del rollup
+create or replace function public.resumen_mensual_aplicar(
+    p_usuario_id uuid,
+    p_fecha date,
+    p_categoria text,
+    p_cuenta text,
+    p_tipo text,
+    p_monto numeric,
+    p_signo integer
+)
+returns void
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_mes date := date_trunc('month', p_fecha)::date;
+    v_categoria text := coalesce(nullif(p_categoria, ''), 'Sin categoría');
+    v_cuenta text := coalesce(nullif(p_cuenta, ''), 'Sin cuenta');
+    v_tipo text := lower(coalesce(p_tipo, ''));
+begin
+    insert into movimientos_resumen_mensual as r
+        (usuario_id, mes, categoria, cuenta, tipo, total, cantidad)
+    values
+        (p_usuario_id, v_mes, v_categoria, v_cuenta, v_tipo, p_signo * coalesce(p_monto, 0), p_signo)
+    on conflict (usuario_id, mes, categoria, cuenta, tipo)
+    do update set
+        total = r.total + excluded.total,
+        cantidad = r.cantidad + excluded.cantidad;
+
+    if p_signo < 0 then
+        delete from movimientos_resumen_mensual
+        where usuario_id = p_usuario_id
+          and mes = v_mes
+          and categoria = v_categoria
+          and cuenta = v_cuenta
+          and tipo = v_tipo
+          and cantidad <= 0;
+    end if;
+end;
+$$;
+
+revoke execute on function public.resumen_mensual_aplicar(uuid, date, text, text, text, numeric, integer) from public, anon, authenticated;
+
+
+create or replace function public.movimientos_resumen_mensual_trigger()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    if tg_op in ('UPDATE', 'DELETE') and not old.deleted and old.fecha is not null then
+        perform resumen_mensual_aplicar(
+            old.usuario_id, old.fecha, old.categoria, old.cuenta, old.tipo, old.monto, -1
+        );
+    end if;
+
+    if tg_op in ('INSERT', 'UPDATE') and not new.deleted and new.fecha is not null then
+        perform resumen_mensual_aplicar(
+            new.usuario_id, new.fecha, new.categoria, new.cuenta, new.tipo, new.monto, 1
+        );
+    end if;
+
+    return null;
+end;
+$$;
+
+drop trigger if exists movimientos_resumen_mensual on public.movimientos;
+
+create trigger movimientos_resumen_mensual
+    after insert or update of usuario_id, fecha, categoria, cuenta, tipo, monto, deleted or delete
+    on public.movimientos
+    for each row
+    execute function public.movimientos_resumen_mensual_trigger();
+
+
+-- Reconstruye el rollup desde movimientos. Sin service role solo puede
+-- reconstruir el del propio usuario.
+create or replace function public.reconstruir_resumen_mensual(p_usuario_id uuid default null)
+returns bigint
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_filas bigint;
+begin
+    if coalesce(auth.role(), '') <> 'service_role' then
+        p_usuario_id := auth.uid();
+        if p_usuario_id is null then
+            raise exception 'reconstruir_resumen_mensual requiere un usuario autenticado';
+        end if;
+    end if;
+
+    delete from movimientos_resumen_mensual
+    where p_usuario_id is null or usuario_id = p_usuario_id;
+
+    insert into movimientos_resumen_mensual (usuario_id, mes, categoria, cuenta, tipo, total, cantidad)
+    select
+        m.usuario_id,
+        date_trunc('month', m.fecha)::date,
+        coalesce(nullif(m.categoria, ''), 'Sin categoría'),
+        coalesce(nullif(m.cuenta, ''), 'Sin cuenta'),
+        lower(coalesce(m.tipo, '')),
+        sum(coalesce(m.monto, 0)),
+        count(*)
+    from movimientos m
+    where not m.deleted
+      and m.fecha is not null
+      and (p_usuario_id is null or m.usuario_id = p_usuario_id)
+    group by 1, 2, 3, 4, 5;
+
+    get diagnostics v_filas = row_count;
+    return v_filas;
+end;
+$$;
+
+select public.reconstruir_resumen_mensual();
+
+
+-- resumen_movimientos (sql/002): sin rango de fechas se responde desde el
+-- rollup; con rango se sigue agregando sobre movimientos.
+create or replace function public.resumen_movimientos(
+    p_usuario_id uuid,
+    p_desde date default null,
+    p_hasta date default null
+)
+returns table (
+    mes text,
+    anio integer,
+    categoria text,
+    cuenta text,
+    ingresos numeric,
+    gastos numeric,
+    balance numeric,
+    cantidad bigint
+)
+language sql
+stable
+security invoker
+as $$
+    select
+        to_char(r.mes, 'YYYY-MM') as mes,
+        extract(year from r.mes)::integer as anio,
+        r.categoria,
+        r.cuenta,
+        sum(case when r.tipo = 'ingreso' then r.total else 0 end) as ingresos,
+        sum(case when r.tipo = 'gasto' then r.total else 0 end) as gastos,
+        sum(case when r.tipo = 'ingreso' then r.total else -r.total end) as balance,
+        sum(r.cantidad)::bigint as cantidad
+    from public.movimientos_resumen_mensual r
+    where r.usuario_id = p_usuario_id
+      and p_desde is null
+      and p_hasta is null
+    group by 1, 2, 3, 4
+
+    union all
+
+    select
+        to_char(m.fecha, 'YYYY-MM') as mes,
+        extract(year from m.fecha)::integer as anio,
+        coalesce(nullif(m.categoria, ''), 'Sin categoría') as categoria,
+        coalesce(nullif(m.cuenta, ''), 'Sin cuenta') as cuenta,
+        sum(case when lower(m.tipo) = 'ingreso' then m.monto else 0 end) as ingresos,
+        sum(case when lower(m.tipo) = 'gasto' then m.monto else 0 end) as gastos,
+        sum(case when lower(m.tipo) = 'ingreso' then m.monto else -m.monto end) as balance,
+        count(*) as cantidad
+    from public.movimientos m
+    where m.usuario_id = p_usuario_id
+      and (p_desde is not null or p_hasta is not null)
+      and not m.deleted
+      and m.fecha is not null
+      and (p_desde is null or m.fecha >= p_desde)
+      and (p_hasta is null or m.fecha <= p_hasta)
+    group by 1, 2, 3, 4
+
+    order by 1, 3, 4;
+$$;
@@ -0,0 +1,10 @@
+-- ---------------------------------------------------------
+--  ÍNDICE PARA PAGINACIÓN POR CURSOR (keyset)
+-- ---------------------------------------------------------
+-- db.obtener_movimientos_keyset pide "las N filas anteriores a (fecha, id)"
+-- en orden fecha desc, id desc. Con este índice Postgres lee solo esas N
+-- filas, sin importar la profundidad de la página.
+
+create index if not exists movimientos_usuario_fecha_id_idx
+    on public.movimientos (usuario_id, fecha desc, id desc)
+    where not deleted;
@@ -0,0 +1,29 @@
+-- ---------------------------------------------------------
+--  CATÁLOGOS DEL USUARIO EN UN SOLO REQUEST
+-- ---------------------------------------------------------
+-- Devuelve categorías, etiquetas y cuentas del usuario, ordenadas por
+-- nombre, en un único objeto JSON:
+--   {"categorias": [...], "etiquetas": [...], "cuentas": [...]}
+-- Lo usa catalogos.CatalogStore; si no está instalada se hacen tres queries.
+
+create or replace function public.obtener_catalogos(p_usuario_id uuid)
+returns json
+language sql
+stable
+security invoker
+as $$
+    select json_build_object(
+        'categorias', coalesce(
+            (select json_agg(c.nombre order by c.nombre) from public.categorias c where c.usuario_id = p_usuario_id),
+            '[]'::json
+        ),
+        'etiquetas', coalesce(
+            (select json_agg(e.nombre order by e.nombre) from public.etiquetas e where e.usuario_id = p_usuario_id),
+            '[]'::json
+        ),
+        'cuentas', coalesce(
+            (select json_agg(a.nombre order by a.nombre) from public.cuentas a where a.usuario_id = p_usuario_id),
+            '[]'::json
+        )
+    );
+$$;
@@ -0,0 +1,31 @@
+-- ---------------------------------------------------------
+--  BÚSQUEDA EN LA DESCRIPCIÓN (trigramas, sin acentos)
+-- ---------------------------------------------------------
+-- db._aplicar_filtros busca cada palabra del texto como substring de
+-- descripcion_busqueda (descripción en minúsculas y sin acentos, igual que
+-- db.normalizar_busqueda). El índice GIN de trigramas resuelve esos ILIKE
+-- '%palabra%' sin recorrer la tabla, y se combina con los filtros de fecha,
+-- cuenta y categoría del listado.
+
+create extension if not exists unaccent with schema extensions;
+create extension if not exists pg_trgm with schema extensions;
+
+-- unaccent no es immutable (depende del diccionario configurado); fijando
+-- el diccionario se puede usar en una columna generada y en un índice.
+create or replace function public.normalizar_busqueda(p_texto text)
+returns text
+language sql
+immutable
+parallel safe
+set search_path = ''
+as $$
+    select lower(extensions.unaccent('extensions.unaccent'::regdictionary, coalesce(p_texto, '')))
+$$;
+
+alter table public.movimientos
+    add column if not exists descripcion_busqueda text
+    generated always as (public.normalizar_busqueda(descripcion)) stored;
+
+create index if not exists movimientos_descripcion_busqueda_trgm_idx
+    on public.movimientos using gin (descripcion_busqueda extensions.gin_trgm_ops)
+    where not deleted;
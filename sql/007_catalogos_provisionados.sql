@@ -0,0 +1,29 @@
+-- ---------------------------------------------------------
+--  CATÁLOGOS PROVISIONADOS (una fila por usuario)
+-- ---------------------------------------------------------
+-- catalogos.provisionar_catalogos carga los catálogos sugeridos al primer
+-- login y deja acá la fila del usuario; catalogos.catalogos_provisionados
+-- la busca por usuario_id. Reemplaza la marca en user_metadata, que se
+-- escribía con la sesión del cliente compartido y podía quedar en otro
+-- usuario. Los usuarios sin fila pasan una vez más por la provisión, que
+-- es idempotente (no toca las tablas que ya tienen filas).
+
+create table if not exists public.catalogos_provisionados (
+    usuario_id uuid primary key references auth.users (id) on delete cascade,
+    provisionado_at timestamptz not null default now()
+);
+
+alter table public.catalogos_provisionados enable row level security;
+
+drop policy if exists "catalogos_provisionados_select_propio" on public.catalogos_provisionados;
+drop policy if exists "catalogos_provisionados_insert_propio" on public.catalogos_provisionados;
+
+create policy "catalogos_provisionados_select_propio"
+    on public.catalogos_provisionados
+    for select
+    using (auth.uid() = usuario_id);
+
+create policy "catalogos_provisionados_insert_propio"
+    on public.catalogos_provisionados
+    for insert
+    with check (auth.uid() = usuario_id);
@@ -0,0 +1,46 @@
+-- ---------------------------------------------------------
+--  USO DE CATEGORÍAS Y ETIQUETAS (ranking del autocompletado)
+-- ---------------------------------------------------------
+-- Cantidad de movimientos activos por categoría y por etiqueta, en un
+-- único objeto JSON:
+--   {"categorias": {"Comida": 120, ...}, "etiquetas": {"super": 80, ...}}
+-- Lo usa autocompletado.py para ordenar los formularios de carga y edición
+-- por uso. Las categorías salen del rollup mensual (sql/003), así su costo
+-- no crece con el historial; las etiquetas se cuentan en Postgres y solo
+-- viaja un par por etiqueta (sql/010 las pasa a un rollup propio).
+
+create or replace function public.uso_catalogos(p_usuario_id uuid)
+returns json
+language sql
+stable
+security invoker
+as $$
+    select json_build_object(
+        'categorias', coalesce(
+            (
+                select json_object_agg(c.categoria, c.cantidad)
+                from (
+                    select r.categoria, sum(r.cantidad) as cantidad
+                    from public.movimientos_resumen_mensual r
+                    where r.usuario_id = p_usuario_id
+                    group by r.categoria
+                ) c
+            ),
+            '{}'::json
+        ),
+        'etiquetas', coalesce(
+            (
+                select json_object_agg(e.etiqueta, e.cantidad)
+                from (
+                    select t.etiqueta, count(*) as cantidad
+                    from public.movimientos m
+                    cross join lateral jsonb_array_elements_text(to_jsonb(m.etiquetas)) as t(etiqueta)
+                    where m.usuario_id = p_usuario_id
+                      and m.deleted = false
+                    group by t.etiqueta
+                ) e
+            ),
+            '{}'::json
+        )
+    );
+$$;
@@ -0,0 +1,15 @@
+-- ---------------------------------------------------------
+--  MOVIMIENTOS: columna id_importacion (inserción en lote idempotente)
+-- ---------------------------------------------------------
+-- db.insertar_movimientos_bulk le da a cada fila un uuid generado en el
+-- cliente y la inserta con upsert ... on conflict (id_importacion) do
+-- nothing. Si un bloque falla sin saber si el servidor llegó a grabarlo
+-- (por ejemplo, un timeout después del commit), el reintento fila por fila
+-- no duplica nada: las filas ya grabadas se saltean. Las filas cargadas a
+-- mano quedan con id_importacion null (los null no chocan entre sí).
+
+alter table public.movimientos
+    add column if not exists id_importacion uuid;
+
+create unique index if not exists movimientos_id_importacion_key
+    on public.movimientos (id_importacion);
@@ -0,0 +1,161 @@
+-- ---------------------------------------------------------
+--  ROLLUP DE USO DE ETIQUETAS
+-- ---------------------------------------------------------
+-- Cantidad de movimientos activos por usuario y etiqueta. Se mantiene con
+-- un trigger sobre movimientos, igual que el rollup mensual (sql/003): cada
+-- escritura de db.py suma o resta las etiquetas de la fila en la misma
+-- transacción. uso_catalogos (sql/008) lee estas filas en lugar de
+-- desarmar el JSON de etiquetas de todo el historial en cada llamada.
+--
+-- Reconstrucción completa:
+--   select public.reconstruir_uso_etiquetas();            -- todos (service role / SQL Editor)
+--   select public.reconstruir_uso_etiquetas('<uuid>');    -- un usuario
+
+create table if not exists public.movimientos_uso_etiquetas (
+    usuario_id uuid not null,
+    etiqueta text not null,
+    cantidad bigint not null default 0,
+    primary key (usuario_id, etiqueta)
+);
+
+alter table public.movimientos_uso_etiquetas enable row level security;
+
+drop policy if exists "uso_etiquetas_select_propio" on public.movimientos_uso_etiquetas;
+
+create policy "uso_etiquetas_select_propio"
+    on public.movimientos_uso_etiquetas
+    for select
+    using (auth.uid() = usuario_id);
+
+
+-- Suma (p_signo = 1) o resta (p_signo = -1) las etiquetas de un movimiento
+create or replace function public.uso_etiquetas_aplicar(
+    p_usuario_id uuid,
+    p_etiquetas jsonb,
+    p_signo integer
+)
+returns void
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    if jsonb_typeof(p_etiquetas) is distinct from 'array' then
+        return;
+    end if;
+
+    insert into movimientos_uso_etiquetas as u (usuario_id, etiqueta, cantidad)
+    select p_usuario_id, t.etiqueta, p_signo * count(*)
+    from jsonb_array_elements_text(p_etiquetas) as t(etiqueta)
+    group by t.etiqueta
+    on conflict (usuario_id, etiqueta)
+    do update set cantidad = u.cantidad + excluded.cantidad;
+
+    if p_signo < 0 then
+        delete from movimientos_uso_etiquetas
+        where usuario_id = p_usuario_id
+          and cantidad <= 0;
+    end if;
+end;
+$$;
+
+revoke execute on function public.uso_etiquetas_aplicar(uuid, jsonb, integer) from public, anon, authenticated;
+
+
+create or replace function public.movimientos_uso_etiquetas_trigger()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    if tg_op in ('UPDATE', 'DELETE') and not old.deleted then
+        perform uso_etiquetas_aplicar(old.usuario_id, to_jsonb(old.etiquetas), -1);
+    end if;
+
+    if tg_op in ('INSERT', 'UPDATE') and not new.deleted then
+        perform uso_etiquetas_aplicar(new.usuario_id, to_jsonb(new.etiquetas), 1);
+    end if;
+
+    return null;
+end;
+$$;
+
+drop trigger if exists movimientos_uso_etiquetas on public.movimientos;
+
+create trigger movimientos_uso_etiquetas
+    after insert or update of usuario_id, etiquetas, deleted or delete
+    on public.movimientos
+    for each row
+    execute function public.movimientos_uso_etiquetas_trigger();
+
+
+-- Reconstruye el rollup desde movimientos. Sin service role solo puede
+-- reconstruir el del propio usuario.
+create or replace function public.reconstruir_uso_etiquetas(p_usuario_id uuid default null)
+returns bigint
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_filas bigint;
+begin
+    if coalesce(auth.role(), '') <> 'service_role' then
+        p_usuario_id := auth.uid();
+        if p_usuario_id is null then
+            raise exception 'reconstruir_uso_etiquetas requiere un usuario autenticado';
+        end if;
+    end if;
+
+    delete from movimientos_uso_etiquetas
+    where p_usuario_id is null or usuario_id = p_usuario_id;
+
+    insert into movimientos_uso_etiquetas (usuario_id, etiqueta, cantidad)
+    select m.usuario_id, t.etiqueta, count(*)
+    from movimientos m
+    cross join lateral jsonb_array_elements_text(
+        case when jsonb_typeof(to_jsonb(m.etiquetas)) = 'array' then to_jsonb(m.etiquetas) else '[]'::jsonb end
+    ) as t(etiqueta)
+    where not m.deleted
+      and (p_usuario_id is null or m.usuario_id = p_usuario_id)
+    group by 1, 2;
+
+    get diagnostics v_filas = row_count;
+    return v_filas;
+end;
+$$;
+
+select public.reconstruir_uso_etiquetas();
+
+
+-- uso_catalogos (sql/008): las etiquetas también salen de un rollup
+create or replace function public.uso_catalogos(p_usuario_id uuid)
+returns json
+language sql
+stable
+security invoker
+as $$
+    select json_build_object(
+        'categorias', coalesce(
+            (
+                select json_object_agg(c.categoria, c.cantidad)
+                from (
+                    select r.categoria, sum(r.cantidad) as cantidad
+                    from public.movimientos_resumen_mensual r
+                    where r.usuario_id = p_usuario_id
+                    group by r.categoria
+                ) c
+            ),
+            '{}'::json
+        ),
+        'etiquetas', coalesce(
+            (
+                select json_object_agg(u.etiqueta, u.cantidad)
+                from public.movimientos_uso_etiquetas u
+                where u.usuario_id = p_usuario_id
+            ),
+            '{}'::json
+        )
+    );
+$$;
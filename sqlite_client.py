@@ -0,0 +1,731 @@
+import asyncio
+import datetime
+import hashlib
+import json
+import re
+import secrets
+import sqlite3
+import threading
+import unicodedata
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, MutableMapping, Optional, Tuple
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# ---------------------------------------------------------
+#  BACKEND LOCAL (SQLite) CON LA MISMA INTERFAZ QUE SUPABASE
+# ---------------------------------------------------------
+# db.py, catalogos.py y auth.py hablan con la base a través del cliente que
+# devuelve supabase_client.get_supabase_client(). ClienteSQLite implementa
+# el mismo subconjunto de esa interfaz sobre un archivo SQLite:
+#
+#   table(t).select(cols, count=, head=) / insert / upsert / update
+#   filtros eq, neq, gt, gte, lt, lte, ilike, in_, or_ (sintaxis PostgREST)
+#   order, limit, range, single, execute -> respuesta con .data y .count
+#   rpc(...) de sql/002, sql/003, sql/005 y sql/008, con .range()
+#   auth.sign_up / sign_in_with_password / update_user
+#
+# Se comporta como las tablas de Postgres con las migraciones aplicadas:
+# borrado lógico con `deleted`, updated_at y descripcion_busqueda se
+# mantienen solos, y el orden es el mismo (también el de los null: últimos
+# en orden ascendente, primeros en descendente). Sirve para instalaciones de
+# un solo nodo y para pruebas de carga sin servicios externos.
+#
+# No hay políticas RLS: el cliente devuelve lo que pida la consulta. Todas
+# las consultas de db.py, catalogos.py y db_async.py filtran por usuario_id
+# explicitamente, así que la app ve lo mismo que con Supabase, pero un
+# error en esos filtros acá no lo frena ninguna política.
+#
+# Tampoco hay rollups (sql/003, sql/010): los resúmenes y el uso de
+# catálogos se calculan al vuelo desde movimientos, con sus índices.
+#
+# Todas las consultas pasan por una única conexión protegida por un RLock,
+# así que se ejecutan de a una: con este backend, las cargas concurrentes de
+# carga_paralela.py y prefetch.py no ganan tiempo de base (solo se
+# superponen con el trabajo de Python de la página).
+#
+# ClienteSQLiteAsync da la interfaz de supabase.AsyncClient (execute() y los
+# métodos de auth son corrutinas) sobre el mismo ClienteSQLite, corriendo
+# cada consulta en un hilo; es lo que usa db_async.py con este backend.
+
+SCHEMA = """
+create table if not exists movimientos (
+    id integer primary key autoincrement,
+    usuario_id text not null,
+    fecha text,
+    categoria text,
+    tipo text,
+    descripcion text,
+    monto real,
+    cuenta text,
+    etiquetas text not null default '[]',
+    deleted integer not null default 0,
+    created_at text not null,
+    updated_at text not null,
+    descripcion_busqueda text,
+    id_importacion text
+);
+create index if not exists movimientos_usuario_fecha_id_idx
+    on movimientos (usuario_id, fecha desc, id desc) where deleted = 0;
+create index if not exists movimientos_usuario_updated_at_idx
+    on movimientos (usuario_id, updated_at);
+
+create table if not exists categorias (
+    id integer primary key autoincrement,
+    usuario_id text not null,
+    nombre text not null,
+    unique (usuario_id, nombre)
+);
+create table if not exists etiquetas (
+    id integer primary key autoincrement,
+    usuario_id text not null,
+    nombre text not null,
+    unique (usuario_id, nombre)
+);
+create table if not exists cuentas (
+    id integer primary key autoincrement,
+    usuario_id text not null,
+    nombre text not null,
+    unique (usuario_id, nombre)
+);
+
+create table if not exists catalogos_provisionados (
+    usuario_id text primary key,
+    provisionado_at text not null default current_timestamp
+);
+
+create table if not exists usuarios (
+    id text primary key,
+    email text not null unique,
+    password_hash text not null,
+    user_metadata text not null default '{}',
+    created_at text not null
+);
+"""
+
+# Columnas agregadas después de la primera versión del esquema, para las
+# bases ya creadas (create table if not exists no las agrega)
+COLUMNAS_NUEVAS = {
+    "movimientos": {"id_importacion": "text"},
+}
+
+INDICES = """
+create unique index if not exists movimientos_id_importacion_key
+    on movimientos (id_importacion);
+"""
+
+TABLAS = ("movimientos", "categorias", "etiquetas", "cuentas", "catalogos_provisionados")
+
+# Columnas guardadas como JSON / 0-1 que se devuelven como lista / bool
+_COLUMNAS_JSON = {"etiquetas"}
+_COLUMNAS_BOOL = {"deleted"}
+
+_IDENTIFICADOR = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+_OPERADORES = {
+    "eq": "=",
+    "neq": "<>",
+    "gt": ">",
+    "gte": ">=",
+    "lt": "<",
+    "lte": "<=",
+    "like": "like",
+    "ilike": "like",
+}
+
+PBKDF2_ITERACIONES = 200_000
+
+
+def _ahora() -> str:
+    """Timestamp UTC con microsegundos (se compara bien como texto)."""
+    return datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f+00:00")
+
+
+def _normalizar_busqueda(texto: Optional[str]) -> str:
+    """Equivalente de la función SQL normalizar_busqueda (sql/006)."""
+    descompuesto = unicodedata.normalize("NFKD", (texto or "").lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def _columna(nombre: str) -> str:
+    nombre = nombre.strip()
+    if not _IDENTIFICADOR.match(nombre):
+        raise ValueError(f"Columna inválida: {nombre!r}")
+    return nombre
+
+
+def _a_sqlite(valor: Any) -> Any:
+    if isinstance(valor, bool):
+        return int(valor)
+    if isinstance(valor, (list, dict)):
+        return json.dumps(valor, ensure_ascii=False)
+    if isinstance(valor, (datetime.date, datetime.datetime)):
+        return valor.isoformat()
+    return valor
+
+
+def _a_fila(row: sqlite3.Row) -> Dict[str, Any]:
+    fila = dict(row)
+    for columna in _COLUMNAS_JSON & fila.keys():
+        fila[columna] = json.loads(fila[columna]) if fila[columna] else []
+    for columna in _COLUMNAS_BOOL & fila.keys():
+        fila[columna] = bool(fila[columna])
+    return fila
+
+
+def _condicion(columna: str, op: str, valor: Any) -> Tuple[str, List[Any]]:
+    """Un filtro PostgREST (columna, operador, valor) como SQL con parámetros."""
+    columna = _columna(columna)
+    if op == "is":
+        literal = {"null": "null", "true": "1", "false": "0"}.get(str(valor).lower())
+        if literal is None:
+            raise ValueError(f"Valor inválido para is: {valor!r}")
+        return f"{columna} is {literal}", []
+    if op == "in":
+        valores = list(valor)
+        if not valores:
+            return "0", []
+        return f"{columna} in ({', '.join('?' * len(valores))})", [_a_sqlite(v) for v in valores]
+    if op not in _OPERADORES:
+        raise ValueError(f"Operador no soportado: {op}")
+    if op in ("like", "ilike"):
+        # `*` es el comodín de PostgREST en la URL; LIKE de SQLite ya ignora mayúsculas
+        return f"{columna} like ? escape '\\'", [str(valor).replace("*", "%")]
+    return f"{columna} {_OPERADORES[op]} ?", [_a_sqlite(valor)]
+
+
+def _dividir(expr: str) -> List[str]:
+    """Parte `expr` por las comas que no están dentro de paréntesis."""
+    partes, nivel, actual = [], 0, []
+    for c in expr:
+        if c == "," and nivel == 0:
+            partes.append("".join(actual))
+            actual = []
+            continue
+        nivel += (c == "(") - (c == ")")
+        actual.append(c)
+    partes.append("".join(actual))
+    return [p.strip() for p in partes if p.strip()]
+
+
+def _logico(expr: str, union: str) -> Tuple[str, List[Any]]:
+    """Filtro lógico de PostgREST (`a.eq.1,and(b.lt.2,c.gt.3)`) como SQL."""
+    sqls, params = [], []
+    for parte in _dividir(expr):
+        anidado = re.fullmatch(r"(and|or)\((.*)\)", parte)
+        if anidado:
+            sql, ps = _logico(anidado.group(2), anidado.group(1))
+        else:
+            columna, op, valor = parte.split(".", 2)
+            if op == "in":
+                valor = [v.strip().strip('"') for v in valor.strip("()").split(",")]
+            else:
+                valor = valor.strip('"')
+            sql, ps = _condicion(columna, op, valor)
+        sqls.append(f"({sql})")
+        params.extend(ps)
+    return f" {union} ".join(sqls), params
+
+
+@dataclass
+class RespuestaSQLite:
+    data: Any
+    count: Optional[int] = None
+
+
+class ConsultaSQLite:
+    """Builder de una consulta sobre una tabla, al estilo de postgrest."""
+
+    def __init__(self, cliente: "ClienteSQLite", tabla: str):
+        if tabla not in TABLAS:
+            raise ValueError(f"Tabla desconocida: {tabla}")
+        self._cliente = cliente
+        self._tabla = tabla
+        self._accion = "select"
+        self._columnas = "*"
+        self._conteo = None
+        self._head = False
+        self._datos: Any = None
+        self._on_conflict: Optional[str] = None
+        self._ignorar_duplicados = False
+        self._devolver = True
+        self._filtros: List[Tuple[str, List[Any]]] = []
+        self._orden: List[str] = []
+        self._limite: Optional[int] = None
+        self._desde = 0
+        self._single = False
+
+    # --- acciones ---
+    def select(self, columnas: str = "*", count=None, head: bool = False) -> "ConsultaSQLite":
+        self._accion = "select"
+        if columnas.strip() != "*":
+            columnas = ", ".join(_columna(c) for c in columnas.split(","))
+        self._columnas = columnas
+        self._conteo = count
+        self._head = head
+        return self
+
+    def insert(self, datos, returning=None, **_) -> "ConsultaSQLite":
+        self._accion = "insert"
+        self._datos = datos
+        self._devolver = str(returning or "representation") != "minimal"
+        return self
+
+    def upsert(self, datos, on_conflict: str = "", ignore_duplicates: bool = False, returning=None, **_) -> "ConsultaSQLite":
+        self.insert(datos, returning=returning)
+        self._on_conflict = on_conflict or "id"
+        self._ignorar_duplicados = ignore_duplicates
+        return self
+
+    def update(self, datos: Dict[str, Any], **_) -> "ConsultaSQLite":
+        self._accion = "update"
+        self._datos = datos
+        return self
+
+    # --- filtros ---
+    def _filtro(self, columna: str, op: str, valor: Any) -> "ConsultaSQLite":
+        self._filtros.append(_condicion(columna, op, valor))
+        return self
+
+    def eq(self, columna, valor):
+        return self._filtro(columna, "eq", valor)
+
+    def neq(self, columna, valor):
+        return self._filtro(columna, "neq", valor)
+
+    def gt(self, columna, valor):
+        return self._filtro(columna, "gt", valor)
+
+    def gte(self, columna, valor):
+        return self._filtro(columna, "gte", valor)
+
+    def lt(self, columna, valor):
+        return self._filtro(columna, "lt", valor)
+
+    def lte(self, columna, valor):
+        return self._filtro(columna, "lte", valor)
+
+    def ilike(self, columna, patron):
+        return self._filtro(columna, "ilike", patron)
+
+    def in_(self, columna, valores):
+        return self._filtro(columna, "in", valores)
+
+    def is_(self, columna, valor):
+        return self._filtro(columna, "is", valor)
+
+    def or_(self, expr: str) -> "ConsultaSQLite":
+        self._filtros.append(_logico(expr, "or"))
+        return self
+
+    # --- orden y paginado ---
+    def order(self, columna: str, desc: bool = False, nullsfirst: Optional[bool] = None, **_) -> "ConsultaSQLite":
+        # Sin nullsfirst, el default de Postgres (SQLite los pone al revés)
+        if nullsfirst is None:
+            nullsfirst = desc
+        self._orden.append(
+            f"{_columna(columna)} {'desc' if desc else 'asc'} nulls {'first' if nullsfirst else 'last'}"
+        )
+        return self
+
+    def limit(self, cantidad: int) -> "ConsultaSQLite":
+        self._limite = int(cantidad)
+        return self
+
+    def range(self, inicio: int, fin: int) -> "ConsultaSQLite":
+        self._desde = int(inicio)
+        self._limite = int(fin) - int(inicio) + 1
+        return self
+
+    def single(self) -> "ConsultaSQLite":
+        self._single = True
+        return self
+
+    # --- ejecución ---
+    def _where(self) -> Tuple[str, List[Any]]:
+        if not self._filtros:
+            return "", []
+        params = [p for _, ps in self._filtros for p in ps]
+        return " where " + " and ".join(f"({sql})" for sql, _ in self._filtros), params
+
+    def execute(self) -> RespuestaSQLite:
+        with self._cliente.lock:
+            conn = self._cliente.conn
+            if self._accion == "select":
+                return self._ejecutar_select(conn)
+            with conn:
+                if self._accion == "insert":
+                    return self._ejecutar_insert(conn)
+                return self._ejecutar_update(conn)
+
+    def _ejecutar_select(self, conn: sqlite3.Connection) -> RespuestaSQLite:
+        where, params = self._where()
+        total = None
+        if self._conteo is not None:
+            total = conn.execute(f"select count(*) from {self._tabla}{where}", params).fetchone()[0]
+        if self._head:
+            return RespuestaSQLite([], total)
+
+        sql = f"select {self._columnas} from {self._tabla}{where}"
+        if self._orden:
+            sql += " order by " + ", ".join(self._orden)
+        if self._limite is not None or self._desde:
+            sql += f" limit {self._limite if self._limite is not None else -1} offset {self._desde}"
+        filas = [_a_fila(r) for r in conn.execute(sql, params)]
+
+        if self._single:
+            if len(filas) != 1:
+                raise LookupError(f"Se esperaba una fila y hubo {len(filas)}")
+            return RespuestaSQLite(filas[0], total)
+        return RespuestaSQLite(filas, total)
+
+    def _ejecutar_insert(self, conn: sqlite3.Connection) -> RespuestaSQLite:
+        filas = self._datos if isinstance(self._datos, list) else [self._datos]
+        conflicto = ""
+        if self._on_conflict:
+            claves = [_columna(c) for c in self._on_conflict.split(",")]
+            conflicto = f" on conflict ({', '.join(claves)}) do nothing"
+            if not self._ignorar_duplicados:
+                otras = [c for c in filas[0] if c not in claves] if filas else []
+                if otras:
+                    conflicto = f" on conflict ({', '.join(claves)}) do update set " + ", ".join(
+                        f"{c} = excluded.{c}" for c in otras
+                    )
+
+        # Agrupa las filas por columnas para insertar cada grupo de una vez
+        grupos: Dict[Tuple[str, ...], List[Tuple[Any, ...]]] = {}
+        for fila in filas:
+            fila = self._cliente.completar(self._tabla, dict(fila), al_insertar=True)
+            columnas = tuple(_columna(c) for c in fila)
+            grupos.setdefault(columnas, []).append(tuple(_a_sqlite(v) for v in fila.values()))
+
+        insertadas: List[Dict[str, Any]] = []
+        for columnas, valores in grupos.items():
+            sql = (
+                f"insert into {self._tabla} ({', '.join(columnas)}) "
+                f"values ({', '.join('?' * len(columnas))}){conflicto}"
+            )
+            if self._devolver:
+                for v in valores:
+                    insertadas.extend(_a_fila(r) for r in conn.execute(sql + " returning *", v))
+            else:
+                conn.executemany(sql, valores)
+        return RespuestaSQLite(insertadas)
+
+    def _ejecutar_update(self, conn: sqlite3.Connection) -> RespuestaSQLite:
+        datos = self._cliente.completar(self._tabla, dict(self._datos), al_insertar=False)
+        where, params = self._where()
+        asignaciones = ", ".join(f"{_columna(c)} = ?" for c in datos)
+        sql = f"update {self._tabla} set {asignaciones}{where} returning *"
+        filas = conn.execute(sql, [_a_sqlite(v) for v in datos.values()] + params).fetchall()
+        return RespuestaSQLite([_a_fila(r) for r in filas])
+
+
+# ---------------------------------------------------------
+#  RPC (equivalentes de las funciones SQL de sql/)
+# ---------------------------------------------------------
+_MONTOS = """
+    sum(case when lower(tipo) = 'ingreso' then monto else 0 end) as ingresos,
+    sum(case when lower(tipo) = 'gasto' then monto else 0 end) as gastos,
+    sum(case when lower(tipo) = 'ingreso' then monto else -monto end) as balance,
+    count(*) as cantidad
+"""
+
+_WHERE_RESUMEN = """
+    where (:usuario_id is null or usuario_id = :usuario_id)
+      and deleted = 0
+      and fecha is not null
+      and (:desde is null or fecha >= :desde)
+      and (:hasta is null or fecha <= :hasta)
+"""
+
+SQL_RESUMEN_MOVIMIENTOS = f"""
+    select
+        substr(fecha, 1, 7) as mes,
+        cast(substr(fecha, 1, 4) as integer) as anio,
+        coalesce(nullif(categoria, ''), 'Sin categoría') as categoria,
+        coalesce(nullif(cuenta, ''), 'Sin cuenta') as cuenta,
+        {_MONTOS}
+    from movimientos
+    {_WHERE_RESUMEN}
+    group by 1, 2, 3, 4
+    order by 1, 3, 4
+"""
+
+SQL_RESUMEN_DIARIO = f"""
+    select fecha, {_MONTOS}
+    from movimientos
+    {_WHERE_RESUMEN}
+    group by fecha
+    order by fecha
+"""
+
+
+class RpcSQLite:
+    """Llamada a una función "RPC", con .range() como en postgrest."""
+
+    def __init__(self, cliente: "ClienteSQLite", funcion: str, params: Optional[Dict[str, Any]]):
+        self._cliente = cliente
+        self._funcion = funcion
+        self._params = params or {}
+        self._rango: Optional[Tuple[int, int]] = None
+
+    def range(self, inicio: int, fin: int) -> "RpcSQLite":
+        self._rango = (int(inicio), int(fin))
+        return self
+
+    def execute(self) -> RespuestaSQLite:
+        metodo = getattr(self, f"_rpc_{self._funcion}", None)
+        if metodo is None:
+            raise LookupError(f"Función desconocida: {self._funcion}")
+        with self._cliente.lock:
+            data = metodo(self._cliente.conn, self._params)
+        if self._rango is not None and isinstance(data, list):
+            data = data[self._rango[0]:self._rango[1] + 1]
+        return RespuestaSQLite(data)
+
+    @staticmethod
+    def _params_resumen(params: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "usuario_id": params.get("p_usuario_id"),
+            "desde": _a_sqlite(params.get("p_desde")),
+            "hasta": _a_sqlite(params.get("p_hasta")),
+        }
+
+    def _rpc_resumen_movimientos(self, conn, params):
+        if not params.get("p_usuario_id"):
+            raise ValueError("Falta p_usuario_id")
+        return [dict(r) for r in conn.execute(SQL_RESUMEN_MOVIMIENTOS, self._params_resumen(params))]
+
+    def _rpc_resumen_diario(self, conn, params):
+        if not params.get("p_usuario_id"):
+            raise ValueError("Falta p_usuario_id")
+        return [dict(r) for r in conn.execute(SQL_RESUMEN_DIARIO, self._params_resumen(params))]
+
+    def _rpc_reconstruir_resumen_mensual(self, conn, params):
+        raise NotImplementedError(
+            "El backend SQLite no tiene rollup mensual: los resúmenes se calculan al vuelo"
+            " desde movimientos y no hay nada que reconstruir."
+        )
+
+    def _rpc_obtener_catalogos(self, conn, params):
+        usuario_id = params.get("p_usuario_id")
+        return {
+            tabla: [r[0] for r in conn.execute(
+                f"select nombre from {tabla} where usuario_id = ? order by nombre", (usuario_id,)
+            )]
+            for tabla in ("categorias", "etiquetas", "cuentas")
+        }
+
+    def _rpc_uso_catalogos(self, conn, params):
+        usuario_id = params.get("p_usuario_id")
+        categorias = conn.execute(
+            "select coalesce(nullif(categoria, ''), 'Sin categoría'), count(*) from movimientos"
+            " where usuario_id = ? and deleted = 0 group by 1",
+            (usuario_id,),
+        )
+        etiquetas = conn.execute(
+            "select e.value, count(*) from movimientos m, json_each(m.etiquetas) e"
+            " where m.usuario_id = ? and m.deleted = 0 group by e.value",
+            (usuario_id,),
+        )
+        return {
+            "categorias": {r[0]: r[1] for r in categorias},
+            "etiquetas": {r[0]: r[1] for r in etiquetas},
+        }
+
+
+# ---------------------------------------------------------
+#  AUTH LOCAL
+# ---------------------------------------------------------
+@dataclass
+class UsuarioLocal:
+    id: str
+    email: str
+    user_metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class RespuestaAuth:
+    user: Optional[UsuarioLocal]
+
+
+def _hash_password(password: str, salt: str) -> str:
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), bytes.fromhex(salt), PBKDF2_ITERACIONES).hex()
+
+
+# El cliente se comparte entre todas las sesiones de Streamlit, así que el
+# usuario logueado no puede ser un atributo suyo: es de quien llama. Dentro
+# de un rerun se guarda en st.session_state; fuera de Streamlit (scripts,
+# procesos en lote), por hilo.
+CLAVE_SESION_AUTH = "sqlite_auth_usuario"
+
+
+class AuthLocal:
+    """Usuarios en la tabla `usuarios`, con contraseña PBKDF2."""
+
+    def __init__(self, cliente: "ClienteSQLite"):
+        self._cliente = cliente
+        self._por_hilo = threading.local()
+
+    def _sesion(self) -> MutableMapping[str, Any]:
+        if get_script_run_ctx(suppress_warning=True) is not None:
+            return st.session_state
+        if not hasattr(self._por_hilo, "sesion"):
+            self._por_hilo.sesion = {}
+        return self._por_hilo.sesion
+
+    @property
+    def _usuario(self) -> Optional[UsuarioLocal]:
+        return self._sesion().get(CLAVE_SESION_AUTH)
+
+    def _leer(self, email: str) -> Optional[sqlite3.Row]:
+        return self._cliente.conn.execute(
+            "select * from usuarios where email = ?", (email.strip().lower(),)
+        ).fetchone()
+
+    def sign_up(self, credenciales: Dict[str, str]) -> RespuestaAuth:
+        email = credenciales["email"].strip().lower()
+        salt = secrets.token_hex(16)
+        usuario = UsuarioLocal(str(uuid.uuid4()), email)
+        with self._cliente.lock, self._cliente.conn as conn:
+            if self._leer(email) is not None:
+                raise ValueError("El usuario ya existe.")
+            conn.execute(
+                "insert into usuarios (id, email, password_hash, created_at) values (?, ?, ?, ?)",
+                (usuario.id, email, f"{salt}${_hash_password(credenciales['password'], salt)}", _ahora()),
+            )
+        return RespuestaAuth(usuario)
+
+    def sign_in_with_password(self, credenciales: Dict[str, str]) -> RespuestaAuth:
+        with self._cliente.lock:
+            row = self._leer(credenciales["email"])
+        if row is not None:
+            salt, esperado = row["password_hash"].split("$", 1)
+            if secrets.compare_digest(_hash_password(credenciales["password"], salt), esperado):
+                usuario = UsuarioLocal(row["id"], row["email"], json.loads(row["user_metadata"]))
+                self._sesion()[CLAVE_SESION_AUTH] = usuario
+                return RespuestaAuth(usuario)
+        raise ValueError("Credenciales incorrectas.")
+
+    def update_user(self, atributos: Dict[str, Any]) -> RespuestaAuth:
+        usuario = self._usuario
+        if usuario is None:
+            raise ValueError("No hay sesión iniciada.")
+        usuario.user_metadata.update(atributos.get("data") or {})
+        with self._cliente.lock, self._cliente.conn as conn:
+            conn.execute(
+                "update usuarios set user_metadata = ? where id = ?",
+                (json.dumps(usuario.user_metadata), usuario.id),
+            )
+        return RespuestaAuth(usuario)
+
+    def sign_out(self) -> None:
+        self._sesion().pop(CLAVE_SESION_AUTH, None)
+
+
+# ---------------------------------------------------------
+#  CLIENTE
+# ---------------------------------------------------------
+class ClienteSQLite:
+    """
+    Cliente con la interfaz de supabase.Client (el subconjunto que usa la
+    app) sobre un archivo SQLite. Una sola conexión compartida entre hilos,
+    serializada con un lock: las consultas de todas las sesiones y hilos se
+    ejecutan de a una.
+    """
+
+    def __init__(self, ruta: str):
+        self.conn = sqlite3.connect(ruta, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.RLock()
+        if ruta != ":memory:":
+            self.conn.execute("pragma journal_mode = wal")
+        self.conn.execute("pragma synchronous = normal")
+        self.conn.executescript(SCHEMA)
+        self._migrar()
+        self.conn.isolation_level = "DEFERRED"
+        self.auth = AuthLocal(self)
+
+    def _migrar(self) -> None:
+        for tabla, columnas in COLUMNAS_NUEVAS.items():
+            existentes = {r["name"] for r in self.conn.execute(f"pragma table_info({tabla})")}
+            for columna, tipo in columnas.items():
+                if columna not in existentes:
+                    self.conn.execute(f"alter table {tabla} add column {columna} {tipo}")
+        self.conn.executescript(INDICES)
+
+    def table(self, nombre: str) -> ConsultaSQLite:
+        return ConsultaSQLite(self, nombre)
+
+    def rpc(self, funcion: str, params: Optional[Dict[str, Any]] = None) -> RpcSQLite:
+        return RpcSQLite(self, funcion, params)
+
+    def completar(self, tabla: str, fila: Dict[str, Any], al_insertar: bool) -> Dict[str, Any]:
+        """Columnas que en Postgres mantienen triggers y columnas generadas."""
+        if tabla != "movimientos":
+            return fila
+        ahora = _ahora()
+        fila["updated_at"] = ahora
+        if al_insertar:
+            fila.setdefault("created_at", ahora)
+        if al_insertar or "descripcion" in fila:
+            fila["descripcion_busqueda"] = _normalizar_busqueda(fila.get("descripcion"))
+        return fila
+
+
+# ---------------------------------------------------------
+#  CLIENTE ASYNC
+# ---------------------------------------------------------
+class ConsultaSQLiteAsync:
+    """Consulta o RPC de ClienteSQLite cuyo execute() se espera con await."""
+
+    def __init__(self, consulta: Any):
+        self._consulta = consulta
+
+    def __getattr__(self, nombre: str) -> Any:
+        atributo = getattr(self._consulta, nombre)
+        if not callable(atributo):
+            return atributo
+
+        def encadenar(*args, **kwargs):
+            resultado = atributo(*args, **kwargs)
+            return ConsultaSQLiteAsync(resultado) if hasattr(resultado, "execute") else resultado
+        return encadenar
+
+    async def execute(self) -> RespuestaSQLite:
+        return await asyncio.to_thread(self._consulta.execute)
+
+
+class AuthLocalAsync:
+    """AuthLocal con sus métodos como corrutinas."""
+
+    def __init__(self, auth: AuthLocal):
+        self._auth = auth
+
+    def __getattr__(self, nombre: str) -> Any:
+        metodo = getattr(self._auth, nombre)
+
+        async def llamar(*args, **kwargs):
+            return await asyncio.to_thread(metodo, *args, **kwargs)
+        return llamar
+
+
+class ClienteSQLiteAsync:
+    """
+    Interfaz de supabase.AsyncClient sobre un ClienteSQLite: la conexión (y
+    la sesión de auth) son las del cliente síncrono, y cada execute() corre
+    en un hilo del executor del event loop.
+    """
+
+    def __init__(self, cliente: ClienteSQLite):
+        self._cliente = cliente
+        self.auth = AuthLocalAsync(cliente.auth)
+
+    def table(self, nombre: str) -> ConsultaSQLiteAsync:
+        return ConsultaSQLiteAsync(self._cliente.table(nombre))
+
+    def rpc(self, funcion: str, params: Optional[Dict[str, Any]] = None) -> ConsultaSQLiteAsync:
+        return ConsultaSQLiteAsync(self._cliente.rpc(funcion, params))
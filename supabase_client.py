@@ -1,32 +1,114 @@
+import asyncio
 import os
+import weakref
+from typing import Optional
+
 import streamlit as st
+import httpx
+from postgrest import AsyncPostgrestClient
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_TIMEOUT
 from supabase import create_client, Client
 
+from sqlite_client import ClienteSQLite, ClienteSQLiteAsync
+from consultas import ClienteContado
+
 # ---------------------------------------------------------
 #  CARGA DE VARIABLES DE ENTORNO
 # ---------------------------------------------------------
+# FINANZAS_BACKEND elige dónde se guardan los datos:
+#   supabase (default) -> Supabase, con SUPABASE_URL y SUPABASE_ANON_KEY
+#   sqlite             -> archivo local FINANZAS_SQLITE_PATH (ver sqlite_client.py)
+BACKEND_SUPABASE = "supabase"
+BACKEND_SQLITE = "sqlite"
+
+BACKEND = (os.getenv("FINANZAS_BACKEND") or BACKEND_SUPABASE).strip().lower()
+SQLITE_PATH = (os.getenv("FINANZAS_SQLITE_PATH") or "finanzas.sqlite3").strip()
 
 SUPABASE_URL = (os.getenv("SUPABASE_URL") or "").strip()
 SUPABASE_ANON_KEY = (os.getenv("SUPABASE_ANON_KEY") or "").strip()
 
-if not SUPABASE_URL or not SUPABASE_ANON_KEY:
+if BACKEND not in (BACKEND_SUPABASE, BACKEND_SQLITE):
+    raise RuntimeError(
+        f"FINANZAS_BACKEND inválido: {BACKEND!r} (usar {BACKEND_SUPABASE!r} o {BACKEND_SQLITE!r})."
+    )
+
+if BACKEND == BACKEND_SUPABASE and (not SUPABASE_URL or not SUPABASE_ANON_KEY):
     raise RuntimeError(
         "Faltan SUPABASE_URL o SUPABASE_ANON_KEY en las variables de entorno."
     )
 
+@st.cache_resource(ttl=None, show_spinner=False)
+def _abrir_sqlite() -> ClienteSQLite:
+    """Conexión SQLite única, compartida por el cliente síncrono y el async."""
+    try:
+        return ClienteSQLite(SQLITE_PATH)
+    except Exception as e:
+        raise RuntimeError(f"Error al abrir la base SQLite {SQLITE_PATH}: {e}")
+
+
 # ---------------------------------------------------------
 #  OBTENER CLIENTE SUPABASE (CACHEADO POR STREAMLIT)
 # ---------------------------------------------------------
 # Usamos st.cache_resource para reutilizar el cliente entre reruns
-# y evitar recrearlo en cada interacción.
-@st.cache_resource(ttl=None)
+# y evitar recrearlo en cada interacción. El cliente va envuelto en
+# ClienteContado, que anota cada round trip en el rerun en curso.
+@st.cache_resource(ttl=None, show_spinner=False)
 def get_supabase_client() -> Client:
     """
-    Devuelve una instancia cacheada del cliente de Supabase.
+    Devuelve una instancia cacheada del cliente de Supabase, o del cliente
+    SQLite con la misma interfaz si FINANZAS_BACKEND=sqlite.
     Si falla la creación, lanza un error claro.
     """
+    if BACKEND == BACKEND_SQLITE:
+        return ClienteContado(_abrir_sqlite())
+
     try:
         client = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
     except Exception as e:
         raise RuntimeError(f"Error al inicializar Supabase: {e}")
-    return client
\ No newline at end of file
+    return ClienteContado(client)
+
+
+# ---------------------------------------------------------
+#  OBTENER CLIENTE ASYNC (POR TOKEN, CONEXIONES POR EVENT LOOP)
+# ---------------------------------------------------------
+# Las conexiones httpx quedan atadas al event loop que las abrió, así que se
+# comparte un pool por loop (en la app, el del runner de db_async.py). Cada
+# llamada arma sobre ese pool un cliente PostgREST liviano con sus propios
+# headers: el token de quien consulta viaja en cada request y nunca se
+# guarda en un objeto compartido, para que las políticas RLS vean al
+# usuario que corresponde aunque haya varias sesiones a la vez.
+_conexiones_async: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def _conexiones_del_loop() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    conexiones = _conexiones_async.get(loop)
+    if conexiones is None:
+        conexiones = httpx.AsyncClient(follow_redirects=True, http2=True, timeout=DEFAULT_POSTGREST_CLIENT_TIMEOUT)
+        _conexiones_async[loop] = conexiones
+    return conexiones
+
+
+async def get_supabase_client_async(token: Optional[str] = None) -> ClienteContado:
+    """
+    Devuelve un cliente async que consulta con `token` (el access token del
+    usuario; sin token, como anónimo), o ClienteSQLiteAsync sobre la misma
+    base si FINANZAS_BACKEND=sqlite (que no usa token). Va envuelto en
+    ClienteContado. Si falla la creación, lanza un error claro.
+    """
+    if BACKEND == BACKEND_SQLITE:
+        return ClienteContado(ClienteSQLiteAsync(_abrir_sqlite()))
+
+    try:
+        cliente = AsyncPostgrestClient(
+            f"{SUPABASE_URL}/rest/v1",
+            headers={
+                "apikey": SUPABASE_ANON_KEY,
+                "Authorization": f"Bearer {token or SUPABASE_ANON_KEY}",
+            },
+            http_client=_conexiones_del_loop(),
+        )
+    except Exception as e:
+        raise RuntimeError(f"Error al inicializar Supabase (async): {e}")
+    return ClienteContado(cliente)
@@ -0,0 +1,21 @@
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+# Los módulos de la app leen el backend al importarse: las pruebas usan
+# siempre una base SQLite nueva (ver sqlite_client.py)
+os.environ["FINANZAS_BACKEND"] = "sqlite"
+_DIRECTORIO = tempfile.mkdtemp(prefix="finanzas-tests-")
+os.environ["FINANZAS_SQLITE_PATH"] = os.path.join(_DIRECTORIO, "finanzas.sqlite3")
+os.environ["FINANZAS_MODELOS_DIR"] = os.path.join(_DIRECTORIO, "modelos_etiquetas")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def usuario_id() -> str:
+    """Un usuario nuevo por prueba: la base es compartida, los datos no."""
+    return str(uuid.uuid4())
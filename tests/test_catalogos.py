@@ -0,0 +1,42 @@
+import db
+from catalogos import SUGERIDOS, catalogos_provisionados, obtener_catalog_store, provisionar_catalogos
+
+
+def test_provision_por_usuario_id(usuario_id):
+    assert not catalogos_provisionados(usuario_id)
+    assert provisionar_catalogos(usuario_id)
+    assert catalogos_provisionados(usuario_id)
+
+    store = obtener_catalog_store(usuario_id)
+    for catalogo, sugeridos in SUGERIDOS.items():
+        assert store.obtener(catalogo) == sorted(sugeridos)
+
+
+def test_provision_es_idempotente(usuario_id):
+    assert provisionar_catalogos(usuario_id)
+    assert provisionar_catalogos(usuario_id)
+    store = obtener_catalog_store(usuario_id)
+    assert len(store.obtener("cuentas")) == len(SUGERIDOS["cuentas"])
+
+
+def test_otro_usuario_no_queda_provisionado(usuario_id):
+    assert provisionar_catalogos(usuario_id)
+    assert not catalogos_provisionados(usuario_id[::-1])
+
+
+def test_uso_catalogos_cuenta_activos_y_agrupa_sin_categoria(usuario_id):
+    rows = [
+        {"fecha": "2024-01-01", "tipo": "Gasto", "monto": 1, "categoria": "Comida", "etiquetas": '["super", "comida"]'},
+        {"fecha": "2024-01-02", "tipo": "Gasto", "monto": 1, "categoria": "Comida", "etiquetas": '["super"]'},
+        {"fecha": "2024-01-03", "tipo": "Gasto", "monto": 1, "categoria": "", "etiquetas": "[]"},
+        {"fecha": "2024-01-04", "tipo": "Gasto", "monto": 1, "categoria": None, "etiquetas": '["ocio"]'},
+        {"fecha": "2024-01-05", "tipo": "Gasto", "monto": 1, "categoria": "Ocio", "etiquetas": '["ocio"]'},
+    ]
+    assert db.insertar_movimientos_bulk(usuario_id, rows)["insertados"] == len(rows)
+    borrado = next(f for f in db.obtener_movimientos(usuario_id) if f["categoria"] == "Ocio")
+    assert db.eliminar_movimiento_logico(usuario_id, borrado["id"])
+
+    assert db.obtener_uso_catalogos(usuario_id) == {
+        "categorias": {"Comida": 2, "Sin categoría": 2},
+        "etiquetas": {"super": 2, "comida": 1, "ocio": 1},
+    }
@@ -0,0 +1,138 @@
+import json
+import random
+
+import numpy as np
+import pytest
+
+import db
+import etiquetas_inteligentes
+import models
+from etiquetas_inteligentes import (
+    actualizar_modelo,
+    compilar_modelo,
+    entrenar_modelo,
+    predecir_etiquetas,
+    predecir_etiquetas_batch,
+    puntuar_batch,
+)
+
+PALABRAS = ["super", "coto", "nafta", "ypf", "farmacia", "alquiler", "uber", "cine", "luz", "gas", "pago", "de"]
+ETIQUETAS = ["comida", "supermercado", "transporte", "combustible", "salud", "servicios", "ocio"]
+
+
+def _movimiento(rnd):
+    return {
+        "descripcion": " ".join(rnd.choices(PALABRAS, k=rnd.randint(0, 5))).upper() + rnd.choice(["", ".", " $"]),
+        "etiquetas": rnd.sample(ETIQUETAS, rnd.randint(0, 3)),
+    }
+
+
+@pytest.mark.parametrize("semilla", range(5))
+def test_actualizar_equivale_a_reentrenar(semilla):
+    rnd = random.Random(semilla)
+    viejos = [_movimiento(rnd) for _ in range(200)]
+    modelo = entrenar_modelo(viejos)
+    copia = json.loads(json.dumps(modelo))
+
+    # Se borran algunos, se editan otros y llegan nuevos
+    borrados = set(rnd.sample(range(len(viejos)), 30))
+    editados = {i: _movimiento(rnd) for i in rnd.sample(sorted(set(range(len(viejos))) - borrados), 30)}
+    nuevos = [_movimiento(rnd) for _ in range(40)]
+
+    actuales = [editados.get(i, m) for i, m in enumerate(viejos) if i not in borrados] + nuevos
+    quitar = [viejos[i] for i in sorted(borrados | set(editados))]
+    agregar = list(editados.values()) + nuevos
+
+    assert actualizar_modelo(modelo, quitar, agregar) == entrenar_modelo(actuales)
+    assert modelo == copia
+
+
+def test_quitar_todo_deja_el_modelo_vacio():
+    rnd = random.Random(0)
+    movimientos = [_movimiento(rnd) for _ in range(50)]
+    assert actualizar_modelo(entrenar_modelo(movimientos), movimientos, []) == entrenar_modelo([])
+
+
+def test_modelo_del_usuario_sigue_las_escrituras(usuario_id):
+    rnd = random.Random(1)
+    rows = [
+        {"fecha": "2024-03-01", "tipo": "Gasto", "monto": 10, "cuenta": "Banco", "categoria": rnd.choice(["Comida", "", "Ocio"]), **m}
+        for m in (_movimiento(rnd) for _ in range(60))
+    ]
+    for row in rows:
+        row["etiquetas"] = json.dumps(row["etiquetas"])
+    assert db.insertar_movimientos_bulk(usuario_id, rows)["insertados"] == len(rows)
+
+    def _reentrenados():
+        filas = [f for f in db.obtener_movimientos_modificados(usuario_id, None) if not models._parse_deleted(f.get("deleted"))]
+        return (
+            entrenar_modelo([models._mov_modelo(f) for f in filas]),
+            entrenar_modelo([models._mov_categoria(f) for f in filas]),
+        )
+
+    assert (models.modelo_etiquetas(usuario_id), models.modelo_categorias(usuario_id)) == _reentrenados()
+
+    filas = db.obtener_movimientos(usuario_id)
+    for fila in filas[:5]:
+        assert db.eliminar_movimiento_logico(usuario_id, fila["id"])
+    for fila in filas[5:10]:
+        nuevo = _movimiento(rnd)
+        assert db.actualizar_movimiento(
+            usuario_id, fila["id"], fila["fecha"], "Ocio", fila["tipo"], nuevo["descripcion"],
+            fila["monto"], fila["cuenta"], json.dumps(nuevo["etiquetas"]),
+        )
+    assert db.insertar_movimiento(
+        usuario_id, "2024-03-02", "Comida", "Gasto", "super coto", 5, "Banco", json.dumps(["supermercado"])
+    )
+
+    estado = models.sincronizar_movimientos(usuario_id)
+    assert estado.modelos and estado.modelos_pendientes["etiquetas"]
+    assert (models.modelo_etiquetas(usuario_id), models.modelo_categorias(usuario_id)) == _reentrenados()
+
+
+def _equivalentes(compilado, descripciones, obtenidas, esperadas):
+    """
+    Mismas sugerencias, salvo el orden entre etiquetas empatadas: con
+    puntajes iguales, predecir_etiquetas desempata por el error de redondeo
+    de su suma (distinto del de la versión vectorizada).
+    """
+    scores = np.round(puntuar_batch(compilado, descripciones), 9)
+    columna = {e: j for j, e in enumerate(compilado.etiquetas)}
+    desempates = 0
+    for fila, obtenida, esperada in zip(scores, obtenidas, esperadas):
+        assert len(obtenida) == len(esperada)
+        assert [fila[columna[e]] for e in obtenida] == [fila[columna[e]] for e in esperada]
+        desempates += obtenida != esperada
+    assert desempates <= len(descripciones) // 10
+
+
+@pytest.mark.parametrize("semilla", range(5))
+@pytest.mark.parametrize("top_n", [1, 3, len(ETIQUETAS)])
+def test_prediccion_batch_igual_a_la_de_a_una(semilla, top_n, monkeypatch):
+    # Lotes chicos para cubrir el corte entre lotes
+    monkeypatch.setattr(etiquetas_inteligentes, "PREDICCION_LOTE", 7)
+    rnd = random.Random(semilla)
+    modelo = entrenar_modelo([_movimiento(rnd) for _ in range(150)])
+    descripciones = [_movimiento(rnd)["descripcion"] for _ in range(60)] + [
+        "", None, "palabra desconocida", "super super super coto", "¡¡NAFTA!! ypf", "cine " * 40,
+    ]
+
+    compilado = compilar_modelo(modelo)
+    esperadas = [predecir_etiquetas(modelo, d or "", top_n) for d in descripciones]
+    _equivalentes(compilado, descripciones, predecir_etiquetas_batch(compilado, descripciones, top_n), esperadas)
+    _equivalentes(compilado, descripciones, predecir_etiquetas_batch(modelo, descripciones, top_n), esperadas)
+    _equivalentes(compilado, descripciones, [predecir_etiquetas(compilado, d or "", top_n) for d in descripciones], esperadas)
+
+
+def test_prediccion_con_modelo_vacio():
+    assert predecir_etiquetas_batch(entrenar_modelo([]), ["super coto", ""]) == [[], []]
+    assert predecir_etiquetas_batch(entrenar_modelo([{"descripcion": "x", "etiquetas": ["a"]}]), []) == []
+
+
+def test_modelo_compilado_es_ralo():
+    rnd = random.Random(0)
+    modelo = entrenar_modelo([_movimiento(rnd) for _ in range(300)])
+    compilado = compilar_modelo(modelo)
+    entradas = sum(len(palabras) for palabras in modelo["palabra_por_etiqueta"].values())
+    assert compilado.log_freq.shape == compilado.columnas.shape == (entradas,)
+    assert compilado.punteros.shape == (len(compilado.vocabulario) + 1,)
@@ -0,0 +1,106 @@
+import math
+
+import pandas as pd
+import pytest
+
+from importador import normalizar_movimientos, parsear_montos
+
+
+@pytest.mark.parametrize(
+    "texto, esperado",
+    [
+        # decimal simple
+        ("1234.56", 1234.56),
+        ("12.5", 12.5),
+        ("-80", -80.0),
+        # formato argentino con coma decimal
+        ("1.234,56", 1234.56),
+        ("12.500,00", 12500.0),
+        ("0,5", 0.5),
+        # puntos agrupando de a tres dígitos: miles sin centavos
+        ("12.500", 12500.0),
+        ("1.234.567", 1234567.0),
+        ("-1.500", -1500.0),
+        # la ambigüedad documentada: "1.234" son mil doscientos treinta y cuatro
+        ("1.234", 1234.0),
+        ("1,234", 1.234),
+        # símbolos y espacios
+        ("$ 1.500", 1500.0),
+        (" 99 ", 99.0),
+    ],
+)
+def test_parsear_montos(texto, esperado):
+    assert parsear_montos(pd.Series([texto]))[0] == pytest.approx(esperado)
+
+
+@pytest.mark.parametrize("texto", ["", "abc", "1.2.3,4,5", "12-5"])
+def test_parsear_montos_invalidos(texto):
+    assert math.isnan(parsear_montos(pd.Series([texto]))[0])
+
+
+def _fila(**campos):
+    fila = {
+        "fecha": "2024-03-01",
+        "categoria": "Comida",
+        "tipo": "Gasto",
+        "descripcion": "super",
+        "monto": "100",
+        "cuenta": "Efectivo",
+        "etiquetas": "",
+    }
+    fila.update(campos)
+    return fila
+
+
+@pytest.mark.parametrize(
+    "campos, motivo",
+    [
+        ({"fecha": ""}, "fecha vacía"),
+        ({"fecha": "31-12-2024"}, "fecha inválida: 31-12-2024"),
+        ({"monto": ""}, "monto vacío"),
+        ({"monto": "cien"}, "monto inválido: cien"),
+        ({"tipo": "transferencia"}, "tipo inválido: transferencia"),
+        ({"tipo": ""}, "tipo inválido: "),
+        ({"fecha": "", "monto": "x", "tipo": "otro"}, "fecha vacía; monto inválido: x; tipo inválido: otro"),
+    ],
+)
+def test_normalizar_movimientos_motivos(campos, motivo):
+    df = pd.DataFrame([_fila(), _fila(**campos)])
+
+    limpio, errores = normalizar_movimientos(df, fila_inicial=10)
+
+    assert limpio["fila"].tolist() == [10]
+    assert errores.to_dict("records") == [{"fila": 11, "error": motivo}]
+
+
+def test_normalizar_movimientos_filas_validas():
+    df = pd.DataFrame([
+        _fila(fecha="15/02/2024", tipo=" INGRESO ", monto="12.500", categoria="", cuenta="", etiquetas="a, b,,c"),
+        _fila(monto="1.234,56", descripcion="  kiosco  "),
+    ])
+
+    limpio, errores = normalizar_movimientos(df)
+
+    assert errores.empty
+    assert limpio.to_dict("records") == [
+        {
+            "fila": 0,
+            "fecha": "2024-02-15",
+            "categoria": "Sin categoría",
+            "tipo": "ingreso",
+            "descripcion": "super",
+            "monto": 12500.0,
+            "cuenta": "Sin cuenta",
+            "etiquetas": ["a", "b", "c"],
+        },
+        {
+            "fila": 1,
+            "fecha": "2024-03-01",
+            "categoria": "Comida",
+            "tipo": "gasto",
+            "descripcion": "kiosco",
+            "monto": 1234.56,
+            "cuenta": "Efectivo",
+            "etiquetas": [],
+        },
+    ]
@@ -0,0 +1,75 @@
+import pytest
+
+import db
+
+
+@pytest.fixture
+def movimientos(usuario_id):
+    """47 movimientos en solo 5 fechas (muchos empates en fecha), uno borrado."""
+    rows = [
+        {"fecha": f"2024-05-0{1 + i % 5}", "tipo": "Gasto", "monto": i, "cuenta": "Banco" if i % 3 else "Efectivo"}
+        for i in range(48)
+    ]
+    assert db.insertar_movimientos_bulk(usuario_id, rows)["insertados"] == len(rows)
+    filas = db.obtener_movimientos(usuario_id)
+    assert db.eliminar_movimiento_logico(usuario_id, filas[10]["id"])
+    return db.obtener_movimientos(usuario_id)
+
+
+def _claves(filas):
+    return [(f["fecha"], f["id"]) for f in filas]
+
+
+def _recorrer(usuario_id, limit, **filtros):
+    """Todas las páginas hacia adelante; devuelve la lista de páginas."""
+    paginas = [db.obtener_movimientos_keyset(usuario_id, limit, **filtros)]
+    while paginas[-1]["siguiente"]:
+        paginas.append(db.obtener_movimientos_keyset(usuario_id, limit, paginas[-1]["siguiente"], **filtros))
+    return paginas
+
+
+@pytest.mark.parametrize("limit", [1, 7, 10, 46, 100])
+def test_hacia_adelante_no_saltea_ni_repite(usuario_id, movimientos, limit):
+    paginas = _recorrer(usuario_id, limit)
+
+    vistas = [clave for pagina in paginas for clave in _claves(pagina["data"])]
+    assert vistas == sorted(_claves(movimientos), reverse=True)
+    assert all(len(p["data"]) == limit for p in paginas[:-1])
+    assert paginas[0]["anterior"] is None
+    assert paginas[-1]["siguiente"] is None
+
+
+@pytest.mark.parametrize("limit", [1, 7, 10])
+def test_hacia_atras_vuelve_por_las_mismas_paginas(usuario_id, movimientos, limit):
+    paginas = _recorrer(usuario_id, limit)
+
+    pagina = paginas[-1]
+    for esperada in reversed(paginas[:-1]):
+        pagina = db.obtener_movimientos_keyset(usuario_id, limit, pagina["anterior"])
+        assert _claves(pagina["data"]) == _claves(esperada["data"])
+    assert pagina["anterior"] is None
+
+
+def test_empates_en_fecha_se_ordenan_por_id(usuario_id, movimientos):
+    paginas = _recorrer(usuario_id, 4)
+
+    # Con 5 fechas y páginas de 4, casi todos los cortes caen dentro de una misma fecha
+    cortes = [(a["data"][-1], b["data"][0]) for a, b in zip(paginas, paginas[1:])]
+    assert any(ultima["fecha"] == primera["fecha"] for ultima, primera in cortes)
+    for ultima, primera in cortes:
+        assert (ultima["fecha"], ultima["id"]) > (primera["fecha"], primera["id"])
+
+
+def test_con_filtros(usuario_id, movimientos):
+    paginas = _recorrer(usuario_id, 3, cuenta="Efectivo", fecha_desde="2024-05-02", fecha_hasta="2024-05-04")
+
+    esperadas = [f for f in movimientos if f["cuenta"] == "Efectivo" and "2024-05-02" <= f["fecha"] <= "2024-05-04"]
+    assert [c for p in paginas for c in _claves(p["data"])] == sorted(_claves(esperadas), reverse=True)
+
+
+def test_sin_filas(usuario_id):
+    assert db.obtener_movimientos_keyset(usuario_id, 10) == {"data": [], "siguiente": None, "anterior": None}
+
+
+def test_cursor_invalido_devuelve_none(usuario_id, movimientos):
+    assert db.obtener_movimientos_keyset(usuario_id, 10, "no-es-un-cursor") is None
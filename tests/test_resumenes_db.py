@@ -0,0 +1,116 @@
+import random
+from collections import defaultdict
+
+import pytest
+
+import db
+
+
+def _ledger(usuario_id, n=300, semilla=7):
+    """Inserta `n` movimientos al azar en 2023-2024 y devuelve las filas insertadas."""
+    azar = random.Random(semilla)
+    rows = [
+        {
+            "fecha": f"{azar.choice([2023, 2024])}-{azar.randint(1, 12):02d}-{azar.randint(1, 28):02d}",
+            "categoria": azar.choice(["Comida", "Transporte", "", None]),
+            "tipo": azar.choice(["Ingreso", "Gasto", "gasto"]),
+            "descripcion": "mov",
+            "monto": round(azar.uniform(1, 500), 2),
+            "cuenta": azar.choice(["Efectivo", "Banco", None]),
+        }
+        for _ in range(n)
+    ]
+    reporte = db.insertar_movimientos_bulk(usuario_id, rows, chunk_size=97)
+    assert reporte["insertados"] == n
+    return db.obtener_movimientos(usuario_id)
+
+
+def _totales(filas, clave):
+    """Ingresos, gastos, balance y cantidad por `clave(fila)`, calculados en Python."""
+    totales = defaultdict(lambda: [0.0, 0.0, 0.0, 0])
+    for f in filas:
+        t = totales[clave(f)]
+        ingreso = f["tipo"].lower() == "ingreso"
+        t[0] += f["monto"] if ingreso else 0
+        t[1] += f["monto"] if f["tipo"].lower() == "gasto" else 0
+        t[2] += f["monto"] if ingreso else -f["monto"]
+        t[3] += 1
+    return totales
+
+
+def _por_mes(f):
+    return (f["mes"] if "mes" in f else f["fecha"][:7], f["categoria"], f["cuenta"])
+
+
+def _por_dia(f):
+    return f["fecha"]
+
+
+def _comparar(resumen, esperado, clave):
+    assert len(resumen) == len(esperado)
+    for fila in resumen:
+        ingresos, gastos, balance, cantidad = esperado[clave(fila)]
+        assert fila["ingresos"] == pytest.approx(ingresos)
+        assert fila["gastos"] == pytest.approx(gastos)
+        assert fila["balance"] == pytest.approx(balance)
+        assert fila["cantidad"] == cantidad
+
+
+def _en_rango(filas, desde=None, hasta=None):
+    return [f for f in filas if (desde is None or f["fecha"] >= desde) and (hasta is None or f["fecha"] <= hasta)]
+
+
+@pytest.mark.parametrize(
+    "desde, hasta",
+    [(None, None), ("2024-01-01", None), (None, "2023-06-30"), ("2023-03-15", "2024-02-10")],
+)
+def test_resumen_movimientos_coincide_con_las_filas(usuario_id, desde, hasta):
+    filas = _ledger(usuario_id)
+    borrado = filas[0]
+    assert db.eliminar_movimiento_logico(usuario_id, borrado["id"])
+    activas = _en_rango([f for f in filas if f["id"] != borrado["id"]], desde, hasta)
+
+    resumen = db.obtener_resumen_movimientos(usuario_id, desde, hasta)
+
+    _comparar(resumen, _totales(activas, _por_mes), _por_mes)
+    assert all(f["anio"] == int(f["mes"][:4]) for f in resumen)
+    assert sum(f["cantidad"] for f in resumen) == len(activas)
+
+
+@pytest.mark.parametrize(
+    "desde, hasta",
+    [(None, None), ("2024-01-01", None), (None, "2023-06-30"), ("2023-03-15", "2024-02-10")],
+)
+def test_resumen_diario_coincide_con_las_filas(usuario_id, desde, hasta):
+    filas = _en_rango(_ledger(usuario_id), desde, hasta)
+
+    resumen = db.obtener_resumen_diario(usuario_id, desde, hasta)
+
+    _comparar(resumen, _totales(filas, _por_dia), _por_dia)
+    assert [f["fecha"] for f in resumen] == sorted(f["fecha"] for f in resumen)
+
+
+def test_resumen_sin_valores_usa_los_mismos_que_al_insertar(usuario_id):
+    _ledger(usuario_id, n=50)
+
+    resumen = db.obtener_resumen_movimientos(usuario_id)
+
+    assert {f["categoria"] for f in resumen} <= {"Comida", "Transporte", "Sin categoría"}
+    assert {f["cuenta"] for f in resumen} <= {"Efectivo", "Banco", "Sin cuenta"}
+
+
+def test_resumen_diario_trae_todas_las_paginas(usuario_id, monkeypatch):
+    monkeypatch.setattr(db, "SYNC_PAGE_SIZE", 10)
+    filas = _ledger(usuario_id, n=200)
+
+    resumen = db.obtener_resumen_diario(usuario_id)
+
+    assert len(resumen) == len({f["fecha"] for f in filas}) > 10
+    assert sum(f["cantidad"] for f in resumen) == len(filas)
+
+
+def test_resumen_de_otro_usuario_no_se_mezcla(usuario_id):
+    _ledger(usuario_id, n=30)
+
+    assert db.obtener_resumen_movimientos("otro-usuario") == []
+    assert db.obtener_resumen_diario("otro-usuario") == []
@@ -0,0 +1,122 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+import streamlit as st
+from postgrest.exceptions import APIError
+
+import auth
+import db_async
+from auth import SesionInvalida
+
+
+def _sesion(access_token, expires_at, refresh_token="r1"):
+    return SimpleNamespace(access_token=access_token, refresh_token=refresh_token, expires_at=expires_at)
+
+
+class _AuthFalso:
+    def __init__(self, falla=False):
+        self.falla = falla
+        self.renovaciones = []
+
+    def refresh_session(self, refresh_token):
+        self.renovaciones.append(refresh_token)
+        if self.falla:
+            raise RuntimeError("Invalid Refresh Token")
+        return SimpleNamespace(session=_sesion("t2", time.time() + 3600, "r2"))
+
+
+@pytest.fixture
+def sesion(monkeypatch):
+    """Una sesión de Streamlit con su usuario y un cliente de auth falso."""
+    estado = {}
+    auth_falso = _AuthFalso()
+    monkeypatch.setattr(st, "session_state", estado)
+    monkeypatch.setattr(auth, "get_supabase_client", lambda: SimpleNamespace(auth=auth_falso))
+    return estado, auth_falso
+
+
+def _login(estado, expires_at, refresh_token="r1"):
+    estado["user"] = {"id": "u", "email": "u@local", **auth._tokens(_sesion("t1", expires_at, refresh_token))}
+
+
+def test_token_vigente_no_se_renueva(sesion):
+    estado, auth_falso = sesion
+    _login(estado, time.time() + 3600)
+    assert db_async.token_de_la_sesion() == "t1"
+    assert auth_falso.renovaciones == []
+
+
+@pytest.mark.parametrize("restante", [-10, auth.MARGEN_RENOVACION_TOKEN - 5])
+def test_token_vencido_o_por_vencer_se_renueva(sesion, restante):
+    estado, auth_falso = sesion
+    _login(estado, time.time() + restante)
+    assert db_async.token_de_la_sesion() == "t2"
+    assert estado["user"]["refresh_token"] == "r2"
+    assert auth_falso.renovaciones == ["r1"]
+    # El nuevo se guarda en la sesión: no se vuelve a renovar
+    assert db_async.token_de_la_sesion() == "t2"
+    assert auth_falso.renovaciones == ["r1"]
+
+
+def test_sin_refresh_token_o_si_falla_la_renovacion_lanza(sesion):
+    estado, auth_falso = sesion
+    _login(estado, time.time() - 10, refresh_token=None)
+    with pytest.raises(SesionInvalida, match="venció"):
+        db_async.token_de_la_sesion()
+
+    _login(estado, time.time() - 10)
+    auth_falso.falla = True
+    with pytest.raises(SesionInvalida, match="Invalid Refresh Token"):
+        db_async.token_de_la_sesion()
+
+
+def test_sin_sesion_o_sin_token_devuelve_none(sesion):
+    estado, _ = sesion
+    assert db_async.token_de_la_sesion() is None
+    estado["user"] = {"id": "u", "email": "u@local", **auth._tokens(None)}
+    assert db_async.token_de_la_sesion() is None
+
+
+class _ConsultaRechazada:
+    """Cualquier cadena de builder cuyo execute() falla como un JWT vencido."""
+
+    def __init__(self, error):
+        self.error = error
+
+    def __getattr__(self, nombre):
+        return lambda *args, **kwargs: self
+
+    async def execute(self):
+        raise self.error
+
+
+JWT_VENCIDO = APIError({"code": "PGRST303", "message": "JWT expired", "hint": None, "details": None})
+
+
+@pytest.mark.parametrize(
+    "llamada",
+    [
+        lambda: db_async.obtener_movimientos("u", token="t"),
+        lambda: db_async.obtener_movimientos_modificados("u", token="t"),
+        lambda: db_async.insertar_movimientos_bulk("u", [{"fecha": "2024-01-01", "monto": 1}], token="t"),
+        lambda: db_async.cargar_catalogos("u", token="t"),
+        lambda: db_async.provisionar_catalogos("u", token="t"),
+    ],
+)
+def test_token_rechazado_no_es_un_resultado_vacio(monkeypatch, llamada):
+    async def cliente(token=None):
+        return _ConsultaRechazada(JWT_VENCIDO)
+    monkeypatch.setattr(db_async, "get_supabase_client_async", cliente)
+
+    with pytest.raises(SesionInvalida, match="JWT expired"):
+        asyncio.run(llamada())
+
+
+def test_otros_errores_siguen_devolviendo_vacio(monkeypatch):
+    async def cliente(token=None):
+        return _ConsultaRechazada(APIError({"code": "57014", "message": "timeout", "hint": None, "details": None}))
+    monkeypatch.setattr(db_async, "get_supabase_client_async", cliente)
+
+    assert asyncio.run(db_async.obtener_movimientos("u", token="t")) == []
@@ -0,0 +1,48 @@
+import pytest
+
+import db
+from sqlite_client import ClienteSQLite
+
+
+@pytest.fixture
+def cliente():
+    return ClienteSQLite(":memory:")
+
+
+@pytest.fixture
+def fechas(cliente):
+    rows = [{"usuario_id": "u", "fecha": f, "tipo": "Gasto", "monto": 1} for f in ("2024-01-02", None, "2024-01-01")]
+    cliente.table("movimientos").insert(rows).execute()
+    return cliente
+
+
+@pytest.mark.parametrize(
+    "desc, nullsfirst, esperado",
+    [
+        # Los defaults de Postgres: null al final en asc, al principio en desc
+        (False, None, ["2024-01-01", "2024-01-02", None]),
+        (True, None, [None, "2024-01-02", "2024-01-01"]),
+        (False, True, [None, "2024-01-01", "2024-01-02"]),
+        (True, False, ["2024-01-02", "2024-01-01", None]),
+    ],
+)
+def test_order_ubica_los_null_como_postgres(fechas, desc, nullsfirst, esperado):
+    result = fechas.table("movimientos").select("fecha").order("fecha", desc=desc, nullsfirst=nullsfirst).execute()
+    assert [r["fecha"] for r in result.data] == esperado
+
+
+def test_reconstruir_resumen_falla_con_un_error_claro(cliente):
+    with pytest.raises(NotImplementedError, match="no tiene rollup"):
+        cliente.rpc("reconstruir_resumen_mensual", {"p_usuario_id": "u"}).execute()
+
+
+def test_reconstruir_resumen_desde_db_devuelve_none(usuario_id, capsys):
+    assert db.reconstruir_resumen_mensual(usuario_id) is None
+    assert "[DB] Error al reconstruir resumen mensual" in capsys.readouterr().out
+
+
+def test_sin_rls_solo_filtra_lo_que_pide_la_consulta(fechas):
+    fechas.table("movimientos").insert({"usuario_id": "otro", "fecha": "2024-01-01"}).execute()
+    todas = fechas.table("movimientos").select("usuario_id").execute().data
+    propias = fechas.table("movimientos").select("usuario_id").eq("usuario_id", "u").execute().data
+    assert len(todas) == 4 and len(propias) == 3